@@ -0,0 +1,278 @@
+import os
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from . import models, utils
+from .cache import TTLCache
+
+# Structural analytics of a saved graph, respecting AND/OR prerequisite semantics.
+#
+# Expressions are parsed once per snapshot version into a compiled graph: nested tuples over
+# node indices, (is_and, children) for operators and plain ints for node references, plus a
+# topological order. Per node:
+#   depth             levels needed to unlock it: 1 + max over AND operands, min over OR operands
+#                     (0 for nodes without prerequisites); the chosen operands give its critical chain
+#   fan_in / fan_out  distinct prerequisites referenced / nodes referencing it
+#   necessary_count   prerequisites it can't be unlocked without: the union over AND operands and
+#                     the intersection over OR operands, transitively
+#   bottleneck        how many nodes have it among their necessary prerequisites
+# Necessary sets are evaluated as Python int bitsets in column blocks of BLOCK_BITS (only nodes
+# later in topological order can contain a block's bits), and only their counts are kept.
+# Results are cached per snapshot version. Every node also gets a Merkle signature over its
+# expression and its prerequisites' signatures. After a save, the bitset pass only revisits
+# nodes whose signature changed (and their ancestors), and the bottleneck counts are patched
+# with the difference.
+
+analytics_cache = TTLCache(maxsize=16, ttl=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600")))
+graph_cache = TTLCache(maxsize=16, ttl=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600")))
+# Latest result per snapshot id, the baseline of incremental recomputation
+latest_cache = TTLCache(maxsize=16, ttl=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600")))
+
+BLOCK_BITS = 8192
+ROW_CHUNK = 2048
+# Above this share of changed nodes a full pass is cheaper than patching
+INCREMENTAL_MAX_FRACTION = 0.3
+
+_stats = {"full": 0, "incremental": 0}
+
+
+class CompiledGraph(NamedTuple):
+    local_ids: List[int]
+    titles: List[str]
+    index: Dict[int, int]             # local_id -> index
+    exprs: List[object]               # compiled expression per index, None without prerequisites
+    refs: List[List[int]]             # distinct referenced indices
+    dependents: List[List[int]]
+    order: List[int]                  # topological order (prerequisites first)
+    position: Dict[int, int]          # index -> position in order
+    cyclic: List[int]                 # local ids on or behind a prerequisite cycle (data saved before validation)
+    signatures: List[Optional[int]]
+
+
+class Analytics(NamedTuple):
+    depth: Dict[int, int]             # local_id -> depth, for nodes in topological order
+    witness: Dict[int, Optional[int]] # local_id -> next node of its critical chain
+    necessary: Dict[int, int]         # local_id -> necessary prerequisite count
+    bottleneck: Dict[int, int]        # local_id -> nodes that can't be unlocked without it
+    signatures: Dict[int, int]        # signature -> local_id
+    incremental: bool
+
+
+def _compile(tree, index: Dict[int, int]):
+    """utils.parse_expression tree -> ints / (is_and, children); references to missing nodes are dropped."""
+    if tree is None:
+        return None
+    if isinstance(tree, utils.IdNode):
+        return index.get(tree.id_val)
+    if isinstance(tree, utils.OpNode):
+        children = tuple(c for c in (_compile(child, index) for child in tree.children) if c is not None)
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else (tree.op == "AND", children)
+    return None
+
+
+def _references(expr, out: List[int]):
+    if isinstance(expr, int):
+        out.append(expr)
+    elif expr is not None:
+        for child in expr[1]:
+            _references(child, out)
+
+
+def compile_graph(rows: Iterable[Tuple[int, str, Optional[str]]]) -> CompiledGraph:
+    """rows are (local_id, title, prerequisite)."""
+    rows = sorted(rows, key=lambda row: row[0])
+    local_ids = [row[0] for row in rows]
+    index = {local_id: i for i, local_id in enumerate(local_ids)}
+    exprs, refs = [], []
+    dependents = [[] for _ in rows]
+    for i, (_, _, prerequisite) in enumerate(rows):
+        expr = _compile(utils.parse_expression(prerequisite), index) if prerequisite else None
+        referenced = []
+        _references(expr, referenced)
+        referenced = list(dict.fromkeys(r for r in referenced if r != i))
+        exprs.append(expr)
+        refs.append(referenced)
+        for r in referenced:
+            dependents[r].append(i)
+
+    # Kahn's algorithm; whatever is left is on (or depends on) a cycle
+    remaining = [len(r) for r in refs]
+    queue = deque(i for i, count in enumerate(remaining) if count == 0)
+    order = []
+    while queue:
+        i = queue.popleft()
+        order.append(i)
+        for d in dependents[i]:
+            remaining[d] -= 1
+            if remaining[d] == 0:
+                queue.append(d)
+    position = {i: p for p, i in enumerate(order)}
+
+    signatures = [None] * len(rows)
+    for i in order:
+        signatures[i] = hash((local_ids[i], rows[i][2] or "", tuple(signatures[r] for r in refs[i])))
+    return CompiledGraph(
+        local_ids=local_ids,
+        titles=[row[1] for row in rows],
+        index=index,
+        exprs=exprs,
+        refs=refs,
+        dependents=dependents,
+        order=order,
+        position=position,
+        cyclic=[local_ids[i] for i in range(len(rows)) if i not in position],
+        signatures=signatures,
+    )
+
+
+def get_compiled(db: Session, snapshot_id: int, version) -> CompiledGraph:
+    key = (snapshot_id, str(version))
+    graph = graph_cache.get(key)
+    if graph is None:
+        rows = db.query(models.Node.local_id, models.Node.title, models.Node.prerequisite).filter(models.Node.snapshot_id == snapshot_id).all()
+        graph = compile_graph(rows)
+        graph_cache.set(key, graph)
+    return graph
+
+
+def _best(expr, values):
+    """(value, witness index) of an expression: max over AND operands, min over OR operands."""
+    if isinstance(expr, int):
+        return values[expr], expr
+    items = [_best(child, values) for child in expr[1]]
+    return max(items) if expr[0] else min(items)
+
+
+def _bits(expr, values):
+    if isinstance(expr, int):
+        return values[expr]
+    items = [_bits(child, values) for child in expr[1]]
+    result = items[0]
+    if expr[0]:
+        for item in items[1:]:
+            result |= item
+    else:
+        for item in items[1:]:
+            result &= item
+    return result
+
+
+def _ancestors(graph: CompiledGraph, indices: Iterable[int]) -> List[int]:
+    """Indices plus everything they (transitively) reference, in topological order."""
+    seen = set()
+    stack = [i for i in indices if i in graph.position]
+    while stack:
+        i = stack.pop()
+        if i in seen:
+            continue
+        seen.add(i)
+        stack.extend(r for r in graph.refs[i] if r not in seen)
+    return sorted(seen, key=graph.position.__getitem__)
+
+
+def _necessary(graph: CompiledGraph, rows: Optional[List[int]] = None):
+    """Necessary set sizes of `rows` (default: every ordered node) and, per node, how many of
+    those rows contain it. Bitsets run over the rows' ancestor cone, BLOCK_BITS columns at a time."""
+    import numpy as np
+
+    cone = graph.order if rows is None else _ancestors(graph, rows)
+    rows = cone if rows is None else [i for i in rows if i in graph.position]
+    local = {i: p for p, i in enumerate(cone)}
+    counted = np.zeros(len(cone), dtype=bool)
+    counted[[local[i] for i in rows]] = True
+    sizes = np.zeros(len(cone), dtype=np.int64)
+    columns = np.zeros(len(cone), dtype=np.int64)
+    values: Dict[int, int] = {}
+
+    for start in range(0, len(cone), BLOCK_BITS):
+        width = min(BLOCK_BITS, len(cone) - start)
+        values.clear()
+        for i in cone[:start]:
+            values[i] = 0  # earlier nodes can't include later ones
+        block_rows = cone[start:]
+        for p, i in enumerate(block_rows, start):
+            own = 1 << (p - start) if p < start + width else 0
+            expr = graph.exprs[i]
+            values[i] = own | (_bits(expr, values) if expr is not None else 0)
+        # Popcounts per row and per column, unpacking rows in chunks
+        for chunk in range(0, len(block_rows), ROW_CHUNK):
+            part = block_rows[chunk:chunk + ROW_CHUNK]
+            packed = np.frombuffer(b"".join(values[i].to_bytes(BLOCK_BITS // 8, "little") for i in part), dtype=np.uint8)
+            unpacked = np.unpackbits(packed.reshape(len(part), BLOCK_BITS // 8), axis=1, bitorder="little")[:, :width]
+            first = start + chunk
+            sizes[first:first + len(part)] += unpacked.sum(axis=1, dtype=np.int64)
+            columns[start:start + width] += unpacked[counted[first:first + len(part)]].sum(axis=0, dtype=np.int64)
+    return (
+        {graph.local_ids[i]: int(sizes[local[i]]) - 1 for i in rows},
+        {graph.local_ids[i]: int(columns[local[i]]) for i in cone},
+    )
+
+
+def compute(graph: CompiledGraph, previous: Optional[Tuple[CompiledGraph, Analytics]] = None) -> Analytics:
+    depth: Dict[int, int] = {}
+    witness: Dict[int, Optional[int]] = {}
+    values = [0] * len(graph.local_ids)
+    for i in graph.order:
+        expr = graph.exprs[i]
+        local_id = graph.local_ids[i]
+        if expr is None:
+            depth[local_id], witness[local_id] = 0, None
+            continue
+        value, chosen = _best(expr, values)
+        values[i] = value + 1
+        depth[local_id], witness[local_id] = value + 1, graph.local_ids[chosen]
+
+    signatures = {graph.signatures[i]: graph.local_ids[i] for i in graph.order}
+    changed = [i for i in graph.order if graph.signatures[i] not in (previous[1].signatures if previous else ())]
+    if previous is not None:
+        old_graph, old = previous
+        removed = [old_graph.index[local_id] for signature, local_id in old.signatures.items() if signature not in signatures]
+        if len(changed) + len(removed) <= INCREMENTAL_MAX_FRACTION * max(len(graph.order), 1):
+            # Unchanged signatures mean unchanged necessary sets: patch the column counts
+            necessary, added_columns = _necessary(graph, changed)
+            _, removed_columns = _necessary(old_graph, removed) if removed else ({}, {})
+            bottleneck = {}
+            for i in graph.order:
+                local_id = graph.local_ids[i]
+                if local_id not in necessary:
+                    necessary[local_id] = old.necessary[local_id]  # same signature, same local_id
+                count = old.bottleneck[local_id] + 1 if local_id in old.bottleneck else 0
+                bottleneck[local_id] = count + added_columns.get(local_id, 0) - removed_columns.get(local_id, 0) - 1
+            _stats["incremental"] += 1
+            return Analytics(depth, witness, necessary, bottleneck, signatures, True)
+
+    necessary, columns = _necessary(graph)
+    _stats["full"] += 1
+    return Analytics(depth, witness, necessary, {local_id: count - 1 for local_id, count in columns.items()}, signatures, False)
+
+
+def get_analytics(db: Session, snapshot_id: int, version) -> Tuple[CompiledGraph, Analytics]:
+    key = (snapshot_id, str(version))
+    result = analytics_cache.get(key)
+    if result is None:
+        graph = get_compiled(db, snapshot_id, version)
+        result = (graph, compute(graph, latest_cache.get(snapshot_id)))
+        analytics_cache.set(key, result)
+        latest_cache.set(snapshot_id, result)
+    return result
+
+
+def critical_chain(analytics: Analytics, local_id: int) -> List[int]:
+    """The chain realizing a node's depth, from a node without prerequisites up to it."""
+    chain = []
+    node = local_id
+    while node is not None:
+        chain.append(node)
+        node = analytics.witness.get(node)
+    return chain[::-1]
+
+
+def get_stats() -> dict:
+    return {
+        "full_runs": _stats["full"],
+        "incremental_runs": _stats["incremental"],
+        "cache_hits": analytics_cache.hits,
+        "cache_misses": analytics_cache.misses,
+    }
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from .. import crud, schemas, database, models, utils
+from .. import crud, schemas, database, models, utils, redirects, planner
+from ..metrics import TimedRoute
 
 # Import self-assessment module (located in root)
 try:
@@ -12,12 +13,13 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
     from self_assessment import assessment as sa_logic, models as sa_models
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 # Reuse get_current_user dependency
 from .endpoints import get_current_user
+from .read_routing import get_read_db, mark_primary_write
 
-@router.post("/capabilities", response_model=schemas.CapabilityRead)
+@router.post("/capabilities", response_model=schemas.CapabilityRead, dependencies=[Depends(mark_primary_write)])
 def create_capability(
     capability: schemas.CapabilityCreate,
     db: Session = Depends(database.get_db),
@@ -29,25 +31,29 @@ def create_capability(
     """
     return crud.create_capability(db, user_id=current_user.id, capability_data=capability)
 
-@router.post("/self-assessment", response_model=schemas.CapabilityRead)
+@router.post("/self-assessment", response_model=schemas.CapabilityRead, dependencies=[Depends(mark_primary_write)])
 def perform_self_assessment(
     request: schemas.SelfAssessmentRequest,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # 1. Fetch graph data
-    snapshot = crud.get_snapshot_by_label(db, graphLabel=request.graph_label)    
-    if not snapshot:
+    # 1. Fetch graph data (only the columns the assessment needs)
+    version = crud.get_snapshot_version(db, request.graph_label)
+    if version is None:
         raise HTTPException(status_code=404, detail="Graph not found")
     
     # Format graph data for assessment module
     graph_data = {
         "nodes": [
             {
-                "local_id": n.local_id,
-                "title": n.title,
-                "prerequisite": n.prerequisite
-            } for n in snapshot.nodes
+                "local_id": local_id,
+                "title": title,
+                "prerequisite": prerequisite
+            } for local_id, title, prerequisite in (
+                db.query(models.Node.local_id, models.Node.title, models.Node.prerequisite)
+                .filter(models.Node.snapshot_id == version.id)
+                .order_by(models.Node.local_id)
+            )
         ]
     }
     
@@ -68,7 +74,7 @@ def perform_self_assessment(
     assessed_nodes = [
         schemas.Assessment(
             node_id=n.node_id,
-            evaluation=dict(value=n.evaluation)
+            evaluation=dict(value=n.evaluation, inferred=True) if n.inferred else dict(value=n.evaluation)
         ) for n in capability_obj.assessed_nodes
     ]
     
@@ -105,14 +111,56 @@ def perform_self_assessment(
 @router.get("/self-assessment/{graph_label}/latest", response_model=Optional[schemas.CapabilityRead])
 def get_latest_self_assessment(
     graph_label: str,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
     # 1. Fetch latest capability for this user and graph_label
     latest = crud.get_latest_capability(db, user_id=current_user.id, assessment_name=sa_logic.ASSESSMENT_NAME, graph_label=graph_label)   
     return latest
 
-@router.delete("/self-assessment/{graph_label}/delete")
+@router.post("/learning-path", response_model=schemas.LearningPath)
+def plan_learning_path(
+    request: schemas.LearningPathRequest,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Smallest set of nodes to learn (prerequisites first) so that every target is unlocked.
+    Without an explicit `mastered` list, nodes assessed at `mastery_level` or above in the
+    user's latest self-assessment count as mastered.
+    """
+    version = crud.get_snapshot_version(db, request.graph_label)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Graph not found")
+    index = planner.get_index(db, version.id, version.last_updated)
+    unknown = [local_id for local_id in request.targets if local_id not in index.graph.index]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown target nodes: {unknown}")
+
+    if request.mastered is not None:
+        mastered = request.mastered
+    else:
+        latest = crud.get_latest_capability(db, user_id=current_user.id, assessment_name=sa_logic.ASSESSMENT_NAME, graph_label=request.graph_label)
+        mastered = [
+            node["node_id"] for node in (latest.assessed_nodes if latest else [])
+            if node.get("evaluation", {}).get("value", 0) >= request.mastery_level
+        ]
+    # Assessments may predate node merges: follow redirects to the current ids
+    resolver = redirects.get_resolver(db, version.id, version.last_updated)
+    mastered = {resolver.find(local_id) for local_id in mastered} - {None}
+
+    result = planner.plan(index, request.targets, mastered, request.weights)
+    graph = index.graph
+    return {
+        "graph_label": request.graph_label,
+        "targets": request.targets,
+        "steps": [{"local_id": local_id, "title": graph.titles[graph.index[local_id]]} for local_id in result.steps],
+        "cost": result.cost,
+        "mastered_count": len(mastered),
+        "unreachable": result.unreachable,
+    }
+
+@router.delete("/self-assessment/{graph_label}/delete", dependencies=[Depends(mark_primary_write)])
 def delete_self_assessment(
     graph_label: str,
     db: Session = Depends(database.get_db),
@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from .. import async_crud, schemas, models
+from ..metrics import TimedRoute
+from .endpoints import get_current_user
+from .read_routing import get_async_read_db
+
+# Async versions of the hot read endpoints. main.py mounts this router ahead of the sync
+# routers when ASYNC_DB is enabled, so these handlers shadow their sync counterparts.
+# Writes and everything else keep using the sync handlers in endpoints.py / assessments.py.
+
+try:
+    from self_assessment import assessment as sa_logic
+except ImportError:
+    import sys
+    import os
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+    from self_assessment import assessment as sa_logic
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.get("/snapshots", response_model=List[schemas.GraphSnapshotSummary])
+async def read_snapshots(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_read_db), current_user: models.User = Depends(get_current_user)):
+    return await async_crud.get_snapshots(db, skip=skip, limit=limit)
+
+@router.get("/snapshots/page", response_model=schemas.GraphSnapshotPage)
+async def read_snapshot_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    created_by: Optional[str] = None,
+    is_public: Optional[bool] = None,
+    base_graph: Optional[str] = None,
+    label_prefix: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    try:
+        items, next_cursor = await async_crud.get_snapshot_page(
+            db, cursor=cursor, limit=limit, created_by=created_by,
+            is_public=is_public, base_graph=base_graph, label_prefix=label_prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/public/snapshots", response_model=List[schemas.GraphSnapshotSummary])
+async def read_public_snapshots(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    return await async_crud.get_public_snapshots(db, skip=skip, limit=limit)
+
+@router.get("/public/snapshots/page", response_model=schemas.GraphSnapshotPage)
+async def read_public_snapshot_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    created_by: Optional[str] = None,
+    base_graph: Optional[str] = None,
+    label_prefix: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    try:
+        items, next_cursor = await async_crud.get_snapshot_page(
+            db, cursor=cursor, limit=limit, created_by=created_by,
+            is_public=True, base_graph=base_graph, label_prefix=label_prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/public/snapshots/{graphLabel}", response_model=schemas.GraphSnapshotRead)
+async def read_public_snapshot(graphLabel: str, db: AsyncSession = Depends(get_async_read_db)):
+    snapshot = await async_crud.get_snapshot_by_label(db, graphLabel=graphLabel)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    if not snapshot.is_public:
+        raise HTTPException(status_code=403, detail="Snapshot is not public")
+    return snapshot
+
+@router.get("/snapshots/{graphLabel}/read", response_model=schemas.GraphSnapshotRead)
+async def get_snapshot(graphLabel: str, db: AsyncSession = Depends(get_async_read_db), current_user: models.User = Depends(get_current_user)):
+    snapshot = await async_crud.get_snapshot_by_label(db, graphLabel=graphLabel)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return snapshot
+
+@router.get("/self-assessment/{graph_label}/latest", response_model=Optional[schemas.CapabilityRead])
+async def get_latest_self_assessment(
+    graph_label: str,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    return await async_crud.get_latest_capability(db, user_id=current_user.id, assessment_name=sa_logic.ASSESSMENT_NAME, graph_label=graph_label)
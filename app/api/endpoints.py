@@ -1,22 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, make_transient_to_detached
 from typing import List, Optional, Union
 from datetime import timedelta
 import json
 import io
 import os
-import smtplib
-from email.message import EmailMessage
-from .. import crud, schemas, database, utils, models
+import time
+from .. import crud, async_crud, schemas, database, utils, models, passwords, db_pool, error_log, graph_validation
+from ..cache import TTLCache
+from ..metrics import TimedRoute
+from .read_routing import get_read_db, mark_primary_write
 
 # Import self-assessment module (located in root)
 # Note: Self-assessment logic has been removed from main API.
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+# Decoded token -> column values of the authenticated user, so most requests skip the user lookup.
+# Entries are invalidated on profile/password changes and deletion; the short TTL bounds staleness
+# across workers, which each hold their own cache.
+user_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30")),
+)
+
+_USER_COLUMNS = [c.key for c in models.User.__table__.columns]
+
+def _cache_user(token: str, user: models.User, token_exp: Optional[float]):
+    ttl = None
+    if token_exp is not None:
+        # Never serve a cached user past the token's own expiry
+        ttl = token_exp - time.time()
+    user_cache.set(token, {key: getattr(user, key) for key in _USER_COLUMNS}, ttl=ttl)
+
+def _user_from_cache(values: dict) -> models.User:
+    # Build a fresh detached instance per request so handlers can db.add() it like a loaded row
+    user = models.User(**values)
+    make_transient_to_detached(user)
+    return user
+
+def invalidate_cached_user(username: str):
+    user_cache.discard_where(lambda values: values["username"] == username)
 
 async def get_current_user(db: Session = Depends(database.get_db), token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -24,6 +54,10 @@ async def get_current_user(db: Session = Depends(database.get_db), token: str =
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    cached = user_cache.get(token)
+    if cached is not None:
+        return _user_from_cache(cached)
+
     try:
         from jose import jwt, JWTError
         payload = jwt.decode(token, utils.SECRET_KEY, algorithms=[utils.ALGORITHM])
@@ -33,14 +67,39 @@ async def get_current_user(db: Session = Depends(database.get_db), token: str =
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_username(db, username=token_data.username)
+    if database.ASYNC_DB_ENABLED:
+        async with database.async_session() as async_db:
+            user = await async_crud.get_user_by_username(async_db, username=token_data.username)
+    else:
+        # Keep the blocking lookup off the event loop
+        user = await run_in_threadpool(crud.get_user_by_username, db, token_data.username)
     if user is None:
         raise credentials_exception
+    _cache_user(token, user, payload.get("exp"))
     return user
 
-@router.get("/snapshots/search", response_model=List[schemas.GraphSnapshotSummary])
-def search_snapshots(q: str, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.search_snapshots(db, query=q)
+async def get_optional_user(db: Session = Depends(database.get_db), token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """The logged-in user, or None for anonymous requests (and invalid tokens)."""
+    if not token:
+        return None
+    try:
+        return await get_current_user(db, token)
+    except HTTPException:
+        return None
+    finally:
+        # Callers only check who is asking, and some keep running long after (LLM suggestions):
+        # give the lookup's connection back now rather than after the response
+        await run_in_threadpool(db.close)
+
+@router.get("/snapshots/search", response_model=List[schemas.SnapshotSearchResult])
+def search_snapshots(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    nodes_per_graph: int = Query(5, ge=0, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    return crud.search_snapshots(db, query=q, limit=limit, nodes_per_graph=nodes_per_graph)
 
 @router.get("/auth/me", response_model=schemas.UserRead)
 async def read_users_me(current_user: schemas.UserRead = Depends(get_current_user)):
@@ -49,23 +108,36 @@ async def read_users_me(current_user: schemas.UserRead = Depends(get_current_use
 @router.put("/auth/me", response_model=schemas.UserRead)
 async def update_user_me(user_update: schemas.UserProfileUpdate, current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
     updated_user = crud.update_user(db, current_user, user_update)
+    invalidate_cached_user(current_user.username)
     return updated_user
 
+def _password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 @router.put("/auth/me/password", status_code=status.HTTP_204_NO_CONTENT)
 async def update_user_password(password_update: schemas.UserPasswordUpdate, current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
-    # Verify old password
-    if not utils.verify_password(password_update.old_password, current_user.hashed_password):
-        raise HTTPException(status_code=400, detail="Incorrect old password")
-    
-    # Update new password
-    current_user.hashed_password = utils.get_password_hash(password_update.new_password)
-    db.add(current_user)
-    db.commit()
+    try:
+        # Verify old password
+        if not await passwords.verify_password(password_update.old_password, current_user.hashed_password):
+            raise HTTPException(status_code=400, detail="Incorrect old password")
+
+        # Update new password
+        hashed_password = await passwords.hash_password(password_update.new_password)
+    except passwords.PasswordPoolBusy:
+        raise _password_pool_busy()
+
+    await run_in_threadpool(crud.update_user_password_hash, db, current_user, hashed_password)
+    invalidate_cached_user(current_user.username)
     return
 
 @router.delete("/auth/me", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user_me(current_user: models.User = Depends(get_current_user), db: Session = Depends(database.get_db)):
     deleted = crud.delete_user_by_username(db, current_user.username)
+    invalidate_cached_user(current_user.username)
     if not deleted:
         raise HTTPException(status_code=400, detail="Could not delete user")
     return
@@ -79,30 +151,33 @@ async def logout():
 # --- Auth Endpoints ---
 
 @router.post("/auth/signup", response_model=schemas.UserRead)
-def signup(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def signup(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     # Check if user already exists
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await run_in_threadpool(crud.get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Check invitation code
-    db_invitation = crud.get_invitation_by_code(db, code=user.invitation_code)
+    db_invitation = await run_in_threadpool(crud.get_invitation_by_code, db, user.invitation_code)
     if not db_invitation or db_invitation.is_used:
         raise HTTPException(status_code=400, detail="Invalid or used invitation code")
     
     # Create user
-    hashed_password = utils.get_password_hash(user.password)
-    new_user = crud.create_user(db, user=user, hashed_password=hashed_password)
+    try:
+        hashed_password = await passwords.hash_password(user.password)
+    except passwords.PasswordPoolBusy:
+        raise _password_pool_busy()
+    new_user = await run_in_threadpool(crud.create_user, db, user, hashed_password)
     
     # Mark invitation as used
-    crud.use_invitation(db, db_invitation)
+    await run_in_threadpool(crud.use_invitation, db, db_invitation)
     
     return new_user
 
 @router.post("/auth/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
     try:
-        user = crud.get_user_by_username(db, username=form_data.username)
+        user = await run_in_threadpool(crud.get_user_by_username, db, form_data.username)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -111,9 +186,11 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             )
         
         try:
-            is_valid = utils.verify_password(form_data.password, user.hashed_password)
+            is_valid, new_hash = await passwords.verify_and_update_password(form_data.password, user.hashed_password)
+        except passwords.PasswordPoolBusy:
+            raise _password_pool_busy()
         except Exception as e:
-            print(f"ERROR: Password verification failed: {e}")
+            error_log.log_exception(e, event="password_verification_failed", username=form_data.username)
             raise HTTPException(status_code=500, detail="Internal error during password verification")
 
         if not is_valid:
@@ -122,6 +199,11 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
                 detail="Incorrect username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+
+        if new_hash:
+            # The stored hash uses an outdated cost factor; upgrade it now that we know the password
+            await run_in_threadpool(crud.update_user_password_hash, db, user, new_hash)
+            invalidate_cached_user(user.username)
             
         access_token_expires = timedelta(minutes=utils.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = utils.create_access_token(
@@ -131,16 +213,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     except HTTPException:
         raise
     except Exception as e:
-        # Log error to file for debugging since stdout might be lost
-        try:
-            with open("login_error.log", "a") as f:
-                import traceback
-                f.write(f"Login error: {str(e)}\n")
-                f.write(traceback.format_exc())
-                f.write("\n" + "-"*20 + "\n")
-        except:
-            pass
-        print(f"CRITICAL: Login error: {e}")
+        error_log.log_exception(e, event="login_error", username=form_data.username)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -155,11 +228,15 @@ def create_invitation(invitation: schemas.InvitationCreate, db: Session = Depend
 
 @router.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "password_pool": passwords.get_stats(), "db_pool": db_pool.get_stats()}
 
 
 @router.post("/contact", response_model=schemas.ContactFormResponse)
 def contact_form(payload: schemas.ContactFormRequest):
+    # Imported on demand: the contact form is rarely used and should not slow down cold starts
+    import smtplib
+    from email.message import EmailMessage
+
     to_email = os.getenv("EMAIL_USER")
     from_email = os.getenv("EMAIL_USER")
     smtp_host = os.getenv("EMAIL_HOST")
@@ -212,7 +289,13 @@ def contact_form(payload: schemas.ContactFormRequest):
 
     return {"ok": True}
 
-@router.post("/snapshots", response_model=schemas.GraphSnapshotRead)
+@router.post("/snapshots/validate", response_model=schemas.GraphValidationResult)
+def validate_snapshot(snapshot: schemas.GraphSnapshotCreate, current_user: models.User = Depends(get_current_user)):
+    # Same checks as saving, without writing anything
+    checked = graph_validation.check_graph(snapshot.nodes)
+    return {"valid": not checked.errors, "error_count": checked.error_count, "errors": checked.errors}
+
+@router.post("/snapshots", response_model=schemas.GraphSnapshotRead, dependencies=[Depends(mark_primary_write)])
 def create_snapshot(snapshot: schemas.GraphSnapshotCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
     # Set created_by to current user for the payload
     snapshot.created_by = current_user.username
@@ -249,17 +332,55 @@ def create_snapshot(snapshot: schemas.GraphSnapshotCreate, db: Session = Depends
     return crud.create_snapshot(db=db, snapshot_data=snapshot)
 
 @router.get("/snapshots", response_model=List[schemas.GraphSnapshotSummary])
-def read_snapshots(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+def read_snapshots(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     snapshots = crud.get_snapshots(db, skip=skip, limit=limit)
     return snapshots
 
+@router.get("/snapshots/page", response_model=schemas.GraphSnapshotPage)
+def read_snapshot_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    created_by: Optional[str] = None,
+    is_public: Optional[bool] = None,
+    base_graph: Optional[str] = None,
+    label_prefix: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    try:
+        items, next_cursor = crud.get_snapshot_page(
+            db, cursor=cursor, limit=limit, created_by=created_by,
+            is_public=is_public, base_graph=base_graph, label_prefix=label_prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.get("/public/snapshots", response_model=List[schemas.GraphSnapshotSummary])
-def read_public_snapshots(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
+def read_public_snapshots(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     snapshots = crud.get_public_snapshots(db, skip=skip, limit=limit)
     return snapshots
 
+@router.get("/public/snapshots/page", response_model=schemas.GraphSnapshotPage)
+def read_public_snapshot_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    created_by: Optional[str] = None,
+    base_graph: Optional[str] = None,
+    label_prefix: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    try:
+        items, next_cursor = crud.get_snapshot_page(
+            db, cursor=cursor, limit=limit, created_by=created_by,
+            is_public=True, base_graph=base_graph, label_prefix=label_prefix
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.get("/public/snapshots/{graphLabel}", response_model=schemas.GraphSnapshotRead)
-def read_public_snapshot(graphLabel: str, db: Session = Depends(database.get_db)):
+def read_public_snapshot(graphLabel: str, db: Session = Depends(get_read_db)):
     snapshot = crud.get_snapshot_by_label(db, graphLabel=graphLabel)
     if snapshot is None:
         raise HTTPException(status_code=404, detail="Snapshot not found")
@@ -268,7 +389,7 @@ def read_public_snapshot(graphLabel: str, db: Session = Depends(database.get_db)
     return snapshot
 
 @router.get("/snapshots/{graphLabel}/read", response_model=schemas.GraphSnapshotRead)
-def get_snapshot(graphLabel: str, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+def get_snapshot(graphLabel: str, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     try:
         snapshot = crud.get_snapshot_by_label(db=db, graphLabel=graphLabel)
         if snapshot is None:
@@ -277,7 +398,7 @@ def get_snapshot(graphLabel: str, db: Session = Depends(database.get_db), curren
     except Exception as e:
         raise HTTPException(status_code=500, detail= str(e))
 
-@router.patch("/snapshots/{graphLabel}", response_model=schemas.GraphSnapshotRead)
+@router.patch("/snapshots/{graphLabel}", response_model=schemas.GraphSnapshotRead, dependencies=[Depends(mark_primary_write)])
 def update_snapshot_metadata(
     graphLabel: str, 
     update_data: schemas.GraphSnapshotUpdate, 
@@ -303,7 +424,7 @@ def update_snapshot_metadata(
 
     return crud.update_snapshot_metadata(db=db, db_snapshot=snapshot, snapshot_update=update_data)  
 
-@router.delete("/snapshots/{graphLabel}")
+@router.delete("/snapshots/{graphLabel}", dependencies=[Depends(mark_primary_write)])
 def delete_snapshot(graphLabel: str, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
     # Check ownership
     snapshot = crud.get_snapshot_by_label(db=db, graphLabel=graphLabel)
@@ -321,20 +442,13 @@ def delete_snapshot(graphLabel: str, db: Session = Depends(database.get_db), cur
     return {"message": "Snapshot deleted"}
 
 @router.get("/snapshots/{graphLabel}/export")
-def export_snapshot(graphLabel: str, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+def export_snapshot(graphLabel: str, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     snapshot = crud.get_snapshot_by_label(db=db, graphLabel=graphLabel)
     if not snapshot:
         raise HTTPException(status_code=404, detail="Snapshot not found")
     
-    # Serialize to Pydantic model
-    # Use model_validate for Pydantic v2 compatibility
-    snapshot_data = schemas.GraphSnapshotRead.model_validate(snapshot)
-    
-    # Convert to dict
-    data = snapshot_data.model_dump()
-    
     # Create file stream
-    file_content = json.dumps(data, indent=2, default=str)
+    file_content = crud.serialize_snapshot_export(snapshot)
     
     filename = f"{graphLabel}.knw"
     
@@ -344,10 +458,11 @@ def export_snapshot(graphLabel: str, db: Session = Depends(database.get_db), cur
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-@router.post("/snapshots/{graphLabel}/import", response_model=schemas.GraphSnapshotRead)
-async def import_snapshot(
+@router.post("/snapshots/{graphLabel}/import", response_model=schemas.GraphSnapshotRead, dependencies=[Depends(mark_primary_write)])
+def import_snapshot(
     graphLabel: str,
     overwrite: bool = False,
+    layout: bool = False,
     file: UploadFile = File(...), 
     db: Session = Depends(database.get_db), 
     current_user: models.User = Depends(get_current_user)
@@ -355,40 +470,20 @@ async def import_snapshot(
     if not file.filename.endswith(".knw"):
         raise HTTPException(status_code=400, detail="Invalid file format. Must be a .knw file")
     
-    content = await file.read()
+    # A plain def so the strict validation and the optional layout run in the threadpool
+    content = file.file.read()
     try:
         data = json.loads(content)
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON content")
         
     try:
-        # Strip top-level read-only fields that might confuse creation
-        data.pop('id', None)
-        data.pop('created_at', None)
-        data.pop('last_updated', None)
-        data.pop('node_count', None)
-        
-        # Ensure metadata defaults if missing
-        if 'base_graph' not in data:
-            data['base_graph'] = None
-        
-        if 'created_by' not in data:
-            data['created_by'] = "Unknown"
-
-        # Handle redirects mapping for import
-        if 'redirects' in data and isinstance(data['redirects'], list):
-            # If it's the Read format (list of objects), convert to Create format (dict old_id -> new_id)
-            redirects_map = {}
-            for r in data['redirects']:
-                if isinstance(r, dict) and 'old_local_id' in r and 'new_local_id' in r:
-                    redirects_map[str(r['old_local_id'])] = r['new_local_id']
-            data['redirects'] = redirects_map
-
         # Create a new snapshot from the data
-        snapshot_in = schemas.GraphSnapshotCreate(**data)
+        snapshot_in = crud.snapshot_create_from_export(data)
         
         # Apply overwrite flag from query param
         snapshot_in.overwrite = overwrite
+        snapshot_in.auto_layout = layout
         
     except Exception as e:
          raise HTTPException(status_code=400, detail=f"Invalid graph data: {str(e)}")
@@ -0,0 +1,265 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from .. import crud, database, schemas, models, redirects, layout, spatial, analytics, planner
+from ..metrics import TimedRoute
+from .endpoints import get_current_user, get_optional_user
+from .read_routing import get_read_db, mark_primary_write
+
+# Structural queries over a saved graph, answered from the node_edges index
+# instead of parsing every prerequisite expression, redirect resolution, server-side layout
+# level-of-detail reads (outline first, domains / node details / sources on demand),
+# viewport queries over the stored positions and AND/OR-aware analytics.
+
+router = APIRouter(route_class=TimedRoute)
+
+MAX_HOPS = 1000
+MAX_RESOLVE_IDS = 10000
+MAX_VIEWPORT_ITEMS = 10000
+MAX_ANALYTICS_ROWS = 10000
+
+def _get_snapshot_id(db: Session, graphLabel: str) -> int:
+    version = crud.get_snapshot_version(db, graphLabel)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return version.id
+
+def _neighborhood(db: Session, graphLabel: str, localId: int, direction: str, hops: int):
+    snapshot_id = _get_snapshot_id(db, graphLabel)
+    distances, edges = crud.get_node_neighborhood(db, snapshot_id, localId, direction=direction, hops=hops)
+    titles = crud.get_node_titles(db, snapshot_id, distances)
+    if localId not in titles:
+        raise HTTPException(status_code=404, detail=f"Node {localId} not found")
+    return {
+        "local_id": localId,
+        "direction": direction,
+        "hops": hops,
+        "nodes": [
+            {"local_id": node_id, "title": titles.get(node_id, ""), "distance": distance}
+            for node_id, distance in sorted(distances.items(), key=lambda item: (item[1], item[0]))
+            if node_id != localId
+        ],
+        "edges": [{"from_local_id": from_id, "to_local_id": to_id} for from_id, to_id in edges],
+    }
+
+@router.get("/snapshots/{graphLabel}/nodes/{localId}/dependencies", response_model=schemas.NodeNeighborhood)
+def read_node_dependencies(
+    graphLabel: str,
+    localId: int,
+    hops: int = Query(1, ge=1, le=MAX_HOPS),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """What the node requires, directly (hops=1) or transitively."""
+    return _neighborhood(db, graphLabel, localId, "dependencies", hops)
+
+@router.get("/snapshots/{graphLabel}/nodes/{localId}/dependents", response_model=schemas.NodeNeighborhood)
+def read_node_dependents(
+    graphLabel: str,
+    localId: int,
+    hops: int = Query(1, ge=1, le=MAX_HOPS),
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """What requires the node, directly (hops=1) or transitively (impact analysis)."""
+    return _neighborhood(db, graphLabel, localId, "dependents", hops)
+
+@router.get("/snapshots/{graphLabel}/nodes/{localId}/neighborhood", response_model=schemas.NodeNeighborhood)
+def read_node_neighborhood(
+    graphLabel: str,
+    localId: int,
+    hops: int = Query(2, ge=1, le=MAX_HOPS),
+    direction: Literal["both", "dependencies", "dependents"] = "both",
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    return _neighborhood(db, graphLabel, localId, direction, hops)
+
+def _readable_snapshot(db: Session, graphLabel: str, current_user: Optional[models.User]):
+    snapshot = (
+        db.query(
+            models.GraphSnapshot.id, models.GraphSnapshot.version_label, models.GraphSnapshot.created_at,
+            models.GraphSnapshot.last_updated, models.GraphSnapshot.is_public,
+        )
+        .filter(models.GraphSnapshot.version_label == graphLabel)
+        .first()
+    )
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    # Public graphs can be browsed anonymously, private ones need a logged-in user
+    if not snapshot.is_public and current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return snapshot
+
+@router.get("/snapshots/{graphLabel}/outline", response_model=schemas.GraphOutline)
+def read_graph_outline(
+    graphLabel: str,
+    expand: List[int] = Query([]),
+    collapse: List[int] = Query([]),
+    db: Session = Depends(get_read_db),
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    """The domain tree with aggregated counts and only the nodes of expanded domains (by their saved
+    collapsed flag, overridden by ?expand= / ?collapse= domain local ids). Nodes come without
+    descriptions or sources."""
+    snapshot = _readable_snapshot(db, graphLabel, current_user)
+    outline = crud.get_graph_outline(db, snapshot.id, expand=expand, collapse=collapse)
+    return {
+        "id": snapshot.id,
+        "version_label": snapshot.version_label,
+        "created_at": snapshot.created_at,
+        "last_updated": snapshot.last_updated or snapshot.created_at,
+        "is_public": snapshot.is_public,
+        **outline,
+    }
+
+@router.get("/snapshots/{graphLabel}/domains/{domainLocalId}/nodes", response_model=List[schemas.NodeSummary])
+def read_domain_nodes(
+    graphLabel: str,
+    domainLocalId: int,
+    recursive: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    """Nodes of one domain, for expanding it; recursive includes its sub-domains."""
+    snapshot = _readable_snapshot(db, graphLabel, current_user)
+    nodes = crud.get_domain_nodes(db, snapshot.id, domainLocalId, recursive=recursive)
+    if nodes is None:
+        raise HTTPException(status_code=404, detail=f"Domain {domainLocalId} not found")
+    return nodes
+
+@router.get("/snapshots/{graphLabel}/nodes/{localId}", response_model=schemas.NodeDetail)
+def read_node(
+    graphLabel: str,
+    localId: int,
+    db: Session = Depends(get_read_db),
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    snapshot = _readable_snapshot(db, graphLabel, current_user)
+    node = crud.get_node(db, snapshot.id, localId)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Node {localId} not found")
+    return node
+
+@router.get("/snapshots/{graphLabel}/nodes/{localId}/sources", response_model=List[schemas.SourceRead])
+def read_node_sources(
+    graphLabel: str,
+    localId: int,
+    db: Session = Depends(get_read_db),
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    snapshot = _readable_snapshot(db, graphLabel, current_user)
+    sources = crud.get_node_sources(db, snapshot.id, localId)
+    if sources is None:
+        raise HTTPException(status_code=404, detail=f"Node {localId} not found")
+    return sources
+
+@router.get("/snapshots/{graphLabel}/viewport", response_model=schemas.Viewport)
+def read_viewport(
+    graphLabel: str,
+    min_x: float = Query(..., allow_inf_nan=False),
+    min_y: float = Query(..., allow_inf_nan=False),
+    max_x: float = Query(..., allow_inf_nan=False),
+    max_y: float = Query(..., allow_inf_nan=False),
+    zoom: float = Query(1.0, gt=0, allow_inf_nan=False),
+    limit: int = Query(2000, ge=1, le=MAX_VIEWPORT_ITEMS),
+    db: Session = Depends(get_read_db),
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    """Nodes inside a bounding box (canvas coordinates) and the edges between them. Zoomed out
+    (zoom is the canvas scale) or above `limit` nodes, nearby nodes are merged into clusters."""
+    if min_x > max_x or min_y > max_y:
+        raise HTTPException(status_code=400, detail="Empty bounding box")
+    snapshot = _readable_snapshot(db, graphLabel, current_user)
+    index = spatial.get_index(db, snapshot.id, snapshot.last_updated)
+    return spatial.query(index, min_x, min_y, max_x, max_y, zoom, limit)
+
+def _node_metrics(graph: analytics.CompiledGraph, result: analytics.Analytics, local_id: int) -> dict:
+    i = graph.index[local_id]
+    return {
+        "local_id": local_id,
+        "title": graph.titles[i],
+        "depth": result.depth[local_id],
+        "fan_in": len(graph.refs[i]),
+        "fan_out": len(graph.dependents[i]),
+        "necessary_count": result.necessary[local_id],
+        "bottleneck": result.bottleneck[local_id],
+    }
+
+@router.get("/snapshots/{graphLabel}/analytics", response_model=schemas.GraphAnalytics)
+def read_graph_analytics(
+    graphLabel: str,
+    sort: Literal["bottleneck", "depth", "necessary_count", "fan_in", "fan_out"] = "bottleneck",
+    limit: int = Query(100, ge=0, le=MAX_ANALYTICS_ROWS),
+    db: Session = Depends(get_read_db),
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    """Graph-wide structure metrics; `nodes` holds the top `limit` nodes by `sort`."""
+    snapshot = _readable_snapshot(db, graphLabel, current_user)
+    graph, result = analytics.get_analytics(db, snapshot.id, snapshot.last_updated)
+    rows = [_node_metrics(graph, result, graph.local_ids[i]) for i in graph.order]
+    rows.sort(key=lambda row: (-row[sort], row["local_id"]))
+    deepest = max(result.depth, key=lambda local_id: (result.depth[local_id], -local_id), default=None)
+    return {
+        "node_count": len(graph.local_ids),
+        "edge_count": sum(len(refs) for refs in graph.refs),
+        "max_depth": result.depth[deepest] if deepest is not None else 0,
+        "critical_path": analytics.critical_chain(result, deepest) if deepest is not None else [],
+        "cyclic": graph.cyclic,
+        "incremental": result.incremental,
+        "nodes": rows[:limit],
+    }
+
+@router.get("/snapshots/{graphLabel}/analytics/nodes/{localId}", response_model=schemas.NodeAnalytics)
+def read_node_analytics(
+    graphLabel: str,
+    localId: int,
+    db: Session = Depends(get_read_db),
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    snapshot = _readable_snapshot(db, graphLabel, current_user)
+    graph, result = analytics.get_analytics(db, snapshot.id, snapshot.last_updated)
+    if localId not in result.depth:
+        detail = f"Node {localId} is on a prerequisite cycle" if localId in graph.index else f"Node {localId} not found"
+        raise HTTPException(status_code=404, detail=detail)
+    return {
+        **_node_metrics(graph, result, localId),
+        "critical_chain": analytics.critical_chain(result, localId),
+        "unlock_set": planner.plan(planner.get_index(db, snapshot.id, snapshot.last_updated), [localId]).steps,
+    }
+
+@router.post("/snapshots/{graphLabel}/redirects/resolve", response_model=schemas.RedirectResolveResponse)
+def resolve_redirects(
+    graphLabel: str,
+    query: schemas.RedirectResolveRequest,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Map node ids from earlier saves of the graph (e.g. in recorded capabilities) to current ones."""
+    if len(query.local_ids) > MAX_RESOLVE_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RESOLVE_IDS} ids per request")
+    version = crud.get_snapshot_version(db, graphLabel)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    resolver = redirects.get_resolver(db, version.id, version.last_updated)
+    return {"resolved": resolver.resolve(query.local_ids)}
+
+@router.post("/snapshots/{graphLabel}/layout", response_model=schemas.LayoutResult, dependencies=[Depends(mark_primary_write)])
+def layout_snapshot(
+    graphLabel: str,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Recompute the layered layout of a saved graph and persist it to the node positions."""
+    snapshot = crud.get_snapshot_by_label(db=db, graphLabel=graphLabel)
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    if snapshot.created_by and snapshot.created_by != "Unknown" and snapshot.created_by != current_user.username:
+        raise HTTPException(status_code=403, detail="Not authorized to edit this graph")
+    result = layout.layout_snapshot(db, snapshot)
+    return {
+        "node_count": len(result.positions),
+        "layer_count": result.layer_count,
+        "width": result.width,
+        "height": result.height,
+    }
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response, status
+from sqlalchemy.orm import Session
+from typing import List
+from .. import schemas, database, models, jobs
+from ..metrics import TimedRoute
+from .endpoints import get_current_user
+from .read_routing import mark_primary_write
+
+# Background variants of the heavy snapshot operations. Submitting returns 202 with the job;
+# clients poll GET /jobs/{id} for status/progress and fetch GET /jobs/{id}/result when it succeeded.
+
+router = APIRouter(route_class=TimedRoute)
+
+WRITE_JOB_KINDS = ("snapshot_save", "snapshot_import")
+
+def _get_own_job(db: Session, job_id: int, current_user: models.User) -> models.Job:
+    job = jobs.get_job(db, job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs/snapshots", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+def submit_snapshot_save(snapshot: schemas.GraphSnapshotCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+    snapshot.created_by = current_user.username
+    return jobs.enqueue(db, "snapshot_save", current_user.id, {"snapshot": snapshot.model_dump(mode="json")})
+
+@router.post("/jobs/snapshots/import", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_snapshot_import(
+    overwrite: bool = False,
+    layout: bool = False,
+    file: UploadFile = File(...),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not file.filename.endswith(".knw"):
+        raise HTTPException(status_code=400, detail="Invalid file format. Must be a .knw file")
+    try:
+        content = (await file.read()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid file encoding")
+    # Parsing and validation happen in the worker
+    return jobs.enqueue(db, "snapshot_import", current_user.id, {"content": content, "overwrite": overwrite, "layout": layout})
+
+@router.post("/jobs/snapshots/{graphLabel}/export", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED)
+def submit_snapshot_export(graphLabel: str, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+    return jobs.enqueue(db, "snapshot_export", current_user.id, {"graph_label": graphLabel})
+
+@router.get("/jobs", response_model=List[schemas.JobRead])
+def read_jobs(limit: int = Query(50, ge=1, le=200), db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+    return jobs.get_jobs(db, current_user.id, limit=limit)
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobRead)
+def read_job(job_id: int, response: Response, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+    job = _get_own_job(db, job_id, current_user)
+    if job.status == "succeeded" and job.kind in WRITE_JOB_KINDS:
+        # The client will read the saved graph next; keep it off a lagging replica
+        mark_primary_write(response)
+    return job
+
+@router.post("/jobs/{job_id}/cancel", response_model=schemas.JobRead)
+def cancel_job(job_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+    job = _get_own_job(db, job_id, current_user)
+    if job.status not in jobs.ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return jobs.cancel(db, job)
+
+@router.get("/jobs/{job_id}/result")
+def read_job_result(job_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(get_current_user)):
+    job = _get_own_job(db, job_id, current_user)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if job.result_name:
+        return Response(
+            content=job.result,
+            media_type="application/json",
+            headers={"Content-Disposition": f"attachment; filename={job.result_name}"}
+        )
+    return Response(content=job.result or "null", media_type="application/json")
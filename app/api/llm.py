@@ -1,55 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from .. import schemas, database
-from . import prompts
-import os
 import json
-from typing import List
+from contextlib import aclosing
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from .. import crud, models, schemas, llm_client, llm_context
+from ..metrics import TimedRoute
+from . import prompts
+from .endpoints import get_optional_user
+from .read_routing import read_session
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-@router.post("/suggest", response_model=schemas.LLMResponse)
-def get_suggestions(query: schemas.LLMQuery):
-    api_key = os.getenv("GEMINI_API_KEY")
-    
-    if not api_key:
-        # Mock response if no API key
-        return {
-            "suggestions": [
-                {"title": "Example Node 1", "description": "This is a generated suggestion (Mock). Add your Gemini API key to get real results."},
-                {"title": "Example Node 2", "description": "Another example suggestion for the knowledge graph."}
-            ]
-        }
+def _graph_context(request: Request, query: schemas.LLMQuery, current_user: Optional[models.User]) -> str:
+    # Own short-lived session: the connection must not stay checked out while the model runs
+    with read_session(request) as db:
+        version = crud.get_snapshot_version(db, query.graph_label)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+        # Same visibility as reading the graph itself: private graphs need a logged-in user
+        if not version.is_public and current_user is None:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        return llm_context.build_context(db, version.id, version.last_updated, query.prompt, query.context_tokens)
 
+@router.post("/suggest", response_model=schemas.LLMResponse)
+async def get_suggestions(
+    query: schemas.LLMQuery,
+    request: Request,
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    context = query.context
+    if query.graph_label:
+        context = await run_in_threadpool(_graph_context, request, query, current_user)
     try:
-        import google.generativeai as genai
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        system_prompt = prompts.SUGGEST_NODES_SYSTEM_PROMPT
-        
-        user_content = f"Prompt: {query.prompt}"
-        if query.graph_name:
-            user_content += f"\nGraph Name: {query.graph_name}"
-            
-        if query.context:
-            user_content += f"\n\n--- Existing Graph Context ---\nThe following nodes already exist in the graph (Title: Description):\n{query.context}\n\nBased on this context, suggest modular additions that fit well with these existing nodes."
-
-        full_prompt = f"{system_prompt}\n\n{user_content}"
-        
-        response = model.generate_content(
-            full_prompt,
-            generation_config={"response_mime_type": "application/json"}
+        return await llm_client.suggest(
+            prompts.SUGGEST_NODES_SYSTEM_PROMPT,
+            query.prompt,
+            graph_name=query.graph_name or query.graph_label,
+            context=context,
         )
-        
-        content = response.text
-        
-        # Parse JSON
-        data = json.loads(content)
-        return data
-
-    except Exception as e:
+    except llm_client.LLMError as e:
         print(f"LLM Error: {e}")
         # Return a friendly error as a suggestion so the UI doesn't break
         return {
@@ -57,3 +47,44 @@ def get_suggestions(query: schemas.LLMQuery):
                 {"title": "Error", "description": f"Failed to generate suggestions: {str(e)}"}
             ]
         }
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/suggest/stream")
+async def stream_suggestions(
+    query: schemas.LLMQuery,
+    request: Request,
+    current_user: Optional[models.User] = Depends(get_optional_user)
+):
+    """Server-Sent Events: one `suggestion` event per suggestion as soon as the model has
+    written it, then `done` (or `error`). When the client disconnects the response task is
+    cancelled, which stops the model call."""
+    context = query.context
+    if query.graph_label:
+        context = await run_in_threadpool(_graph_context, request, query, current_user)
+
+    async def events():
+        count = 0
+        suggestions = llm_client.stream_suggestions(
+            prompts.SUGGEST_NODES_SYSTEM_PROMPT,
+            query.prompt,
+            graph_name=query.graph_name or query.graph_label,
+            context=context,
+        )
+        try:
+            async with aclosing(suggestions):
+                async for suggestion in suggestions:
+                    count += 1
+                    yield _sse("suggestion", suggestion)
+        except llm_client.LLMError as e:
+            print(f"LLM Error: {e}")
+            yield _sse("error", {"detail": f"Failed to generate suggestions: {str(e)}"})
+            return
+        yield _sse("done", {"count": count})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
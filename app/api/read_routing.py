@@ -0,0 +1,52 @@
+import os
+import time
+from contextlib import contextmanager
+from fastapi import Request, Response
+from .. import database
+
+# Read/write session routing.
+# Read-only endpoints take their session from get_read_db / get_async_read_db, which use the
+# replica when DATABASE_REPLICA_URL is set. Replicas lag the primary, so write endpoints depend on
+# mark_primary_write: it sets a short-lived cookie that pins this client's reads to the primary,
+# letting the UI read back a snapshot it just saved. A cookie (rather than per-process state)
+# keeps the guarantee across workers.
+
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+PRIMARY_COOKIE = "read_primary_until"
+
+
+def mark_primary_write(response: Response):
+    if not database.REPLICA_ENABLED:
+        return
+    response.set_cookie(
+        key=PRIMARY_COOKIE,
+        value=str(int(time.time()) + READ_YOUR_WRITES_SECONDS),
+        max_age=READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _use_primary(request: Request) -> bool:
+    until = request.cookies.get(PRIMARY_COOKIE)
+    try:
+        return until is not None and int(until) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request):
+    yield from database.get_read_db(use_primary=_use_primary(request))
+
+
+@contextmanager
+def read_session(request: Request):
+    """A read session closed when the block ends. Dependency sessions are only closed after the
+    response is sent, so endpoints that keep running past their queries (streaming, waiting on
+    the model) use this instead to give the connection back early."""
+    yield from database.get_read_db(use_primary=_use_primary(request))
+
+
+async def get_async_read_db(request: Request):
+    async for db in database.get_async_read_db(use_primary=_use_primary(request)):
+        yield db
@@ -0,0 +1,59 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload
+from . import models, crud
+
+# Async variants of the hot read paths in crud.py, used when database.ASYNC_DB_ENABLED is set.
+# Anything returned here is serialized after the session closes, so every relationship the
+# response schemas touch must be eagerly loaded (lazy loads are not possible outside the session).
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+async def get_snapshot_by_label(db: AsyncSession, graphLabel: str):
+    result = await db.execute(
+        select(models.GraphSnapshot)
+        .where(models.GraphSnapshot.version_label == graphLabel)
+        .options(
+            joinedload(models.GraphSnapshot.creator),
+            joinedload(models.GraphSnapshot.base_snapshot),
+            selectinload(models.GraphSnapshot.nodes).selectinload(models.Node.source_items),
+            selectinload(models.GraphSnapshot.domains),
+            selectinload(models.GraphSnapshot.redirects),
+        )
+    )
+    snapshot = result.scalars().first()
+    if snapshot:
+        # Counts come from the eagerly loaded nodes, no extra COUNT queries needed
+        snapshot.node_count = len(snapshot.nodes)
+        snapshot.assessable_node_count = sum(1 for n in snapshot.nodes if n.assessable)
+
+        # Ensure last_updated is not null for serialization
+        if snapshot.last_updated is None:
+            snapshot.last_updated = snapshot.created_at
+    return snapshot
+
+# Listings build plain dicts, so the sync implementations can run unchanged on the async connection
+
+async def get_snapshots(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return await db.run_sync(lambda session: crud.get_snapshots(session, skip=skip, limit=limit))
+
+async def get_public_snapshots(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return await db.run_sync(lambda session: crud.get_public_snapshots(session, skip=skip, limit=limit))
+
+async def get_snapshot_page(db: AsyncSession, **filters):
+    return await db.run_sync(lambda session: crud.get_snapshot_page(session, **filters))
+
+async def get_latest_capability(db: AsyncSession, user_id: int, assessment_name: str, graph_label: str):
+    result = await db.execute(
+        select(models.Capability)
+        .where(
+            models.Capability.user_id == user_id,
+            models.Capability.assessment_name == assessment_name,
+            models.Capability.graph_label == graph_label
+        )
+        .order_by(models.Capability.assessment_date.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
@@ -1,9 +1,18 @@
+import base64
+import json
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from . import models, schemas
+from collections import defaultdict
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session, joinedload, aliased
+from sqlalchemy import func, case, or_, and_, insert
+from . import models, schemas, search, graph_validation, layout
 
 def create_snapshot(db: Session, snapshot_data: schemas.GraphSnapshotCreate):
+    # Rejects cycles, dangling references and malformed expressions before anything is written
+    deps = graph_validation.validate_snapshot(snapshot_data)
+    if snapshot_data.auto_layout:
+        layout.layout_snapshot_data(snapshot_data, deps)
+
     # Resolve creator and base graph references
     creator_id = None
     if snapshot_data.created_by:
@@ -28,7 +37,7 @@ def create_snapshot(db: Session, snapshot_data: schemas.GraphSnapshotCreate):
     db.commit()
     db.refresh(db_snapshot)
 
-    _populate_snapshot_data(db, db_snapshot, snapshot_data)
+    _populate_snapshot_data(db, db_snapshot, snapshot_data, deps)
     _populate_redirect_data(db, db_snapshot, snapshot_data)
     
     # Return with nodes populated
@@ -48,6 +57,10 @@ def create_snapshot(db: Session, snapshot_data: schemas.GraphSnapshotCreate):
     return db_snapshot
 
 def update_snapshot(db: Session, db_snapshot: models.GraphSnapshot, snapshot_data: schemas.GraphSnapshotCreate):
+    deps = graph_validation.validate_snapshot(snapshot_data)
+    if snapshot_data.auto_layout:
+        layout.layout_snapshot_data(snapshot_data, deps)
+
     # Update snapshot metadata
     # version_label is NOT updated on overwrite (it's the same graph)
     
@@ -66,8 +79,10 @@ def update_snapshot(db: Session, db_snapshot: models.GraphSnapshot, snapshot_dat
     # CRITICAL: created_by is NEVER updated during overwrite to preserve original authorship,
     # even if the current value is 'Unknown' or null.
     
-    # Explicitly update last_updated in case metadata didn't change but nodes/domains did
-    db_snapshot.last_updated = func.now()
+    # Explicitly update last_updated in case metadata didn't change but nodes/domains did.
+    # Set in Python for microsecond precision on every backend (SQLite's CURRENT_TIMESTAMP has
+    # whole seconds): caches keyed by snapshot version must see back-to-back saves.
+    db_snapshot.last_updated = datetime.now(timezone.utc)
     
     # Clear existing nodes and domains
     # Using delete(synchronize_session=False) for better performance and to avoid session issues
@@ -85,13 +100,14 @@ def update_snapshot(db: Session, db_snapshot: models.GraphSnapshot, snapshot_dat
     # Now delete nodes
     db.query(models.Node).filter(models.Node.snapshot_id == db_snapshot.id).delete(synchronize_session=False)
     db.query(models.Domain).filter(models.Domain.snapshot_id == db_snapshot.id).delete(synchronize_session=False)
-    db.query(models.NodeRedirect).filter(models.NodeRedirect.snapshot_id == db_snapshot.id).delete(synchronize_session=False)
+    # Redirects are kept: they chain across saves (see app.redirects)
+    db.query(models.NodeEdge).filter(models.NodeEdge.snapshot_id == db_snapshot.id).delete(synchronize_session=False)
 
 
     db.commit()
     
     # Re-populate
-    _populate_snapshot_data(db, db_snapshot, snapshot_data)
+    _populate_snapshot_data(db, db_snapshot, snapshot_data, deps)
     _populate_redirect_data(db, db_snapshot, snapshot_data)
     
     db.commit()
@@ -126,7 +142,7 @@ def update_snapshot_metadata(db: Session, db_snapshot: models.GraphSnapshot, sna
     
     return db_snapshot
 
-def _populate_snapshot_data(db: Session, db_snapshot: models.GraphSnapshot, snapshot_data: schemas.GraphSnapshotCreate):
+def _populate_snapshot_data(db: Session, db_snapshot: models.GraphSnapshot, snapshot_data: schemas.GraphSnapshotCreate, deps: Dict[int, List[int]]):
     # Create all domains linked to this snapshot
     domain_mapping = {} # local_id -> db_id (for local_id based references)
     domain_old_id_mapping = {} # old_db_id -> db_id (for db_id based references from import)
@@ -171,6 +187,12 @@ def _populate_snapshot_data(db: Session, db_snapshot: models.GraphSnapshot, snap
                             db.add(db_domain)
         db.commit()
 
+    # mentions (dependents) are derived from the parsed prerequisites rather than trusted from the client
+    dependents = defaultdict(list)
+    for node_id, prerequisite_ids in deps.items():
+        for prerequisite_id in prerequisite_ids:
+            dependents[prerequisite_id].append(node_id)
+
     # Create all nodes linked to this snapshot
     db_nodes = []
     for node_data in snapshot_data.nodes:
@@ -190,7 +212,7 @@ def _populate_snapshot_data(db: Session, db_snapshot: models.GraphSnapshot, snap
             title=node_data.title,
             description=node_data.description,
             prerequisite=node_data.prerequisite,
-            mentions=node_data.mentions,
+            mentions=",".join(map(str, sorted(dependents[node_data.local_id]))) or None,
             domain_id=resolved_domain_id,
             assessable=node_data.assessable,
             x=node_data.x,
@@ -214,40 +236,70 @@ def _populate_snapshot_data(db: Session, db_snapshot: models.GraphSnapshot, snap
         db_nodes.append(db_node)
     
     db.add_all(db_nodes)
+    _populate_edges(db, db_snapshot.id, deps)
     db.commit()
 
+def _populate_edges(db: Session, snapshot_id: int, deps: Dict[int, List[int]]):
+    rows = [
+        {"snapshot_id": snapshot_id, "to_local_id": node_id, "from_local_id": prerequisite_id}
+        for node_id, prerequisite_ids in deps.items()
+        for prerequisite_id in prerequisite_ids
+    ]
+    if rows:
+        db.execute(insert(models.NodeEdge), rows)
+
 def _populate_redirect_data(db: Session, db_snapshot: models.GraphSnapshot, snapshot_data: schemas.GraphSnapshotCreate):
-    if snapshot_data.redirects:
-        db_redirects = []
-        for old_id, new_id in snapshot_data.redirects.items():
-            # Only save if new_id exists in the current snapshot's nodes
-            # Note: snapshot_data.nodes is a list of NodeCreate objects
-            if any(n.local_id == new_id for n in snapshot_data.nodes):
-                db_redirect = models.NodeRedirect(
-                    snapshot_id=db_snapshot.id,
-                    old_local_id=int(old_id),
-                    new_local_id=new_id
-                )
-                db_redirects.append(db_redirect)
-        db.add_all(db_redirects)
-        db.commit()
+    if not snapshot_data.redirects:
+        return
+    # Only save redirects whose target exists in the current snapshot's nodes
+    node_ids = {n.local_id for n in snapshot_data.nodes}
+    redirects = {}
+    for old_id, new_id in snapshot_data.redirects.items():
+        old_id = int(old_id)
+        if new_id in node_ids and old_id != new_id:
+            redirects[old_id] = new_id
+    if not redirects:
+        return
+    # A new redirect for an old id supersedes the earlier one; all others stay
+    db.query(models.NodeRedirect).filter(
+        models.NodeRedirect.snapshot_id == db_snapshot.id,
+        models.NodeRedirect.old_local_id.in_(list(redirects))
+    ).delete(synchronize_session=False)
+    db.add_all([
+        models.NodeRedirect(snapshot_id=db_snapshot.id, old_local_id=old_id, new_local_id=new_id)
+        for old_id, new_id in redirects.items()
+    ])
+    db.commit()
+
+def _summarize_snapshots(db: Session, snapshots: List[models.GraphSnapshot]):
+    # Count nodes, assessable nodes and redirects for the whole page with grouped queries
+    # instead of three COUNT queries per snapshot
+    snapshot_ids = [s.id for s in snapshots]
+    node_counts = {}
+    redirect_counts = {}
+    if snapshot_ids:
+        rows = db.query(
+            models.Node.snapshot_id,
+            func.count(models.Node.id),
+            func.sum(case((models.Node.assessable == True, 1), else_=0))
+        ).filter(models.Node.snapshot_id.in_(snapshot_ids)).group_by(models.Node.snapshot_id).all()
+        node_counts = {snapshot_id: (count, assessable or 0) for snapshot_id, count, assessable in rows}
+
+        rows = db.query(
+            models.NodeRedirect.snapshot_id,
+            func.count(models.NodeRedirect.id)
+        ).filter(models.NodeRedirect.snapshot_id.in_(snapshot_ids)).group_by(models.NodeRedirect.snapshot_id).all()
+        redirect_counts = dict(rows)
 
-def get_snapshots(db: Session, skip: int = 0, limit: int = 100):
-    # Fetch snapshots
-    snapshots = db.query(models.GraphSnapshot).order_by(models.GraphSnapshot.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Annotate with node count
     results = []
     for s in snapshots:
-        count = db.query(func.count(models.Node.id)).filter(models.Node.snapshot_id == s.id).scalar()
-        assessable_count = db.query(func.count(models.Node.id)).filter(models.Node.snapshot_id == s.id, models.Node.assessable == True).scalar()
-        redirect_count = db.query(func.count(models.NodeRedirect.id)).filter(models.NodeRedirect.snapshot_id == s.id).scalar()
-        
+        count, assessable_count = node_counts.get(s.id, (0, 0))
+
         # Ensure dates are JSON serializable and handle potential None values
         # Fallback to created_at if last_updated is somehow null
         created_at = s.created_at
         last_updated = s.last_updated if s.last_updated else s.created_at
-        
+
         results.append({
             "id": s.id,
             "created_at": created_at,
@@ -257,38 +309,95 @@ def get_snapshots(db: Session, skip: int = 0, limit: int = 100):
             "created_by": s.created_by,
             "node_count": count,
             "assessable_node_count": assessable_count,
-            "redirect_count": redirect_count,
+            "redirect_count": redirect_counts.get(s.id, 0),
             "is_public": s.is_public
         })
     return results
 
+def _summary_query(db: Session):
+    # creator and base_snapshot back the created_by/base_graph properties, load them in the same query
+    return db.query(models.GraphSnapshot).options(
+        joinedload(models.GraphSnapshot.creator),
+        joinedload(models.GraphSnapshot.base_snapshot)
+    )
+
+def get_snapshots(db: Session, skip: int = 0, limit: int = 100):
+    snapshots = _summary_query(db).order_by(models.GraphSnapshot.created_at.desc()).offset(skip).limit(limit).all()
+    return _summarize_snapshots(db, snapshots)
+
 def get_public_snapshots(db: Session, skip: int = 0, limit: int = 100):
-    # Fetch public snapshots
-    snapshots = db.query(models.GraphSnapshot).filter(models.GraphSnapshot.is_public == True).order_by(models.GraphSnapshot.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Annotate with node count
-    results = []
-    for s in snapshots:
-        count = db.query(func.count(models.Node.id)).filter(models.Node.snapshot_id == s.id).scalar()
-        assessable_count = db.query(func.count(models.Node.id)).filter(models.Node.snapshot_id == s.id, models.Node.assessable == True).scalar()
-        redirect_count = db.query(func.count(models.NodeRedirect.id)).filter(models.NodeRedirect.snapshot_id == s.id).scalar()
-        
-        created_at = s.created_at
-        last_updated = s.last_updated if s.last_updated else s.created_at
-        
-        results.append({
-            "id": s.id,
-            "created_at": created_at,
-            "last_updated": last_updated,
-            "version_label": s.version_label,
-            "base_graph": s.base_graph,
-            "created_by": s.created_by,
-            "node_count": count,
-            "assessable_node_count": assessable_count,
-            "redirect_count": redirect_count,
-            "is_public": s.is_public
-        })
-    return results
+    snapshots = _summary_query(db).filter(models.GraphSnapshot.is_public == True).order_by(models.GraphSnapshot.created_at.desc()).offset(skip).limit(limit).all()
+    return _summarize_snapshots(db, snapshots)
+
+def encode_snapshot_cursor(created_at: datetime, snapshot_id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), snapshot_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_snapshot_cursor(cursor: str):
+    """Inverse of encode_snapshot_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, snapshot_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(snapshot_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def get_snapshot_page(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    created_by: Optional[str] = None,
+    is_public: Optional[bool] = None,
+    base_graph: Optional[str] = None,
+    label_prefix: Optional[str] = None,
+):
+    """
+    Keyset pagination over snapshots ordered by (created_at, id) descending.
+    The cursor marks the last row of the previous page, so every page is a single
+    index range scan no matter how deep it is.
+    Returns (summaries, next_cursor); next_cursor is None on the last page.
+    """
+    query = _summary_query(db)
+
+    if created_by is not None:
+        creator_id = db.query(models.User.id).filter(models.User.username == created_by).scalar_subquery()
+        query = query.filter(models.GraphSnapshot.created_by_id == creator_id)
+    if is_public is not None:
+        query = query.filter(models.GraphSnapshot.is_public == is_public)
+    if base_graph is not None:
+        base_alias = aliased(models.GraphSnapshot)
+        base_id = db.query(base_alias.id).filter(base_alias.version_label == base_graph).scalar_subquery()
+        query = query.filter(models.GraphSnapshot.base_graph_id == base_id)
+    if label_prefix:
+        query = query.filter(models.GraphSnapshot.version_label.startswith(label_prefix, autoescape=True))
+
+    if cursor:
+        cursor_created_at, cursor_id = decode_snapshot_cursor(cursor)
+        created_at_col = models.GraphSnapshot.created_at
+        cursor_value = cursor_created_at
+        if db.get_bind().dialect.name == "sqlite":
+            # SQLite keeps server-default timestamps as 'YYYY-MM-DD HH:MM:SS' text while bound
+            # datetimes carry microseconds, so compare both sides in the same canonical form
+            created_at_col = func.datetime(created_at_col)
+            cursor_value = func.datetime(cursor_created_at.strftime("%Y-%m-%d %H:%M:%S"))
+        query = query.filter(or_(
+            created_at_col < cursor_value,
+            and_(created_at_col == cursor_value, models.GraphSnapshot.id < cursor_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    snapshots = query.order_by(
+        models.GraphSnapshot.created_at.desc(),
+        models.GraphSnapshot.id.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(snapshots) > limit:
+        snapshots = snapshots[:limit]
+        last = snapshots[-1]
+        next_cursor = encode_snapshot_cursor(last.created_at, last.id)
+
+    return _summarize_snapshots(db, snapshots), next_cursor
 
 def get_snapshot(db: Session, snapshot_id: int):
     snapshot = db.query(models.GraphSnapshot).filter(models.GraphSnapshot.id == snapshot_id).first()
@@ -308,11 +417,249 @@ def get_snapshot(db: Session, snapshot_id: int):
 def delete_snapshot(db: Session, snapshot_id: int):
     snapshot = db.query(models.GraphSnapshot).filter(models.GraphSnapshot.id == snapshot_id).first()
     if snapshot:
+        db.query(models.NodeEdge).filter(models.NodeEdge.snapshot_id == snapshot.id).delete(synchronize_session=False)
         db.delete(snapshot)
         db.commit()
         return True
     return False
 
+def get_snapshot_version(db: Session, graphLabel: str):
+    """(id, last_updated, is_public, created_by_id) for a label: enough to key per-version caches."""
+    return (
+        db.query(
+            models.GraphSnapshot.id,
+            models.GraphSnapshot.last_updated,
+            models.GraphSnapshot.is_public,
+            models.GraphSnapshot.created_by_id,
+        )
+        .filter(models.GraphSnapshot.version_label == graphLabel)
+        .first()
+    )
+
+# --- Prerequisite edge index ---
+
+EDGE_QUERY_CHUNK = 500
+# Deeper traversals load the snapshot's whole edge list once instead of one query per hop
+PER_HOP_QUERY_LIMIT = 8
+
+def _edges_touching(db: Session, snapshot_id: int, ids, column):
+    ids = list(ids)
+    edges = []
+    for start in range(0, len(ids), EDGE_QUERY_CHUNK):
+        edges.extend(
+            db.query(models.NodeEdge.from_local_id, models.NodeEdge.to_local_id)
+            .filter(models.NodeEdge.snapshot_id == snapshot_id, column.in_(ids[start:start + EDGE_QUERY_CHUNK]))
+            .all()
+        )
+    return edges
+
+def get_node_neighborhood(db: Session, snapshot_id: int, local_id: int, direction: str = "both", hops: int = 1):
+    """Nodes within `hops` prerequisite steps of local_id, as ({local_id: distance}, edges).
+
+    direction: "dependencies" (what it requires), "dependents" (what requires it) or "both".
+    Edges are (from_local_id, to_local_id) pairs, prerequisite first.
+    """
+    follow_dependencies = direction in ("dependencies", "both")
+    follow_dependents = direction in ("dependents", "both")
+
+    adjacency = None
+    if hops > PER_HOP_QUERY_LIMIT:
+        adjacency = defaultdict(list)
+        for edge in db.query(models.NodeEdge.from_local_id, models.NodeEdge.to_local_id).filter(models.NodeEdge.snapshot_id == snapshot_id):
+            adjacency[edge.to_local_id].append(edge)
+            adjacency[edge.from_local_id].append(edge)
+
+    distances = {local_id: 0}
+    edges = set()
+    frontier = [local_id]
+    for distance in range(1, hops + 1):
+        if not frontier:
+            break
+        if adjacency is not None:
+            candidates = [edge for node_id in frontier for edge in adjacency.get(node_id, ())]
+        else:
+            candidates = []
+            if follow_dependencies:
+                candidates += _edges_touching(db, snapshot_id, frontier, models.NodeEdge.to_local_id)
+            if follow_dependents:
+                candidates += _edges_touching(db, snapshot_id, frontier, models.NodeEdge.from_local_id)
+
+        frontier_set = set(frontier)
+        next_frontier = []
+        for from_id, to_id in candidates:
+            if follow_dependencies and to_id in frontier_set:
+                neighbor = from_id
+            elif follow_dependents and from_id in frontier_set:
+                neighbor = to_id
+            else:
+                continue
+            edges.add((from_id, to_id))
+            if neighbor not in distances:
+                distances[neighbor] = distance
+                next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances, sorted(edges)
+
+def get_node_titles(db: Session, snapshot_id: int, local_ids) -> Dict[int, str]:
+    local_ids = list(local_ids)
+    titles = {}
+    for start in range(0, len(local_ids), EDGE_QUERY_CHUNK):
+        titles.update(
+            db.query(models.Node.local_id, models.Node.title)
+            .filter(models.Node.snapshot_id == snapshot_id, models.Node.local_id.in_(local_ids[start:start + EDGE_QUERY_CHUNK]))
+            .all()
+        )
+    return titles
+
+# --- Level-of-detail reads ---
+# The outline is the domain tree with aggregated counts plus the nodes of expanded domains, without
+# descriptions or sources; everything else is fetched per domain / per node on demand.
+
+_NODE_SUMMARY_COLUMNS = (
+    models.Node.local_id, models.Node.title, models.Node.prerequisite, models.Node.domain_id,
+    models.Node.x, models.Node.y, models.Node.assessable,
+)
+
+def _node_summaries(rows, domain_local_ids: Dict[int, int]) -> List[dict]:
+    return [
+        {
+            "local_id": row.local_id, "title": row.title, "prerequisite": row.prerequisite,
+            "domain_local_id": domain_local_ids.get(row.domain_id), "x": row.x, "y": row.y, "assessable": row.assessable,
+        }
+        for row in rows
+    ]
+
+def get_graph_outline(db: Session, snapshot_id: int, expand: Optional[List[int]] = None, collapse: Optional[List[int]] = None) -> dict:
+    """Domain tree with subtree counts and centroids, and the nodes visible with the stored
+    collapsed flags overridden by expand / collapse (domain local ids)."""
+    domains = (
+        db.query(models.Domain.id, models.Domain.local_id, models.Domain.title, models.Domain.description,
+                 models.Domain.parent_id, models.Domain.collapsed)
+        .filter(models.Domain.snapshot_id == snapshot_id)
+        .order_by(models.Domain.local_id)
+        .all()
+    )
+    stats = {
+        row.domain_id: row
+        for row in db.query(
+            models.Node.domain_id,
+            func.count(models.Node.id).label("nodes"),
+            func.sum(case((models.Node.assessable == True, 1), else_=0)).label("assessable"),
+            func.count(models.Node.x).label("placed"),
+            func.sum(models.Node.x).label("sum_x"),
+            func.sum(models.Node.y).label("sum_y"),
+        )
+        .filter(models.Node.snapshot_id == snapshot_id)
+        .group_by(models.Node.domain_id)
+        .all()
+    }
+
+    by_id = {d.id: d for d in domains}
+    local_of = {d.id: d.local_id for d in domains}
+    children = defaultdict(list)
+    for d in domains:
+        if d.parent_id in by_id:
+            children[d.parent_id].append(d.id)
+    expand, collapse = set(expand or ()), set(collapse or ())
+    collapsed = {d.id: (d.collapsed and d.local_id not in expand) or d.local_id in collapse for d in domains}
+
+    # Subtree totals, children before parents (iterative post-order; parent loops are cut)
+    totals = {}
+    for root in [d.id for d in domains if d.parent_id not in by_id] + [d.id for d in domains]:
+        stack = [(root, False)]
+        while stack:
+            domain_id, done = stack.pop()
+            if not done:
+                if domain_id in totals:
+                    continue
+                totals[domain_id] = None
+                stack.append((domain_id, True))
+                stack.extend((child, False) for child in children[domain_id] if child not in totals)
+                continue
+            row = stats.get(domain_id)
+            total = [row.nodes, row.assessable or 0, row.placed, row.sum_x or 0, row.sum_y or 0] if row else [0, 0, 0, 0, 0]
+            for child in children[domain_id]:
+                if totals.get(child):
+                    total = [a + b for a, b in zip(total, totals[child])]
+            totals[domain_id] = total
+
+    # A domain's nodes are shown when it and all its ancestors are expanded
+    visible = set()
+    for d in domains:
+        domain_id, seen = d.id, set()
+        while domain_id in by_id and not collapsed[domain_id] and domain_id not in seen:
+            seen.add(domain_id)
+            domain_id = by_id[domain_id].parent_id
+        if domain_id not in by_id:
+            visible.add(d.id)
+
+    outline_domains = []
+    for d in domains:
+        row = stats.get(d.id)
+        nodes, assessable, placed, sum_x, sum_y = totals[d.id]
+        outline_domains.append({
+            "local_id": d.local_id, "title": d.title, "description": d.description,
+            "parent_local_id": local_of.get(d.parent_id), "collapsed": collapsed[d.id], "expanded": d.id in visible,
+            "node_count": row.nodes if row else 0, "total_node_count": nodes, "assessable_count": assessable,
+            "x": round(sum_x / placed) if placed else None, "y": round(sum_y / placed) if placed else None,
+        })
+
+    rows = (
+        db.query(*_NODE_SUMMARY_COLUMNS)
+        .filter(models.Node.snapshot_id == snapshot_id, or_(models.Node.domain_id.is_(None), models.Node.domain_id.in_(visible)))
+        .order_by(models.Node.local_id)
+        .all()
+    )
+    return {
+        "node_count": sum(row.nodes for row in stats.values()),
+        "assessable_node_count": sum(row.assessable or 0 for row in stats.values()),
+        "domains": outline_domains,
+        "nodes": _node_summaries(rows, local_of),
+    }
+
+def get_domain_nodes(db: Session, snapshot_id: int, domain_local_id: int, recursive: bool = False) -> Optional[List[dict]]:
+    """Node summaries of one domain (and its sub-domains when recursive); None if the domain doesn't exist."""
+    domains = db.query(models.Domain.id, models.Domain.local_id, models.Domain.parent_id).filter(models.Domain.snapshot_id == snapshot_id).all()
+    local_of = {d.id: d.local_id for d in domains}
+    root = next((d.id for d in domains if d.local_id == domain_local_id), None)
+    if root is None:
+        return None
+    members = {root}
+    if recursive:
+        children = defaultdict(list)
+        for d in domains:
+            children[d.parent_id].append(d.id)
+        stack = [root]
+        while stack:
+            for child in children[stack.pop()]:
+                if child not in members:
+                    members.add(child)
+                    stack.append(child)
+    rows = (
+        db.query(*_NODE_SUMMARY_COLUMNS)
+        .filter(models.Node.snapshot_id == snapshot_id, models.Node.domain_id.in_(members))
+        .order_by(models.Node.local_id)
+        .all()
+    )
+    return _node_summaries(rows, local_of)
+
+def get_node(db: Session, snapshot_id: int, local_id: int):
+    node = (
+        db.query(models.Node)
+        .options(joinedload(models.Node.source_items), joinedload(models.Node.domain))
+        .filter(models.Node.snapshot_id == snapshot_id, models.Node.local_id == local_id)
+        .first()
+    )
+    if node is not None:
+        node.domain_local_id = node.domain.local_id if node.domain else None
+    return node
+
+def get_node_sources(db: Session, snapshot_id: int, local_id: int) -> Optional[List[models.Source]]:
+    node_id = db.query(models.Node.id).filter(models.Node.snapshot_id == snapshot_id, models.Node.local_id == local_id).scalar()
+    if node_id is None:
+        return None
+    return db.query(models.Source).filter(models.Source.node_id == node_id).order_by(models.Source.id).all()
+
 def get_snapshot_by_label(db: Session, graphLabel: str):
     snapshot = db.query(models.GraphSnapshot).filter(models.GraphSnapshot.version_label == graphLabel).first()
     if snapshot:
@@ -331,11 +678,44 @@ def get_snapshot_by_label(db: Session, graphLabel: str):
 def delete_snapshot_by_label(db: Session, graphLabel: str):
     snapshot = get_snapshot_by_label(db, graphLabel)
     if snapshot:
+        db.query(models.NodeEdge).filter(models.NodeEdge.snapshot_id == snapshot.id).delete(synchronize_session=False)
         db.delete(snapshot)
         db.commit()
         return True
     return False
 
+def serialize_snapshot_export(snapshot: models.GraphSnapshot) -> str:
+    """The .knw export document of a snapshot loaded with get_snapshot_by_label."""
+    # Use model_validate for Pydantic v2 compatibility
+    snapshot_data = schemas.GraphSnapshotRead.model_validate(snapshot)
+    return json.dumps(snapshot_data.model_dump(), indent=2, default=str)
+
+def snapshot_create_from_export(data: dict) -> schemas.GraphSnapshotCreate:
+    """Convert a parsed .knw export document into a create payload. Raises on invalid data."""
+    # Strip top-level read-only fields that might confuse creation
+    data.pop('id', None)
+    data.pop('created_at', None)
+    data.pop('last_updated', None)
+    data.pop('node_count', None)
+
+    # Ensure metadata defaults if missing
+    if 'base_graph' not in data:
+        data['base_graph'] = None
+
+    if 'created_by' not in data:
+        data['created_by'] = "Unknown"
+
+    # Handle redirects mapping for import
+    if 'redirects' in data and isinstance(data['redirects'], list):
+        # If it's the Read format (list of objects), convert to Create format (dict old_id -> new_id)
+        redirects_map = {}
+        for r in data['redirects']:
+            if isinstance(r, dict) and 'old_local_id' in r and 'new_local_id' in r:
+                redirects_map[str(r['old_local_id'])] = r['new_local_id']
+        data['redirects'] = redirects_map
+
+    return schemas.GraphSnapshotCreate(**data)
+
 # --- User CRUD ---
 
 def get_user_by_username(db: Session, username: str):
@@ -358,9 +738,16 @@ def update_user(db: Session, db_user: models.User, user_update: schemas.UserProf
     db.refresh(db_user)
     return db_user
 
+def update_user_password_hash(db: Session, db_user: models.User, hashed_password: str):
+    db_user.hashed_password = hashed_password
+    db.add(db_user)
+    db.commit()
+    return db_user
+
 def delete_user_by_username(db: Session, username: str):
     user = db.query(models.User).filter(models.User.username == username).first()
     if user:
+        db.query(models.Job).filter(models.Job.user_id == user.id).delete(synchronize_session=False)
         db.delete(user)
         db.commit()
         return True
@@ -397,27 +784,23 @@ def delete_invitation(db: Session, code: str):
 
 # --- Assessment & Capability CRUD ---
 
-def search_snapshots(db: Session, query: str, limit: int = 10):
-    snapshots = db.query(models.GraphSnapshot).filter(
-        models.GraphSnapshot.version_label.ilike(f"%{query}%")
-    ).limit(limit).all()
-    
-    for s in snapshots:
-        # Compute node counts for the summary
-        count = db.query(func.count(models.Node.id)).filter(models.Node.snapshot_id == s.id).scalar()
-        s.node_count = count
-        
-        assessable_count = db.query(func.count(models.Node.id)).filter(models.Node.snapshot_id == s.id, models.Node.assessable == True).scalar()
-        s.assessable_node_count = assessable_count
-        
-        # Add redirect count for GraphSnapshotSummary
-        redirect_count = db.query(func.count(models.NodeRedirect.id)).filter(models.NodeRedirect.snapshot_id == s.id).scalar()
-        s.redirect_count = redirect_count
-        
-        if s.last_updated is None:
-            s.last_updated = s.created_at
-            
-    return snapshots
+def search_snapshots(db: Session, query: str, limit: int = 10, nodes_per_graph: int = 5):
+    ranked = search.search(db, query, limit=limit, nodes_per_graph=nodes_per_graph)
+    if not ranked:
+        return []
+
+    snapshots = _summary_query(db).filter(models.GraphSnapshot.id.in_([r[0] for r in ranked])).all()
+    summaries = {summary["id"]: summary for summary in _summarize_snapshots(db, snapshots)}
+
+    results = []
+    for snapshot_id, score, hits in ranked:
+        summary = summaries.get(snapshot_id)
+        if summary is None:
+            continue
+        summary["score"] = score
+        summary["node_hits"] = [hit._asdict() for hit in hits]
+        results.append(summary)
+    return results
 
 def create_capability(db: Session, user_id: int, capability_data: schemas.CapabilityCreate):
     # Ensure assessed_nodes are serialized to JSON-compatible format
@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
-from urllib.parse import urlparse
+import threading
+from .db_pool import pool_settings, InstrumentedQueuePool, instrument as instrument_pool
+from . import metrics
 
 # Try to load environment variables from .env file for local development
 try:
@@ -15,80 +16,210 @@ except ImportError:
 # Possible values: "production", "docker", "local"
 APP_MODE = os.getenv("APP_MODE", "production" if os.getenv("RENDER") else "local")
 # APP_MODE = "docker"   # Forcing docker for local development
-print(f"INFO: Application running in {APP_MODE} mode")
-
-# Isolated Pipeline Configurations
-if APP_MODE == "production":
-    # --- PRODUCTION PIPELINE (RENDER) ---
-    SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
-    
-    if not SQLALCHEMY_DATABASE_URL:
-        # Check all env vars for fallback (Render sometimes uses different keys)
-        for key, value in os.environ.items():
-            if "DATABASE_URL" in key.upper() or "POSTGRES_URL" in key.upper():
-                SQLALCHEMY_DATABASE_URL = value
-                break
-
-    if not SQLALCHEMY_DATABASE_URL:
-        raise RuntimeError("CRITICAL: DATABASE_URL not found in production mode!")
-
-    # SQLAlchemy requires "postgresql://"
-    if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-        SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-    engine_args = {
-        "pool_pre_ping": True,
-        "pool_recycle": 300,
-        "pool_size": 3,
-        "max_overflow": 2,
-        "pool_timeout": 30,
-    }
-    
-    # Enforce SSL for production
-    if "sslmode" not in SQLALCHEMY_DATABASE_URL:
-        engine_args["connect_args"] = {"sslmode": "require"}
 
+# Optional read replica. When set, read-only endpoints (listings, snapshot reads, search, public
+# gallery) use it via get_read_db; writes, auth and read-your-writes flows stay on the primary.
+REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+REPLICA_ENABLED = bool(REPLICA_URL)
+
+# Engines are created lazily on first use (get_engine / get_async_engine), so importing this
+# module never touches the network. On a cold start the first connection is made by the
+# migration check in main.lifespan.
+_engine = None
+_replica_engine = None
+_async_engines = {}  # "primary" / "replica" -> AsyncEngine
+_engine_lock = threading.Lock()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+Base = declarative_base()
+
+def _resolve_engine_config(replica: bool = False):
+    """Return (database_url, engine_args) for the current APP_MODE, for the primary or the replica."""
+    # Isolated Pipeline Configurations
+    if APP_MODE == "production":
+        # --- PRODUCTION PIPELINE (RENDER) ---
+        database_url = os.getenv("DATABASE_URL")
+
+        if not database_url:
+            # Check all env vars for fallback (Render sometimes uses different keys)
+            for key, value in os.environ.items():
+                if "DATABASE_URL" in key.upper() or "POSTGRES_URL" in key.upper():
+                    database_url = value
+                    break
+
+        if not database_url:
+            raise RuntimeError("CRITICAL: DATABASE_URL not found in production mode!")
+
+        if replica:
+            database_url = REPLICA_URL
+
+        # SQLAlchemy requires "postgresql://"
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace("postgres://", "postgresql://", 1)
+
+        engine_args = pool_settings({
+            "pool_recycle": 300,
+            "pool_size": 3,
+            "max_overflow": 2,
+            "pool_timeout": 30,
+        })
+
+        # Enforce SSL for production
+        if "sslmode" not in database_url:
+            engine_args["connect_args"] = {"sslmode": "require"}
+
+    elif APP_MODE == "docker":
+        # --- DOCKER PIPELINE (POSTGRES) ---
+        # In Docker, we expect DATABASE_URL to be set, otherwise default to the service name
+        database_url = os.getenv("DATABASE_URL", "postgresql://postgres:postgrespassword@db:5432/brotherhood")
+        if replica:
+            database_url = REPLICA_URL
+
+        engine_args = pool_settings({
+            "pool_size": 5,
+            "max_overflow": 10
+        })
+
+    else:
+        # --- LOCAL PIPELINE (SQLITE) ---
+        # Local development uses SQLite for simplicity and zero setup
+        database_url = os.getenv("SQLALCHEMY_DATABASE_URL", "sqlite:///./brotherhood.db")
+        if replica:
+            database_url = REPLICA_URL
+        engine_args = pool_settings({})
+        if database_url.startswith("sqlite"):
+            engine_args["connect_args"] = {"check_same_thread": False}  # Required for SQLite + FastAPI
+
+    return database_url, engine_args
+
+def _create_engine(replica: bool = False):
+    from sqlalchemy import create_engine
+
+    role = "replica" if replica else "primary"
+    database_url, engine_args = _resolve_engine_config(replica)
+    if not replica:
+        print(f"INFO: Application running in {APP_MODE} mode")
+    if APP_MODE == "local":
+        print(f"INFO: Using local {role} database at {database_url}")
+    if ":memory:" not in database_url:
+        engine_args = dict(engine_args, poolclass=InstrumentedQueuePool)
     try:
-        engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_args)
-        # Verify connection immediately
-        with engine.connect() as conn:
-            pass
-    except Exception as e:
-        raise RuntimeError(f"CRITICAL: Failed to connect to production database: {e}")
-
-elif APP_MODE == "docker":
-    # --- DOCKER PIPELINE (POSTGRES) ---
-    # In Docker, we expect DATABASE_URL to be set, otherwise default to the service name
-    SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgrespassword@db:5432/brotherhood")
-    
-    engine_args = {
-        "pool_pre_ping": True,
-        "pool_size": 5,
-        "max_overflow": 10
-    }
-    
-    try:
-        engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_args)
+        engine = create_engine(database_url, **engine_args)
     except Exception as e:
-        raise RuntimeError(f"CRITICAL: Failed to connect to Docker database: {e}")
-
-else:
-    # --- LOCAL PIPELINE (SQLITE) ---
-    # Local development uses SQLite for simplicity and zero setup
-    SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL", "sqlite:///./brotherhood.db")
-    print(f"INFO: Using local SQLite database at {SQLALCHEMY_DATABASE_URL}")
-    
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, 
-        connect_args={"check_same_thread": False} # Required for SQLite + FastAPI
-    )
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+        raise RuntimeError(f"CRITICAL: Failed to create {APP_MODE} {role} database engine: {e}")
+    if ":memory:" not in database_url:
+        instrument_pool(engine, role)
+    metrics.instrument_engine(engine)
+    return engine
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = _create_engine()
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+def get_replica_engine():
+    """The read replica engine, or the primary when no replica is configured."""
+    global _replica_engine
+    if not REPLICA_ENABLED:
+        return get_engine()
+    if _replica_engine is None:
+        with _engine_lock:
+            if _replica_engine is None:
+                engine = _create_engine(replica=True)
+                ReadSessionLocal.configure(bind=engine)
+                _replica_engine = engine
+    return _replica_engine
+
+def __getattr__(name):
+    # Backwards compatible `database.engine` attribute, resolved lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_read_db(use_primary: bool = False):
+    """Session for read-only work: the replica if configured, unless the caller needs the primary."""
+    if use_primary or not REPLICA_ENABLED:
+        yield from get_db()
+        return
+    get_replica_engine()
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# --- ASYNC PIPELINE (OPTIONAL) ---
+# When ASYNC_DB is enabled the hot read paths (auth lookup, snapshot reads, listings,
+# capabilities) run on an asyncio engine instead of the threadpool.
+# Postgres uses asyncpg, SQLite uses aiosqlite; the sync engine above is still used for writes.
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB", "false").lower() in ("1", "true", "yes")
+
+_async_sessionmakers = {}
+
+def _to_async_url(url: str):
+    from sqlalchemy.engine import make_url
+
+    async_url = make_url(url)
+    query = dict(async_url.query)
+    connect_args = {}
+    if async_url.get_backend_name() == "postgresql":
+        # asyncpg does not understand libpq's sslmode parameter
+        sslmode = query.pop("sslmode", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        async_url = async_url.set(drivername="postgresql+asyncpg", query=query)
+    elif async_url.get_backend_name() == "sqlite":
+        async_url = async_url.set(drivername="sqlite+aiosqlite")
+    return async_url, connect_args
+
+def get_async_engine(replica: bool = False):
+    role = "replica" if replica and REPLICA_ENABLED else "primary"
+    if role not in _async_engines:
+        with _engine_lock:
+            if role not in _async_engines:
+                from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+                database_url, engine_args = _resolve_engine_config(role == "replica")
+                async_url, async_connect_args = _to_async_url(database_url)
+                async_engine_args = {}
+                if async_url.get_backend_name() == "postgresql":
+                    async_engine_args = {k: v for k, v in engine_args.items() if k != "connect_args"}
+                    if APP_MODE == "production" and "ssl" not in async_connect_args:
+                        async_connect_args["ssl"] = "require"
+                if async_connect_args:
+                    async_engine_args["connect_args"] = async_connect_args
+
+                engine = create_async_engine(async_url, **async_engine_args)
+                metrics.instrument_engine(engine.sync_engine)
+                # expire_on_commit=False so objects stay readable after the session closes (response serialization)
+                _async_sessionmakers[role] = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+                _async_engines[role] = engine
+                print(f"INFO: Async database layer enabled for {role} ({async_url.drivername})")
+    return _async_engines[role]
+
+def async_session(replica: bool = False):
+    get_async_engine(replica)
+    role = "replica" if replica and REPLICA_ENABLED else "primary"
+    return _async_sessionmakers[role]()
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
+async def get_async_read_db(use_primary: bool = False):
+    async with async_session(replica=not use_primary) as db:
+        yield db
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Connection pool sizing and telemetry.
+#
+# Sizing: every setting can be overridden with DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+# DB_POOL_RECYCLE. Alternatively DB_MAX_CONNECTIONS sets the total connection budget for the
+# service, which is split across the WEB_CONCURRENCY worker processes.
+#
+# Liveness: pre-ping costs a round-trip on every checkout, so it is off unless DB_POOL_PRE_PING
+# is set. Stale connections are handled when they fail instead: SQLAlchemy invalidates the whole
+# pool on a disconnect error, and pool_recycle retires connections before server-side timeouts.
+
+_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "checkins": 0,
+    "connects": 0,
+    "invalidations": 0,
+    "disconnects": 0,
+    "timeouts": 0,
+    "waits": 0,  # checkouts that had to block for a connection (> 1ms)
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+_pools = []
+
+
+def _env_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
+def pool_settings(defaults: dict) -> dict:
+    """Apply configuration overrides on top of the per-mode pool defaults."""
+    settings = dict(defaults)
+
+    workers = max(_env_int("WEB_CONCURRENCY") or 1, 1)
+    budget = _env_int("DB_MAX_CONNECTIONS")
+    if budget:
+        per_worker = max(budget // workers, 1)
+        # Keep roughly a third of each worker's share as burst overflow
+        settings["pool_size"] = max(per_worker - per_worker // 3, 1)
+        settings["max_overflow"] = per_worker - settings["pool_size"]
+
+    for env_name, key in (
+        ("DB_POOL_SIZE", "pool_size"),
+        ("DB_MAX_OVERFLOW", "max_overflow"),
+        ("DB_POOL_TIMEOUT", "pool_timeout"),
+        ("DB_POOL_RECYCLE", "pool_recycle"),
+    ):
+        value = _env_int(env_name)
+        if value is not None:
+            settings[key] = value
+
+    settings["pool_pre_ping"] = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+    return settings
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection and how often they time out."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with _lock:
+                _stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with _lock:
+                _stats["wait_seconds_total"] += waited
+                if waited > _stats["wait_seconds_max"]:
+                    _stats["wait_seconds_max"] = waited
+                if waited > 0.001:
+                    _stats["waits"] += 1
+
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+def instrument(engine, name: str = "primary"):
+    """Attach pool event listeners to an engine created with InstrumentedQueuePool."""
+    _pools.append((name, engine.pool))
+
+    event.listen(engine.pool, "connect", lambda *args: _count("connects"))
+    event.listen(engine.pool, "checkout", lambda *args: _count("checkouts"))
+    event.listen(engine.pool, "checkin", lambda *args: _count("checkins"))
+    event.listen(engine.pool, "invalidate", lambda *args: _count("invalidations"))
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        if context.is_disconnect:
+            _count("disconnects")
+            # Drop every pooled connection, not just the failed one: they were opened before the
+            # same outage and would otherwise each fail once more on their next checkout
+            context.invalidate_pool_on_disconnect = True
+
+    return engine
+
+
+def get_stats() -> dict:
+    """Counters cover every pool; gauges are reported for the primary and nested under "replica"."""
+    with _lock:
+        stats = dict(_stats)
+    for name, pool in _pools:
+        if isinstance(pool, QueuePool):
+            gauges = {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "idle": pool.checkedin(),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+            }
+            if name == "primary":
+                stats.update(gauges)
+            else:
+                stats[name] = gauges
+    return stats
@@ -0,0 +1,170 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from typing import Optional
+
+# Structured error log.
+# Handlers only build a log record and put it on a bounded in-memory queue; a background
+# QueueListener thread formats it as one JSON object per line and writes it to a rotating file
+# (plus a one-line summary on stderr). Identical tracebacks are rate limited per fingerprint
+# (exception type + raising line), so an error storm costs each request a dictionary lookup
+# instead of a disk write. The next record that gets through reports how many were suppressed.
+
+ERROR_LOG_FILE = os.getenv("ERROR_LOG_FILE", "server_error.log")
+ERROR_LOG_MAX_BYTES = int(os.getenv("ERROR_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+ERROR_LOG_BACKUPS = int(os.getenv("ERROR_LOG_BACKUPS", "5"))
+# At most ERROR_LOG_RATE_LIMIT records per fingerprint every ERROR_LOG_RATE_WINDOW seconds
+ERROR_LOG_RATE_LIMIT = int(os.getenv("ERROR_LOG_RATE_LIMIT", "5"))
+ERROR_LOG_RATE_WINDOW = float(os.getenv("ERROR_LOG_RATE_WINDOW", "60"))
+ERROR_LOG_QUEUE_SIZE = 10_000
+
+logger = logging.getLogger("app.errors")
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_windows = {}  # fingerprint -> [window_start, emitted, suppressed]
+_stats = {"logged": 0, "suppressed": 0, "dropped": 0}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+class _SummaryFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        suppressed = fields.get("suppressed")
+        suffix = f" (+{suppressed} suppressed)" if suppressed else ""
+        return f"{record.levelname}: {getattr(record, 'event', '')}: {record.getMessage()}{suffix}"
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The traceback is already rendered into record.fields; skip QueueHandler's formatting
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block the caller on a backed-up writer
+            with _lock:
+                _stats["dropped"] += 1
+
+
+def start():
+    """Start the background writer. Idempotent; called from the app lifespan."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        log_queue = queue.Queue(maxsize=ERROR_LOG_QUEUE_SIZE)
+
+        handlers = []
+        try:
+            directory = os.path.dirname(ERROR_LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                ERROR_LOG_FILE, maxBytes=ERROR_LOG_MAX_BYTES, backupCount=ERROR_LOG_BACKUPS, encoding="utf-8",
+                delay=True,  # no empty log file until something is logged
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        except OSError as e:
+            print(f"WARNING: Error log file {ERROR_LOG_FILE} unavailable, logging to stderr only: {e}")
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(_SummaryFormatter())
+        handlers.append(console)
+
+        logger.handlers = [_DroppingQueueHandler(log_queue)]
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=False)
+        _listener.start()
+
+
+def stop():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def _fingerprint(exc: BaseException) -> str:
+    tb = exc.__traceback__
+    location = ""
+    while tb is not None:
+        location = f"{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}"
+        tb = tb.tb_next
+    return f"{type(exc).__module__}.{type(exc).__qualname__}@{location}"
+
+
+def _admit(fingerprint: str):
+    """Returns None to suppress this record, otherwise the number suppressed since the last one."""
+    now = time.monotonic()
+    with _lock:
+        window = _windows.get(fingerprint)
+        if window is None or now - window[0] >= ERROR_LOG_RATE_WINDOW:
+            suppressed = window[2] if window else 0
+            if len(_windows) >= 1024:
+                # Forget fingerprints whose window has closed
+                for key in [k for k, w in _windows.items() if now - w[0] >= ERROR_LOG_RATE_WINDOW]:
+                    del _windows[key]
+            _windows[fingerprint] = [now, 1, 0]
+            return suppressed
+        if window[1] < ERROR_LOG_RATE_LIMIT:
+            window[1] += 1
+            suppressed, window[2] = window[2], 0
+            return suppressed
+        window[2] += 1
+        _stats["suppressed"] += 1
+        return None
+
+
+def log_exception(exc: BaseException, event: str, request=None, **fields):
+    """Queue a structured record for an exception. Cheap enough to call on the event loop."""
+    fingerprint = _fingerprint(exc)
+    suppressed = _admit(fingerprint)
+    if suppressed is None:
+        return
+    if _listener is None:
+        start()
+
+    record_fields = {
+        "exception": type(exc).__name__,
+        "error": str(exc),
+        "fingerprint": fingerprint,
+        "traceback": "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)),
+        "suppressed": suppressed,
+    }
+    if request is not None:
+        record_fields["request"] = {"method": request.method, "path": request.url.path}
+    record_fields.update(fields)
+    with _lock:
+        _stats["logged"] += 1
+    logger.error(str(exc), extra={"event": event, "fields": record_fields})
+
+
+def get_stats() -> dict:
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,188 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple
+from . import schemas
+
+# Save-time validation of a graph's prerequisite structure.
+#
+# Every prerequisite expression is tokenized and checked once; the referenced ids feed a
+# single iterative Tarjan pass over the whole dependency graph, which finds every cycle
+# (each strongly connected component with more than one node, or a node requiring itself).
+# Everything is linear in nodes + references, so it runs on every save, including 20k-node
+# graphs, without recursion limits.
+#
+# Reported problems:
+#   duplicate_id        two nodes share a local_id
+#   syntax              an expression that doesn't parse (unbalanced parentheses, dangling operator, ...)
+#   dangling_reference  an expression names a local_id that isn't in the graph
+#   cycle               nodes that (transitively) require each other
+
+MAX_REPORTED_ERRORS = 100
+
+_TOKEN = re.compile(r"\(|\)|,|\d+|[A-Za-z_]+|[^\s\w()]+")
+_OPERATORS = {"AND", "OR", ","}
+
+
+class GraphValidationError(ValueError):
+    def __init__(self, errors: List[schemas.GraphValidationIssue], error_count: int):
+        self.errors = errors
+        self.error_count = error_count
+        super().__init__(f"Graph has {error_count} validation error(s): {errors[0].message}")
+
+
+class CheckedGraph(NamedTuple):
+    deps: Dict[int, List[int]]      # local_id -> distinct prerequisite ids, in expression order
+    errors: List[schemas.GraphValidationIssue]
+    error_count: int
+
+
+def parse_references(expression: str):
+    """(ids, problem) for one expression; problem is None when it is well formed."""
+    ids = []
+    depth = 0
+    expect_operand = True
+    for token in _TOKEN.findall(expression):
+        upper = token.upper()
+        if token == "(":
+            if not expect_operand:
+                return ids, "'(' after an operand"
+            depth += 1
+        elif token == ")":
+            if expect_operand or depth == 0:
+                return ids, "unexpected ')'"
+            depth -= 1
+        elif upper in _OPERATORS:
+            if expect_operand:
+                return ids, f"'{token}' without a left operand"
+            expect_operand = True
+        elif token.isdigit():
+            if not expect_operand:
+                return ids, f"missing operator before {token}"
+            ids.append(int(token))
+            expect_operand = False
+        else:
+            return ids, f"unknown token '{token}'"
+    if ids and expect_operand:
+        return ids, "expression ends with an operator"
+    if depth:
+        return ids, "unbalanced parentheses"
+    if not ids and expression.strip():
+        return ids, "no node ids"
+    return ids, None
+
+
+def _cycles(deps: Dict[int, List[int]]) -> List[List[int]]:
+    """Strongly connected components that contain a cycle (iterative Tarjan)."""
+    index, low = {}, {}
+    stack, on_stack = [], set()
+    components = []
+    counter = 0
+    for root in deps:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(deps[root]))]
+        while work:
+            node, neighbors = work[-1]
+            for neighbor in neighbors:
+                if neighbor not in deps:
+                    continue  # dangling, reported separately
+                if neighbor not in index:
+                    index[neighbor] = low[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack.add(neighbor)
+                    work.append((neighbor, iter(deps[neighbor])))
+                    break
+                if neighbor in on_stack and index[neighbor] < low[node]:
+                    low[node] = index[neighbor]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in deps[node]:
+                        components.append(component)
+    return components
+
+
+def _cycle_path(deps: Dict[int, List[int]], component: List[int]) -> List[int]:
+    """One concrete cycle through a component, as [a, b, ..., a] (a requires b requires ...)."""
+    members = set(component)
+    start = min(component)
+    parents = {}
+    frontier = [start]
+    while frontier:
+        next_frontier = []
+        for node in frontier:
+            for neighbor in deps[node]:
+                if neighbor == start:
+                    path = [start]
+                    while node != start:
+                        path.append(node)
+                        node = parents[node]
+                    path.append(start)
+                    return [path[0]] + path[-2:0:-1] + [start]
+                if neighbor in members and neighbor not in parents:
+                    parents[neighbor] = node
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return sorted(component)
+
+
+def check_graph(nodes: Iterable[schemas.NodeBase]) -> CheckedGraph:
+    errors = []
+    count = 0
+
+    def report(**issue):
+        nonlocal count
+        count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(schemas.GraphValidationIssue(**issue))
+
+    deps: Dict[int, List[int]] = {}
+    expressions = []
+    for node in nodes:
+        if node.local_id in deps:
+            report(type="duplicate_id", node_id=node.local_id, message=f"Node id {node.local_id} is used more than once")
+            continue
+        ids, problem = parse_references(node.prerequisite) if node.prerequisite else ([], None)
+        if problem:
+            report(type="syntax", node_id=node.local_id, message=f"Node {node.local_id}: invalid prerequisite '{node.prerequisite}': {problem}")
+        deps[node.local_id] = list(dict.fromkeys(ids))
+        expressions.append(node.local_id)
+
+    for node_id in expressions:
+        missing = [ref for ref in deps[node_id] if ref not in deps]
+        if missing:
+            report(
+                type="dangling_reference", node_id=node_id, missing_ids=missing,
+                message=f"Node {node_id} requires missing node(s) {', '.join(map(str, missing))}"
+            )
+
+    for component in _cycles(deps):
+        path = _cycle_path(deps, component)
+        report(
+            type="cycle", node_ids=path,
+            message="Circular prerequisites: " + " requires ".join(map(str, path))
+        )
+    return CheckedGraph(deps, errors, count)
+
+
+def validate_snapshot(snapshot_data: schemas.GraphSnapshotCreate) -> Dict[int, List[int]]:
+    """Parsed dependencies of a graph about to be saved. Raises GraphValidationError."""
+    checked = check_graph(snapshot_data.nodes)
+    if checked.errors:
+        raise GraphValidationError(checked.errors, checked.error_count)
+    return checked.deps
@@ -0,0 +1,378 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, NamedTuple, Optional
+from sqlalchemy.orm import Session, defer
+from . import crud, database, error_log, models, schemas
+
+# Background jobs for heavy graph operations (saving/overwriting, importing and exporting large
+# graphs), so they don't tie up request workers or run into proxy timeouts.
+#
+# The queue is the jobs table: no broker needed. Workers poll for the oldest queued job and claim
+# it with a conditional UPDATE (plus FOR UPDATE SKIP LOCKED on Postgres), so any number of
+# worker threads/processes can share the table. Running jobs heartbeat from a timer thread (and
+# through progress updates); jobs whose worker died are requeued once and then failed.
+#
+# Workers run as threads inside the web process (JOB_WORKERS, default 1) and/or as separate
+# processes: `python -m app.jobs --processes 2` (then set JOB_WORKERS=0 on the web service).
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_RESULT_TTL_HOURS = int(os.getenv("JOB_RESULT_TTL_HOURS", "24"))
+JOB_MAX_ATTEMPTS = 2
+JOB_HEARTBEAT_SECONDS = JOB_STALE_SECONDS / 5
+MAINTENANCE_INTERVAL_SECONDS = 60
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when the job was cancelled."""
+
+
+class JobFile(NamedTuple):
+    """Handler result stored for download instead of as a JSON document."""
+    name: str
+    content: str
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class JobContext:
+    def __init__(self, job: models.Job):
+        self.job_id = job.id
+        self.user_id = job.user_id
+        self.params = job.params or {}
+
+    def progress(self, fraction: float, message: Optional[str] = None):
+        """Record progress (also the heartbeat) and stop here if cancellation was requested.
+
+        Only call it at points where abandoning the job leaves no partial writes behind.
+        """
+        with database.SessionLocal() as db:
+            job = db.get(models.Job, self.job_id)
+            if job is None or job.cancel_requested:
+                raise JobCancelled()
+            job.progress = max(0.0, min(fraction, 1.0))
+            if message is not None:
+                job.message = message
+            job.heartbeat_at = _now()
+            db.commit()
+
+
+HANDLERS: Dict[str, Callable] = {}
+
+
+def handler(kind: str):
+    def register(fn: Callable):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# --- Queue operations ---
+
+def enqueue(db: Session, kind: str, user_id: int, params: dict) -> models.Job:
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    job = models.Job(kind=kind, user_id=user_id, params=params, status="queued", message="Queued")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: int, user_id: int) -> Optional[models.Job]:
+    # params can hold a whole graph; status reads don't need it
+    return (
+        db.query(models.Job)
+        .options(defer(models.Job.params))
+        .filter(models.Job.id == job_id, models.Job.user_id == user_id)
+        .first()
+    )
+
+
+def get_jobs(db: Session, user_id: int, limit: int = 50):
+    return (
+        db.query(models.Job)
+        .options(defer(models.Job.params), defer(models.Job.result))
+        .filter(models.Job.user_id == user_id)
+        .order_by(models.Job.created_at.desc(), models.Job.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def cancel(db: Session, job: models.Job) -> models.Job:
+    """Queued jobs are cancelled immediately; running ones stop at their next progress checkpoint."""
+    cancelled = (
+        db.query(models.Job)
+        .filter(models.Job.id == job.id, models.Job.status == "queued")
+        .update({"status": "cancelled", "message": "Cancelled", "finished_at": _now()}, synchronize_session=False)
+    )
+    if not cancelled and job.status == "running":
+        db.query(models.Job).filter(models.Job.id == job.id).update({"cancel_requested": True}, synchronize_session=False)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_next(db: Session, worker_id: str) -> Optional[int]:
+    query = (
+        db.query(models.Job.id)
+        .filter(models.Job.status == "queued")
+        .order_by(models.Job.created_at, models.Job.id)
+        .limit(1)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    row = query.first()
+    if row is None:
+        db.rollback()
+        return None
+
+    now = _now()
+    claimed = (
+        db.query(models.Job)
+        .filter(models.Job.id == row.id, models.Job.status == "queued")
+        .update({
+            "status": "running",
+            "worker_id": worker_id,
+            "started_at": now,
+            "heartbeat_at": now,
+            "attempts": models.Job.attempts + 1,
+            "message": "Running",
+        }, synchronize_session=False)
+    )
+    db.commit()
+    # Another worker may have won the race between the SELECT and the UPDATE
+    return row.id if claimed else None
+
+
+def _finish(job_id: int, status: str, **values):
+    with database.SessionLocal() as db:
+        values.update(status=status, finished_at=_now())
+        db.query(models.Job).filter(models.Job.id == job_id).update(values, synchronize_session=False)
+        db.commit()
+
+
+def _heartbeat(job_id: int, done: threading.Event):
+    # A single crud call (a large save, a server-side layout) can outlast JOB_STALE_SECONDS between
+    # progress checkpoints; without this another worker would requeue the job and save it twice.
+    while not done.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            with database.SessionLocal() as db:
+                db.query(models.Job).filter(models.Job.id == job_id, models.Job.status == "running").update(
+                    {"heartbeat_at": _now()}, synchronize_session=False
+                )
+                db.commit()
+        except Exception as e:
+            error_log.log_exception(e, event="job_heartbeat_error", job_id=job_id)
+
+
+def run_job(job_id: int):
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job_id, done), name=f"job-heartbeat-{job_id}", daemon=True)
+    heartbeat.start()
+    try:
+        _run_job(job_id)
+    finally:
+        done.set()
+        heartbeat.join()
+
+
+def _run_job(job_id: int):
+    with database.SessionLocal() as db:
+        job = db.get(models.Job, job_id)
+        if job is None:
+            # Deleted since it was claimed (purged, or its user was deleted)
+            return
+        ctx = JobContext(job)
+        job_handler = HANDLERS.get(job.kind)
+        try:
+            if job_handler is None:
+                raise ValueError(f"Unknown job kind '{job.kind}'")
+            outcome = job_handler(db, ctx)
+        except JobCancelled:
+            db.rollback()
+            _finish(job_id, "cancelled", message="Cancelled")
+        except Exception as e:
+            db.rollback()
+            _finish(job_id, "failed", error=str(e), message="Failed")
+            if not isinstance(e, (ValueError, PermissionError)):
+                error_log.log_exception(e, event="job_failed", job_id=job_id, kind=job.kind)
+        else:
+            if isinstance(outcome, JobFile):
+                _finish(job_id, "succeeded", progress=1.0, message="Done", result=outcome.content, result_name=outcome.name)
+            else:
+                _finish(job_id, "succeeded", progress=1.0, message="Done", result=json.dumps(outcome, default=str))
+
+
+def requeue_stale(db: Session):
+    """Jobs whose worker stopped heartbeating are retried once, then failed."""
+    cutoff = _now() - timedelta(seconds=JOB_STALE_SECONDS)
+    stale = models.Job.status == "running", models.Job.heartbeat_at < cutoff
+    db.query(models.Job).filter(*stale, models.Job.attempts < JOB_MAX_ATTEMPTS).update(
+        {"status": "queued", "worker_id": None, "message": "Requeued after worker timeout"}, synchronize_session=False
+    )
+    db.query(models.Job).filter(*stale).update(
+        {"status": "failed", "error": "Worker stopped responding", "finished_at": _now()}, synchronize_session=False
+    )
+    db.commit()
+
+
+def purge_finished(db: Session):
+    cutoff = _now() - timedelta(hours=JOB_RESULT_TTL_HOURS)
+    db.query(models.Job).filter(
+        models.Job.status.notin_(ACTIVE_STATUSES), models.Job.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+# --- Workers ---
+
+def work(stop: threading.Event, worker_id: str):
+    last_maintenance = 0.0
+    while not stop.is_set():
+        try:
+            database.get_engine()
+            with database.SessionLocal() as db:
+                if time.monotonic() - last_maintenance > MAINTENANCE_INTERVAL_SECONDS:
+                    requeue_stale(db)
+                    purge_finished(db)
+                    last_maintenance = time.monotonic()
+                job_id = claim_next(db, worker_id)
+            if job_id is None:
+                stop.wait(JOB_POLL_SECONDS)
+                continue
+            run_job(job_id)
+        except Exception as e:
+            error_log.log_exception(e, event="job_worker_error", worker_id=worker_id)
+            stop.wait(JOB_POLL_SECONDS)
+
+
+_stop = threading.Event()
+_threads = []
+
+
+def start_workers(count: int = JOB_WORKERS):
+    _stop.clear()
+    for _ in range(count - len(_threads)):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{len(_threads)}"
+        thread = threading.Thread(target=work, args=(_stop, worker_id), name=f"job-worker-{len(_threads)}", daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def stop_workers(timeout: float = 5.0):
+    _stop.set()
+    for thread in _threads:
+        thread.join(timeout)
+    _threads.clear()
+
+
+def _process_main(threads: int, forked: bool = False):
+    if forked:
+        # Connections inherited from the parent must not be shared with it
+        database.get_engine().dispose(close=False)
+    error_log.start()
+    start_workers(threads)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop_workers()
+
+
+# --- Job handlers ---
+
+def _check_overwrite_allowed(existing: models.GraphSnapshot, username: str):
+    # Same rule as the create endpoint: graphs with a known creator can only be overwritten by them
+    if existing.created_by and existing.created_by != "Unknown" and existing.created_by != username:
+        raise PermissionError(f"Permission denied: This graph belongs to '{existing.created_by}'. Please save as a new version.")
+
+
+def _save(db: Session, ctx: JobContext, snapshot_in: schemas.GraphSnapshotCreate):
+    user = db.get(models.User, ctx.user_id)
+    existing = crud.get_snapshot_by_label(db, snapshot_in.version_label) if snapshot_in.version_label else None
+    if existing:
+        _check_overwrite_allowed(existing, user.username)
+        if not snapshot_in.overwrite:
+            raise ValueError(f"Snapshot '{snapshot_in.version_label}' already exists. Confirm overwrite?")
+
+    # Last cancellation point: the crud functions commit as they go
+    ctx.progress(0.2, f"Writing {len(snapshot_in.nodes)} nodes")
+    if existing:
+        saved = crud.update_snapshot(db=db, db_snapshot=existing, snapshot_data=snapshot_in)
+    else:
+        saved = crud.create_snapshot(db=db, snapshot_data=snapshot_in)
+    return {"id": saved.id, "version_label": saved.version_label, "node_count": saved.node_count}
+
+
+@handler("snapshot_save")
+def _save_snapshot(db: Session, ctx: JobContext):
+    snapshot_in = schemas.GraphSnapshotCreate(**ctx.params["snapshot"])
+    ctx.progress(0.1, "Validated graph")
+    return _save(db, ctx, snapshot_in)
+
+
+@handler("snapshot_import")
+def _import_snapshot(db: Session, ctx: JobContext):
+    try:
+        data = json.loads(ctx.params["content"])
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON content")
+    try:
+        snapshot_in = crud.snapshot_create_from_export(data)
+    except Exception as e:
+        raise ValueError(f"Invalid graph data: {e}")
+    snapshot_in.overwrite = bool(ctx.params.get("overwrite"))
+    snapshot_in.auto_layout = bool(ctx.params.get("layout"))
+    ctx.progress(0.1, "Parsed import file")
+    return _save(db, ctx, snapshot_in)
+
+
+@handler("snapshot_export")
+def _export_snapshot(db: Session, ctx: JobContext):
+    label = ctx.params["graph_label"]
+    ctx.progress(0.1, "Loading graph")
+    snapshot = crud.get_snapshot_by_label(db, label)
+    if snapshot is None:
+        raise ValueError("Snapshot not found")
+    ctx.progress(0.5, "Serializing graph")
+    return JobFile(f"{label}.knw", crud.serialize_snapshot_export(snapshot))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1, help="Worker threads per process")
+    args = parser.parse_args()
+
+    from . import migrations
+    migrations.run_migrations(database.get_engine())
+    print(f"INFO: Starting {args.processes} job worker process(es) x {args.threads} thread(s)")
+    if args.processes == 1:
+        _process_main(args.threads)
+        return
+    processes = [multiprocessing.Process(target=_process_main, args=(args.threads, True)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Optional
+from .cache import TTLCache
+
+# Node suggestion pipeline.
+#
+# One backend instance is created at startup and shared by all requests:
+#   - "gemini": google-generativeai, configured once; async generate_content calls
+#   - "fake":   deterministic local suggestions (optional artificial latency) for tests,
+#               benchmarks and development without an API key
+# LLM_BACKEND picks one explicitly; by default Gemini is used when GEMINI_API_KEY is set.
+#
+# Calls are bounded by LLM_MAX_CONCURRENCY and LLM_TIMEOUT_SECONDS. Successful results are
+# cached by a hash of (prompt, graph_name, normalized context), and identical requests that
+# arrive while one is already running wait for that call instead of issuing their own.
+#
+# stream_suggestions() is the incremental variant: it reads the model output as it is generated
+# and yields each suggestion object as soon as it is complete. Streams are not coalesced, but a
+# completed stream fills the same cache (and a cached result is replayed at once).
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_FAKE_LATENCY_SECONDS = float(os.getenv("LLM_FAKE_LATENCY_SECONDS", "0"))
+
+suggestion_cache = TTLCache(
+    maxsize=int(os.getenv("LLM_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600")),
+)
+
+_backend = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop = None
+_inflight: Dict[str, asyncio.Task] = {}
+_stats = {"calls": 0, "streams": 0, "timeouts": 0, "errors": 0, "coalesced": 0, "in_flight": 0}
+STREAM_CHUNK_CHARS = 48
+
+
+class LLMError(Exception):
+    """The model call failed, timed out or returned unusable output."""
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config={"response_mime_type": "application/json"}
+        )
+        return response.text
+
+    async def stream(self, prompt: str):
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config={"response_mime_type": "application/json"},
+            stream=True
+        )
+        async for chunk in response:
+            yield chunk.text
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def generate(self, prompt: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def stream(self, prompt: str):
+        # The same answer in small pieces, with the latency spread over them like a real model
+        text = self._answer(prompt)
+        pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+        for piece in pieces:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(pieces))
+            yield piece
+
+    def _answer(self, prompt: str) -> str:
+        match = re.search(r"^Prompt: (.*)$", prompt, re.MULTILINE)
+        topic = match.group(1).strip() if match else "your topic"
+        return json.dumps({
+            "suggestions": [
+                {
+                    "title": f"{topic} - Example Node {i}",
+                    "description": "This is a generated suggestion (Mock). Add your Gemini API key to get real results.",
+                }
+                for i in range(1, 4)
+            ]
+        })
+
+
+def init():
+    """Create the backend. Called from the app lifespan; safe to call again."""
+    global _backend
+    if _backend is not None:
+        return _backend
+    api_key = os.getenv("GEMINI_API_KEY")
+    backend_name = os.getenv("LLM_BACKEND", "gemini" if api_key else "fake")
+    if backend_name == "gemini":
+        if not api_key:
+            raise RuntimeError("LLM_BACKEND=gemini requires GEMINI_API_KEY")
+        _backend = GeminiBackend(api_key, LLM_MODEL)
+    else:
+        _backend = FakeBackend(LLM_FAKE_LATENCY_SECONDS)
+    print(f"INFO: LLM backend: {_backend.name}")
+    return _backend
+
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join(text.split()) if text else ""
+
+
+def _normalize_context(context: Optional[str]) -> str:
+    # One "Title: Description" entry per line; order and spacing don't change the answer
+    if not context:
+        return ""
+    return "\n".join(sorted({_normalize(line) for line in context.splitlines() if line.strip()}))
+
+
+def cache_key(prompt: str, graph_name: Optional[str], context: Optional[str]) -> str:
+    payload = json.dumps([_normalize(prompt), _normalize(graph_name), _normalize_context(context)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_prompt(system_prompt: str, prompt: str, graph_name: Optional[str], context: Optional[str]) -> str:
+    user_content = f"Prompt: {prompt}"
+    if graph_name:
+        user_content += f"\nGraph Name: {graph_name}"
+
+    if context:
+        user_content += f"\n\n--- Existing Graph Context ---\nThe following nodes already exist in the graph (Title: Description):\n{context}\n\nBased on this context, suggest modular additions that fit well with these existing nodes."
+
+    return f"{system_prompt}\n\n{user_content}"
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Semaphores belong to one event loop (tests and workers may run several in turn)
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+
+async def _call(full_prompt: str) -> dict:
+    try:
+        backend = init()
+    except Exception as e:
+        raise LLMError(f"LLM backend unavailable: {e}")
+
+    async with _get_semaphore():
+        _stats["calls"] += 1
+        _stats["in_flight"] += 1
+        try:
+            content = await asyncio.wait_for(backend.generate(full_prompt), LLM_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            _stats["timeouts"] += 1
+            raise LLMError(f"Model did not answer within {LLM_TIMEOUT_SECONDS:g}s")
+        except Exception as e:
+            _stats["errors"] += 1
+            raise LLMError(str(e))
+        finally:
+            _stats["in_flight"] -= 1
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as e:
+        _stats["errors"] += 1
+        raise LLMError(f"Model returned invalid JSON: {e}")
+
+
+async def _call_and_cache(key: str, full_prompt: str) -> dict:
+    data = await _call(full_prompt)
+    suggestion_cache.set(key, data)
+    return data
+
+
+def _forget(key: str, task: asyncio.Task):
+    _inflight.pop(key, None)
+    if not task.cancelled():
+        # Retrieve the exception so a call nobody waits for anymore does not log a warning
+        task.exception()
+
+
+async def suggest(system_prompt: str, prompt: str, graph_name: Optional[str] = None, context: Optional[str] = None) -> dict:
+    """Suggestions for a query, from the cache when possible. Raises LLMError."""
+    key = cache_key(prompt, graph_name, context)
+    cached = suggestion_cache.get(key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        # A task of its own, so a disconnecting client doesn't cancel the call for the others;
+        # it also completes (and fills the cache) when the only requester has gone away
+        task = asyncio.ensure_future(_call_and_cache(key, build_prompt(system_prompt, prompt, graph_name, context)))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget(key, t))
+    else:
+        _stats["coalesced"] += 1
+    return await asyncio.shield(task)
+
+
+class SuggestionStreamParser:
+    """Picks complete suggestion objects out of a partially received
+    {"suggestions": [{...}, ...]} (or bare [{...}, ...]) JSON document."""
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._start = None
+
+    def feed(self, chunk: str) -> list:
+        self.text += chunk
+        found = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                if ch == "{" and self._stack in (["{", "["], ["["]):
+                    self._start = i
+                self._stack.append(ch)
+            elif ch == "}" or ch == "]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._start is not None and self._stack in (["{", "["], ["["]):
+                    item = _as_suggestion(text[self._start:i + 1])
+                    self._start = None
+                    if item is not None:
+                        found.append(item)
+        self._pos = len(text)
+        return found
+
+
+def _as_suggestion(fragment: str) -> Optional[dict]:
+    try:
+        item = json.loads(fragment)
+    except json.JSONDecodeError:
+        return None
+    return _valid_suggestion(item)
+
+
+def _valid_suggestion(item) -> Optional[dict]:
+    if isinstance(item, dict) and isinstance(item.get("title"), str) and isinstance(item.get("description"), str):
+        return {"title": item["title"], "description": item["description"]}
+    return None
+
+
+async def stream_suggestions(system_prompt: str, prompt: str, graph_name: Optional[str] = None, context: Optional[str] = None):
+    """Yield suggestions one at a time as the model produces them. Raises LLMError.
+
+    Closing the generator (e.g. the client disconnected) stops the model call.
+    """
+    key = cache_key(prompt, graph_name, context)
+    cached = suggestion_cache.get(key)
+    if cached is not None:
+        for suggestion in cached.get("suggestions", []):
+            yield suggestion
+        return
+
+    try:
+        backend = init()
+    except Exception as e:
+        raise LLMError(f"LLM backend unavailable: {e}")
+
+    loop = asyncio.get_running_loop()
+    parser = SuggestionStreamParser()
+    suggestions = []
+    async with _get_semaphore():
+        _stats["calls"] += 1
+        _stats["streams"] += 1
+        _stats["in_flight"] += 1
+        chunks = backend.stream(build_prompt(system_prompt, prompt, graph_name, context)).__aiter__()
+        deadline = loop.time() + LLM_TIMEOUT_SECONDS
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    _stats["timeouts"] += 1
+                    raise LLMError(f"Model did not answer within {LLM_TIMEOUT_SECONDS:g}s")
+                except Exception as e:
+                    _stats["errors"] += 1
+                    raise LLMError(str(e))
+                for suggestion in parser.feed(chunk or ""):
+                    suggestions.append(suggestion)
+                    yield suggestion
+        finally:
+            _stats["in_flight"] -= 1
+            try:
+                await chunks.aclose()
+            except Exception:
+                pass
+
+    if not suggestions:
+        # Nothing matched the expected shape while streaming; the whole answer decides
+        try:
+            data = json.loads(parser.text)
+        except json.JSONDecodeError as e:
+            _stats["errors"] += 1
+            raise LLMError(f"Model returned invalid JSON: {e}")
+        items = data.get("suggestions") if isinstance(data, dict) else None
+        for item in items if isinstance(items, list) else []:
+            suggestion = _valid_suggestion(item)
+            if suggestion is not None:
+                suggestions.append(suggestion)
+                yield suggestion
+    suggestion_cache.set(key, {"suggestions": suggestions})
+
+
+def get_stats() -> dict:
+    return dict(
+        _stats,
+        backend=_backend.name if _backend else None,
+        cache_hits=suggestion_cache.hits,
+        cache_misses=suggestion_cache.misses,
+        cache_size=len(suggestion_cache),
+    )
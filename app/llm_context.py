@@ -0,0 +1,173 @@
+import math
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set
+from sqlalchemy.orm import Session
+from . import models, utils
+from .schemas import LLM_CONTEXT_MAX_TOKENS
+from .cache import TTLCache
+
+# Existing-graph context for node suggestions, built on the server from a stored snapshot.
+#
+# Instead of shipping every "Title: Description" line, the prompt gets the nodes most relevant
+# to it, up to LLM_CONTEXT_TOKENS (estimated at ~4 characters per token):
+#   1. lexical matches: prompt terms found in a node's title/description, weighted by IDF
+#   2. prerequisite neighbors of the best matches (what they need and what needs them)
+#   3. other nodes in the same domain as the best matches
+# Without any lexical match the best-connected nodes are used, which sketches the graph's core.
+#
+# The per-snapshot index (tokens, IDF, neighbors, rendered lines) and the assembled contexts are
+# cached per snapshot version (id + last_updated), so edits are picked up on the next request.
+
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "1500"))
+CHARS_PER_TOKEN = 4
+MAX_DESCRIPTION_CHARS = 300
+SEED_COUNT = 10
+NEIGHBOR_WEIGHT = 0.5
+DOMAIN_WEIGHT = 0.25
+
+index_cache = TTLCache(maxsize=32, ttl=float(os.getenv("LLM_CONTEXT_CACHE_TTL_SECONDS", "3600")))
+context_cache = TTLCache(maxsize=512, ttl=float(os.getenv("LLM_CONTEXT_CACHE_TTL_SECONDS", "3600")))
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "the and for with from into that this these those are was were been being have has had not "
+    "but its can will how what when where which who why about over under than then them they "
+    "their there your you our out all any each more most other some such only own same also use "
+    "using used add new node nodes graph".split()
+)
+
+
+class GraphIndex(NamedTuple):
+    lines: List[str]                # "Title: Description" per node
+    costs: List[int]                # estimated tokens per line (newline included)
+    title_terms: List[Set[str]]
+    terms: List[Set[str]]           # title + description terms
+    idf: Dict[str, float]
+    neighbors: List[Set[int]]       # positions of prerequisites and dependents
+    domains: List[Optional[int]]
+    domain_members: Dict[int, List[int]]
+
+
+def _terms(text: Optional[str]) -> Set[str]:
+    if not text:
+        return set()
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _build_index(db: Session, snapshot_id: int) -> GraphIndex:
+    rows = (
+        db.query(models.Node.local_id, models.Node.title, models.Node.description, models.Node.prerequisite, models.Node.domain_id)
+        .filter(models.Node.snapshot_id == snapshot_id)
+        .order_by(models.Node.local_id)
+        .all()
+    )
+    position = {row.local_id: i for i, row in enumerate(rows)}
+
+    lines, costs, title_terms, terms, domains = [], [], [], [], []
+    neighbors = [set() for _ in rows]
+    domain_members = defaultdict(list)
+    document_frequency = defaultdict(int)
+    for i, row in enumerate(rows):
+        description = " ".join((row.description or "").split())
+        if len(description) > MAX_DESCRIPTION_CHARS:
+            description = description[:MAX_DESCRIPTION_CHARS].rsplit(" ", 1)[0] + "..."
+        line = f"{row.title}: {description}" if description else row.title
+        lines.append(line)
+        costs.append(_estimate_tokens(line))
+
+        title_set = _terms(row.title)
+        node_terms = title_set | _terms(row.description)
+        title_terms.append(title_set)
+        terms.append(node_terms)
+        for term in node_terms:
+            document_frequency[term] += 1
+
+        domains.append(row.domain_id)
+        if row.domain_id is not None:
+            domain_members[row.domain_id].append(i)
+
+        if row.prerequisite:
+            for prerequisite_id in utils.extract_ids(row.prerequisite):
+                j = position.get(prerequisite_id)
+                if j is not None and j != i:
+                    neighbors[i].add(j)
+                    neighbors[j].add(i)
+
+    count = len(rows)
+    idf = {term: math.log(1 + count / df) for term, df in document_frequency.items()}
+    return GraphIndex(lines, costs, title_terms, terms, idf, neighbors, domains, dict(domain_members))
+
+
+def _score(index: GraphIndex, prompt_terms: Set[str]) -> List[float]:
+    scores = [0.0] * len(index.lines)
+    lexical = []
+    for i, node_terms in enumerate(index.terms):
+        matched = prompt_terms & node_terms
+        if matched:
+            # Title hits count double: titles name the concept, descriptions only mention things
+            score = sum(index.idf[t] * (2 if t in index.title_terms[i] else 1) for t in matched)
+            scores[i] = score
+            lexical.append((score, i))
+
+    if not lexical:
+        # Nothing in common with the prompt: describe the graph by its best-connected nodes
+        return [len(n) + 1.0 for n in index.neighbors]
+
+    lexical.sort(reverse=True)
+    best = lexical[0][0]
+    for score, i in lexical[:SEED_COUNT]:
+        weight = score / best
+        for j in index.neighbors[i]:
+            scores[j] += NEIGHBOR_WEIGHT * weight * best
+        domain = index.domains[i]
+        if domain is not None:
+            for j in index.domain_members[domain]:
+                if j != i:
+                    scores[j] += DOMAIN_WEIGHT * weight * best
+    return scores
+
+
+def _assemble(index: GraphIndex, prompt_terms: Set[str], budget: int) -> str:
+    scores = _score(index, prompt_terms)
+    ranked = sorted((i for i, s in enumerate(scores) if s > 0), key=lambda i: (-scores[i], i))
+    chosen, used = [], 0
+    for i in ranked:
+        if used + index.costs[i] > budget:
+            # Keep going: a shorter line further down may still fit
+            continue
+        chosen.append(i)
+        used += index.costs[i]
+    return "\n".join(index.lines[i] for i in chosen)
+
+
+def build_context(db: Session, snapshot_id: int, version, prompt: str, max_tokens: Optional[int] = None) -> str:
+    """Relevant "Title: Description" lines of a snapshot for a prompt, within the token budget."""
+    budget = min(max_tokens or LLM_CONTEXT_TOKENS, LLM_CONTEXT_MAX_TOKENS)
+    prompt_terms = _terms(prompt)
+    version_key = (snapshot_id, str(version))
+    key = (version_key, frozenset(prompt_terms), budget)
+    context = context_cache.get(key)
+    if context is not None:
+        return context
+
+    index = index_cache.get(version_key)
+    if index is None:
+        index = _build_index(db, snapshot_id)
+        index_cache.set(version_key, index)
+    context = _assemble(index, prompt_terms, budget)
+    context_cache.set(key, context)
+    return context
+
+
+def get_stats() -> dict:
+    return {
+        "context_cache_hits": context_cache.hits,
+        "context_cache_misses": context_cache.misses,
+        "index_cache_size": len(index_cache),
+    }
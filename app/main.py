@@ -1,126 +1,56 @@
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, RedirectResponse, JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import os
-import traceback
 
-from .database import engine, Base
-from .api import endpoints, llm, assessments
+from . import database
+from .api import endpoints, llm, assessments, graph, jobs as job_endpoints
 from .api.endpoints import get_current_user
-from . import models
+from . import models, migrations, passwords, metrics, db_pool, error_log, jobs, llm_client, llm_context, graph_validation, spatial, analytics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create tables on startup
+    error_log.start()
+    # Apply pending schema migrations (a single version check when the schema is current)
     try:
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            dialect_name = engine.dialect.name
-            # --- Check and add x, y columns if missing ---
-            try:
-                conn.execute(text("ALTER TABLE nodes ADD COLUMN x INTEGER DEFAULT NULL"))
-                conn.commit()
-                print("Added column x to nodes table")
-            except Exception:
-                pass # Column likely exists
-                
-            try:
-                conn.execute(text("ALTER TABLE nodes ADD COLUMN y INTEGER DEFAULT NULL"))
-                conn.commit()
-                print("Added column y to nodes table")
-            except Exception:
-                pass # Column likely exists
-
-            try:
-                conn.execute(text("ALTER TABLE nodes DROP COLUMN sources"))
-                conn.commit()
-                print("Dropped column sources from nodes table")
-            except Exception:
-                pass # Column likely already dropped
-
-            # --- Check and add user profile columns if missing ---
-            # Inspect existing columns first to avoid transaction errors
-            try:
-                result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name = 'users'"))
-                existing_columns = [row[0] for row in result.fetchall()]
-                print(f"Existing columns in users: {existing_columns}")
-            except Exception as e:
-                print(f"Error inspecting users table: {e}")
-                conn.rollback()
-                existing_columns = []
-
-            # --- Ensure core user columns exist (older DBs may predate these fields) ---
-            core_user_columns = []
-            if dialect_name == "postgresql":
-                core_user_columns = [
-                    ("created_at", "TIMESTAMPTZ", "now()"),
-                    ("is_active", "BOOLEAN", "true"),
-                ]
-            else:
-                core_user_columns = [
-                    ("created_at", "DATETIME", "CURRENT_TIMESTAMP"),
-                    ("is_active", "BOOLEAN", "1"),
-                ]
-
-            for col_name, col_type, default_expr in core_user_columns:
-                if col_name not in existing_columns:
-                    try:
-                        conn.execute(text(f"ALTER TABLE users ADD COLUMN {col_name} {col_type} DEFAULT {default_expr}"))
-                        conn.commit()
-                        print(f"Added column {col_name} to users table")
-                    except Exception as e:
-                        print(f"Failed to add column {col_name}: {e}")
-                        conn.rollback()
-
-            user_columns = [
-                ("email", "VARCHAR"),
-                ("phone", "VARCHAR"),
-                ("dob", "VARCHAR"),
-                ("bio", "VARCHAR"),
-                ("location", "VARCHAR"),
-                ("social_github", "VARCHAR"),
-                ("social_linkedin", "VARCHAR"),
-                ("profile_image", "VARCHAR")
-            ]
-            
-            for col_name, col_type in user_columns:
-                if col_name not in existing_columns:
-                    try:
-                        conn.execute(text(f"ALTER TABLE users ADD COLUMN {col_name} {col_type} DEFAULT NULL"))
-                        conn.commit()
-                        print(f"Added column {col_name} to users table")
-                    except Exception as e:
-                        print(f"Failed to add column {col_name}: {e}")
-                        conn.rollback() # Ensure transaction is clean for next iteration
-
-            # --- Ensure version_label can be referenced by foreign keys ---
-            # Postgres requires the referenced column(s) to be covered by a UNIQUE constraint or unique index.
-            try:
-                conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_graph_snapshots_version_label ON graph_snapshots (version_label)"))
-                conn.commit()
-                print("Ensured unique index on graph_snapshots.version_label")
-            except Exception as e:
-                print(f"Failed to ensure unique index on graph_snapshots.version_label: {e}")
-                conn.rollback()
-
-
-        Base.metadata.create_all(bind=engine)
+        migrations.run_migrations(database.get_engine())
     except Exception as e:
         print(f"ERROR: Database initialization failed: {e}")
+    if jobs.JOB_WORKERS > 0:
+        jobs.start_workers(jobs.JOB_WORKERS)
+    try:
+        llm_client.init()
+    except Exception as e:
+        print(f"ERROR: LLM backend initialization failed: {e}")
     yield
+    jobs.stop_workers()
+    passwords.shutdown()
+    error_log.stop()
 
 app = FastAPI(title="The Brotherhood Curator Lab Graph API", lifespan=lifespan)
 
+if metrics.METRICS_ENABLED:
+    # Query count, DB/serialization time and response size per request (Server-Timing + /metrics)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(graph_validation.GraphValidationError)
+async def graph_validation_exception_handler(request: Request, exc: graph_validation.GraphValidationError):
+    return JSONResponse(
+        status_code=422,
+        content={
+            "detail": {
+                "message": str(exc),
+                "error_count": exc.error_count,
+                "errors": [issue.model_dump(exclude_none=True) for issue in exc.errors],
+            }
+        },
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    error_msg = f"Global Error: {exc}\n{traceback.format_exc()}"
-    print(error_msg)
-    with open("server_error.log", "a") as f:
-        f.write(f"Timestamp: {os.times()}\n")
-        f.write(error_msg)
-        f.write("-" * 80 + "\n")
-        
+    # Queued for the background writer; never blocks the event loop on disk I/O
+    error_log.log_exception(exc, event="unhandled_exception", request=request)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal Server Error", "error": str(exc)},
@@ -139,9 +69,36 @@ app.mount("/landing", StaticFiles(directory=landing_static_path, html=True), nam
 profile_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "profile")
 app.mount("/user-profile", StaticFiles(directory=profile_path, html=True), name="user-profile")
 
-app.include_router(endpoints.router, prefix="/api/v1")
-app.include_router(llm.router, prefix="/api/v1/llm")
-app.include_router(assessments.router, prefix="/api/v1")
+if database.ASYNC_DB_ENABLED:
+    # Must be registered first so its async handlers shadow the sync read routes
+    from .api import async_reads
+    metrics.include_router(app, async_reads.router, prefix="/api/v1")
+
+metrics.include_router(app, endpoints.router, prefix="/api/v1")
+metrics.include_router(app, llm.router, prefix="/api/v1/llm")
+metrics.include_router(app, assessments.router, prefix="/api/v1")
+metrics.include_router(app, job_endpoints.router, prefix="/api/v1")
+metrics.include_router(app, graph.router, prefix="/api/v1")
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render({
+            "app_db_pool": db_pool.get_stats(),
+            "app_password_pool": passwords.get_stats(),
+            "app_error_log": error_log.get_stats(),
+            "app_llm": llm_client.get_stats(),
+            "app_llm_context": llm_context.get_stats(),
+            "app_spatial": spatial.get_stats(),
+            "app_analytics": analytics.get_stats(),
+            "app_auth_cache": {
+                "hits": endpoints.user_cache.hits,
+                "misses": endpoints.user_cache.misses,
+                "size": len(endpoints.user_cache),
+            },
+        }),
+        media_type="text/plain; version=0.0.4",
+    )
 
 @app.get("/documents")
 def landing_documents():
@@ -0,0 +1,269 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+# Per-request instrumentation.
+#
+# MetricsMiddleware opens a RequestStats for every HTTP request. SQLAlchemy cursor events add each
+# query's count and duration to it, and TimedRoute marks when the endpoint function returned, so
+# the time after that is response validation/serialization. The results are sent back as a
+# Server-Timing header and folded into per-route histograms served by /metrics in the Prometheus
+# text format. Metrics are per worker process; Prometheus aggregates across workers.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class RequestStats:
+    __slots__ = ("started", "queries", "db_seconds", "endpoint_done", "response_bytes")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.endpoint_done: Optional[float] = None
+        self.response_bytes = 0
+
+
+# The stats object is shared (not copied) by the threadpool workers that run sync handlers,
+# because the context copy still references the same instance
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def collect():
+    """Count queries and DB time for a block of code outside of a request (benchmarks, scripts)."""
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+class Histogram:
+    # Only touched from the event loop thread (middleware and /metrics), so it needs no lock
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels: Tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, lines: list, label_names: Tuple[str, ...]):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labels, series in sorted(self.series.items()):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(label_names, labels))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series[-1]}")
+
+
+ROUTE_LABELS = ("method", "route")
+
+request_duration = Histogram("http_request_duration_seconds", "Time until the response headers were sent", DURATION_BUCKETS)
+request_db_time = Histogram("http_request_db_seconds", "Database time spent per request", DURATION_BUCKETS)
+request_serialize_time = Histogram("http_request_serialize_seconds", "Response validation and serialization time", DURATION_BUCKETS)
+request_queries = Histogram("http_request_db_queries", "SQL statements executed per request", QUERY_BUCKETS)
+response_size = Histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS)
+
+_requests_total: Dict[Tuple[str, str, str], int] = {}
+# Every query, including those outside of requests (startup, migrations); bumped from threadpool threads
+_queries_total = 0
+_queries_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# --- SQLAlchemy hooks ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    global _queries_total
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    with _queries_lock:
+        _queries_total += 1
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _on_error(context):
+    # after_cursor_execute does not fire for failed statements
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """Count queries and DB time of a sync engine (pass AsyncEngine.sync_engine for async ones)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _on_error)
+    return engine
+
+
+# --- Routing ---
+
+def _mark_endpoint_done(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats = _request_stats.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def timed_endpoint(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stats = _request_stats.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+    return timed_endpoint
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records when the endpoint returned, separating handler from serialization time.
+    `template` is its full path template, the route label of its metrics."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+        self.template = self.path_format
+
+
+def include_router(app, router, prefix: str = ""):
+    """app.include_router that also gives the router's routes their full template: the matched
+    route doesn't know the prefix it was included under."""
+    for route in router.routes:
+        if isinstance(route, TimedRoute):
+            route.template = prefix + route.path_format
+    app.include_router(router, prefix=prefix)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        # Unmatched paths (404s, static mounts) share one label to keep cardinality bounded
+        return "unmatched"
+    # "/api/v1/snapshots/{graphLabel}/read" rather than one series per label
+    return getattr(route, "template", None) or getattr(route, "path_format", None) or "unmatched"
+
+
+# --- Middleware ---
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are measured without buffering them."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        headers_sent_at = None
+
+        async def send_wrapper(message):
+            nonlocal status_code, headers_sent_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers_sent_at = time.perf_counter()
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", _server_timing(stats, headers_sent_at).encode("latin-1"))
+                ]
+            elif message["type"] == "http.response.body":
+                stats.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            _record(scope, stats, status_code, headers_sent_at or time.perf_counter())
+
+
+def _server_timing(stats: RequestStats, now: float) -> str:
+    parts = [f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"']
+    if stats.endpoint_done is not None:
+        parts.append(f"handler;dur={(stats.endpoint_done - stats.started) * 1000:.1f}")
+        parts.append(f"serialize;dur={(now - stats.endpoint_done) * 1000:.1f}")
+    parts.append(f"total;dur={(now - stats.started) * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _record(scope, stats: RequestStats, status_code: int, finished: float):
+    labels = (scope["method"], _route_label(scope))
+    request_duration.observe(labels, finished - stats.started)
+    request_db_time.observe(labels, stats.db_seconds)
+    request_queries.observe(labels, stats.queries)
+    response_size.observe(labels, stats.response_bytes)
+    if stats.endpoint_done is not None:
+        request_serialize_time.observe(labels, max(finished - stats.endpoint_done, 0.0))
+    key = labels + (str(status_code),)
+    _requests_total[key] = _requests_total.get(key, 0) + 1
+
+
+# --- Exposition ---
+
+def _render_gauges(lines: list, prefix: str, values: dict):
+    for key, value in sorted(values.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            if isinstance(value, dict):
+                _render_gauges(lines, f"{prefix}_{key}", value)
+            continue
+        lines.append(f"{prefix}_{key} {value}")
+
+
+def render(extra_gauges: Optional[Dict[str, dict]] = None) -> str:
+    """Prometheus text exposition of the request metrics plus any extra stats dictionaries."""
+    lines = [
+        "# HELP http_requests_total Requests by route and status",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route, status_code), count in sorted(_requests_total.items()):
+        lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status_code}"}} {count}')
+    for histogram in (request_duration, request_db_time, request_serialize_time, request_queries, response_size):
+        histogram.render(lines, ROUTE_LABELS)
+    lines.append("# TYPE db_queries_total counter")
+    lines.append(f"db_queries_total {_queries_total}")
+    for prefix, values in (extra_gauges or {}).items():
+        _render_gauges(lines, prefix, values)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,192 @@
+from typing import Callable, List, NamedTuple, Optional, Set
+from sqlalchemy import inspect, text
+from . import models, search, utils
+from .database import Base
+
+# Versioned schema migrations.
+# Every applied step is recorded in the schema_version table, so a normal boot costs a single
+# SELECT of the applied versions. Optional steps that failed stay unrecorded and are retried on
+# the next boot. Pending steps run in one transaction under a Postgres advisory lock, so
+# only one worker applies them while the others wait and then see the new version.
+#
+# Steps must be idempotent: databases created before this runner existed start at version 0
+# and may already have some of the changes applied by the old startup probing.
+# To change the schema, append a step with the next version number; never edit applied steps.
+
+# Arbitrary constant identifying this app's migration lock in pg_advisory_xact_lock
+MIGRATION_LOCK_KEY = 7252013001
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable
+    # Optional steps may fail (e.g. missing extension privileges) without blocking startup
+    optional: bool = False
+
+
+def _columns(conn, table_name: str) -> List[str]:
+    return [c["name"] for c in inspect(conn).get_columns(table_name)]
+
+
+def _create_missing_tables(conn):
+    # Databases from before the runner may lack tables added later (invitations, capabilities, ...)
+    Base.metadata.create_all(bind=conn)
+
+
+def _node_layout_columns(conn):
+    columns = _columns(conn, "nodes")
+    for col_name in ("x", "y"):
+        if col_name not in columns:
+            conn.execute(text(f"ALTER TABLE nodes ADD COLUMN {col_name} INTEGER DEFAULT NULL"))
+    if "sources" in columns:
+        # Replaced by the sources table
+        conn.execute(text("ALTER TABLE nodes DROP COLUMN sources"))
+
+
+def _user_columns(conn):
+    columns = _columns(conn, "users")
+    if conn.dialect.name == "postgresql":
+        core_user_columns = [
+            ("created_at", "TIMESTAMPTZ", "now()"),
+            ("is_active", "BOOLEAN", "true"),
+        ]
+    else:
+        core_user_columns = [
+            ("created_at", "DATETIME", "CURRENT_TIMESTAMP"),
+            ("is_active", "BOOLEAN", "1"),
+        ]
+    for col_name, col_type, default_expr in core_user_columns:
+        if col_name not in columns:
+            if conn.dialect.name == "sqlite" and default_expr == "CURRENT_TIMESTAMP":
+                # SQLite can't add a column with a non-constant default: backfill it, and fill new rows by trigger
+                conn.execute(text(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}"))
+                conn.execute(text(f"UPDATE users SET {col_name} = CURRENT_TIMESTAMP"))
+                conn.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS users_{col_name}_default AFTER INSERT ON users "
+                    f"WHEN new.{col_name} IS NULL BEGIN "
+                    f"UPDATE users SET {col_name} = CURRENT_TIMESTAMP WHERE id = new.id; END"
+                ))
+                continue
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {col_name} {col_type} DEFAULT {default_expr}"))
+
+    for col_name in ("email", "phone", "dob", "bio", "location", "social_github", "social_linkedin", "profile_image"):
+        if col_name not in columns:
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {col_name} VARCHAR DEFAULT NULL"))
+
+
+def _version_label_unique_index(conn):
+    # Postgres requires the referenced column(s) of a foreign key to be covered by a UNIQUE constraint or unique index
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_graph_snapshots_version_label ON graph_snapshots (version_label)"))
+
+
+def _listing_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_graph_snapshots_created_at_id ON graph_snapshots (created_at, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_nodes_snapshot_id ON nodes (snapshot_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_node_redirects_snapshot_id ON node_redirects (snapshot_id)"))
+
+
+def _jobs_table(conn):
+    models.Job.__table__.create(bind=conn, checkfirst=True)
+
+
+def _node_edges_table(conn):
+    models.NodeEdge.__table__.create(bind=conn, checkfirst=True)
+    # Backfill from the stored prerequisite expressions; references to missing nodes are skipped
+    existing = {(row.snapshot_id, row.local_id) for row in conn.execute(text("SELECT snapshot_id, local_id FROM nodes"))}
+    edges = set()
+    for row in conn.execute(text("SELECT snapshot_id, local_id, prerequisite FROM nodes WHERE prerequisite IS NOT NULL")):
+        for prerequisite_id in utils.extract_ids(row.prerequisite):
+            if (row.snapshot_id, prerequisite_id) in existing:
+                edges.add((row.snapshot_id, row.local_id, prerequisite_id))
+    conn.execute(text("DELETE FROM node_edges"))
+    if edges:
+        conn.execute(
+            models.NodeEdge.__table__.insert(),
+            [{"snapshot_id": s, "to_local_id": t, "from_local_id": f} for s, t, f in edges],
+        )
+
+
+
+def _node_lookup_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_nodes_snapshot_domain ON nodes (snapshot_id, domain_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_nodes_snapshot_local_id ON nodes (snapshot_id, local_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sources_node_id ON sources (node_id)"))
+
+
+MIGRATIONS = [
+    Migration(1, "Create tables missing from pre-migration databases", _create_missing_tables),
+    Migration(2, "Node layout columns; drop legacy nodes.sources", _node_layout_columns),
+    Migration(3, "User core and profile columns", _user_columns),
+    Migration(4, "Unique index on graph_snapshots.version_label", _version_label_unique_index),
+    Migration(5, "Snapshot listing indexes", _listing_indexes),
+    Migration(6, "Full-text and trigram search indexes", search.create_search_indexes, optional=True),
+    Migration(7, "Background jobs table", _jobs_table),
+    Migration(8, "Prerequisite edge index (node_edges)", _node_edges_table),
+    Migration(9, "Node lookup indexes for level-of-detail reads", _node_lookup_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _applied_versions(conn) -> Optional[Set[int]]:
+    """Versions recorded as applied, or None when the schema_version table does not exist yet."""
+    try:
+        return set(conn.execute(text("SELECT version FROM schema_version")).scalars())
+    except Exception:
+        conn.rollback()
+        return None
+
+
+def _stamp(conn, migration: Migration):
+    conn.execute(
+        models.SchemaVersion.__table__.insert().values(version=migration.version, description=migration.description)
+    )
+
+
+def run_migrations(engine) -> int:
+    """Bring the schema up to LATEST_VERSION. Returns the resulting version."""
+    with engine.connect() as conn:
+        applied = _applied_versions(conn)
+        if applied is not None and all(m.version in applied for m in MIGRATIONS):
+            return LATEST_VERSION
+
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Released automatically at commit/rollback
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+        fresh_database = not inspect(conn).has_table("graph_snapshots")
+        models.SchemaVersion.__table__.create(bind=conn, checkfirst=True)
+
+        # Re-read under the lock: another worker may have finished while we waited
+        applied = _applied_versions(conn) or set()
+
+        if fresh_database:
+            # create_all already produces the latest schema; only the optional extras still need applying
+            Base.metadata.create_all(bind=conn)
+            print("INFO: Created database schema")
+
+        for migration in MIGRATIONS:
+            if migration.version in applied:
+                continue
+            if fresh_database and not migration.optional:
+                _stamp(conn, migration)
+                continue
+
+            if migration.optional:
+                savepoint = conn.begin_nested()
+                try:
+                    migration.apply(conn)
+                    savepoint.commit()
+                except Exception as e:
+                    # Left unstamped, so the next boot tries it again
+                    savepoint.rollback()
+                    print(f"WARNING: Optional migration {migration.version} ({migration.description}) skipped: {e}")
+                    continue
+            else:
+                migration.apply(conn)
+            _stamp(conn, migration)
+            print(f"INFO: Applied migration {migration.version}: {migration.description}")
+
+    return LATEST_VERSION
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, text, JSON, Index, Float, Text
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.sql import func
 from .database import Base
 
 class GraphSnapshot(Base):
     __tablename__ = "graph_snapshots"
+    __table_args__ = (
+        # Backs keyset pagination ordered by (created_at, id)
+        Index("ix_graph_snapshots_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -35,7 +39,7 @@ class NodeRedirect(Base):
     __tablename__ = "node_redirects"
 
     id = Column(Integer, primary_key=True, index=True)
-    snapshot_id = Column(Integer, ForeignKey("graph_snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("graph_snapshots.id"), index=True)
     old_local_id = Column(Integer, nullable=False)
     new_local_id = Column(Integer, nullable=False)
     # The timestamp of the redirect acts as the version control
@@ -45,9 +49,14 @@ class NodeRedirect(Base):
 
 class Node(Base):
     __tablename__ = "nodes"
+    __table_args__ = (
+        # Level-of-detail reads fetch one domain's nodes or one node at a time
+        Index("ix_nodes_snapshot_domain", "snapshot_id", "domain_id"),
+        Index("ix_nodes_snapshot_local_id", "snapshot_id", "local_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    snapshot_id = Column(Integer, ForeignKey("graph_snapshots.id"))
+    snapshot_id = Column(Integer, ForeignKey("graph_snapshots.id"), index=True)
     domain_id = Column(Integer, ForeignKey("domains.id"), nullable=True)
     
     # The ID used by the user in the graph (1, 2, 3...)
@@ -65,11 +74,24 @@ class Node(Base):
     domain = relationship("Domain", back_populates="node_objects")
     source_items = relationship("Source", back_populates="node", cascade="all, delete-orphan")
 
+class NodeEdge(Base):
+    """One prerequisite reference: to_local_id's expression names from_local_id.
+    Derived from the parsed prerequisites on every save; indexed both ways."""
+    __tablename__ = "node_edges"
+    __table_args__ = (
+        Index("ix_node_edges_dependents", "snapshot_id", "from_local_id", "to_local_id"),
+    )
+
+    # The primary key doubles as the dependencies index: (snapshot_id, to_local_id) -> from_local_id
+    snapshot_id = Column(Integer, ForeignKey("graph_snapshots.id"), primary_key=True)
+    to_local_id = Column(Integer, primary_key=True)
+    from_local_id = Column(Integer, primary_key=True)
+
 class Source(Base):
     __tablename__ = "sources"
 
     id = Column(Integer, primary_key=True, index=True)
-    node_id = Column(Integer, ForeignKey("nodes.id"), nullable=False)
+    node_id = Column(Integer, ForeignKey("nodes.id"), nullable=False, index=True)
     
     title = Column(String, nullable=False)
     author = Column(String, nullable=True)
@@ -138,3 +160,39 @@ class Capability(Base):
     assessed_nodes = Column(JSON, nullable=False)
 
     user = relationship("User", backref="capabilities")
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    # One row per applied migration step (see app/migrations.py)
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued job
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # handler name, see app/jobs.py
+    status = Column(String, nullable=False, default="queued", server_default="queued")  # queued, running, succeeded, failed, cancelled
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    params = Column(JSON, nullable=False)
+
+    progress = Column(Float, default=0.0, server_default=text("0"), nullable=False)  # 0.0 - 1.0
+    message = Column(String, nullable=True)
+    cancel_requested = Column(Boolean, default=False, server_default=text('false'), nullable=False)
+    attempts = Column(Integer, default=0, server_default=text("0"), nullable=False)
+    worker_id = Column(String, nullable=True)
+
+    result = Column(Text, nullable=True)  # JSON document, or file content when result_name is set
+    result_name = Column(String, nullable=True)  # download filename
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
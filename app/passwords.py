@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from . import utils
+
+# bcrypt is deliberately slow (~250ms at cost 12). Running it on the shared threadpool lets a
+# login burst starve every other sync handler, so password work goes to its own small executor
+# with a hard cap on queued jobs. Callers await these coroutines from async handlers.
+
+PASSWORD_EXECUTOR = os.getenv("PASSWORD_EXECUTOR", "thread")  # "thread" or "process"
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+# Jobs allowed in flight (running + queued) before new ones are rejected
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", "32"))
+
+_executor: Optional[Executor] = None
+
+# Counters are only touched from the event loop thread, so they need no lock
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "wait_seconds_total": 0.0,
+    "run_seconds_total": 0.0,
+}
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password executor queue is full."""
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PASSWORD_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def _timed(fn, *args):
+    # Runs in the worker; wall clock timestamps so the wait time also works across processes
+    started_at = time.time()
+    result = fn(*args)
+    return started_at, time.time() - started_at, result
+
+
+async def _submit(fn, *args):
+    if _stats["in_flight"] >= PASSWORD_MAX_QUEUE:
+        _stats["rejected"] += 1
+        raise PasswordPoolBusy("Too many concurrent password operations")
+
+    _stats["submitted"] += 1
+    _stats["in_flight"] += 1
+    _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+    submitted_at = time.time()
+    try:
+        loop = asyncio.get_running_loop()
+        started_at, run_seconds, result = await loop.run_in_executor(_get_executor(), _timed, fn, *args)
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    finally:
+        _stats["in_flight"] -= 1
+
+    _stats["completed"] += 1
+    _stats["wait_seconds_total"] += max(started_at - submitted_at, 0.0)
+    _stats["run_seconds_total"] += run_seconds
+    return result
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(utils.get_password_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _submit(utils.verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _submit(utils.verify_and_update_password, plain_password, hashed_password)
+
+
+def get_stats() -> dict:
+    return dict(_stats, executor=PASSWORD_EXECUTOR, workers=PASSWORD_WORKERS, max_queue=PASSWORD_MAX_QUEUE)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
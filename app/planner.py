@@ -0,0 +1,209 @@
+import os
+from itertools import product
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy.orm import Session
+from . import analytics
+from .cache import TTLCache
+
+# Learning-path planning over AND/OR prerequisites.
+#
+# Given target nodes and what a learner has already mastered, find a small set of nodes to
+# learn: every target must become unlocked, where a node is unlocked when it is mastered or
+# learned, and learning it needs its prerequisite expression satisfied. It's an AND-OR graph
+# search, solved bottom-up over the targets' ancestor cone (cut at mastered nodes) with the
+# requirement set of every node memoized as an int bitset over the cone:
+#   AND  needs the union of its operands' sets
+#   OR   takes the operand whose set is cheapest
+# The per-version index precompiles every expression to disjunctive normal form (a list of
+# AND-terms, at most MAX_DNF_TERMS), so choosing among alternatives is a flat loop of unions and
+# popcounts instead of a recursive walk, and shared requirements inside a term are counted once.
+# Larger expressions keep their expression tree. Weighted costs are quantized to WEIGHT_BITS
+# bit planes, so a cost is a handful of masked popcounts. A last top-down pass drops selected
+# nodes that other branches made redundant.
+# Results are exact when alternatives don't share requirements and a close upper bound otherwise.
+
+index_cache = TTLCache(maxsize=16, ttl=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600")))
+
+MAX_DNF_TERMS = 32
+WEIGHT_BITS = 6
+
+
+class PlanIndex(NamedTuple):
+    graph: analytics.CompiledGraph
+    terms: List[Optional[List[tuple]]]  # per index: DNF terms of indices, [] without prerequisites, None = use the tree
+
+
+class Plan(NamedTuple):
+    steps: List[int]         # local ids to learn, prerequisites first
+    cost: float
+    unreachable: List[int]   # targets on a prerequisite cycle
+
+
+def _dnf(expr) -> Optional[List[frozenset]]:
+    if isinstance(expr, int):
+        return [frozenset((expr,))]
+    parts = [_dnf(child) for child in expr[1]]
+    if any(part is None for part in parts):
+        return None
+    if expr[0]:
+        size = 1
+        for part in parts:
+            size *= len(part)
+        if size > MAX_DNF_TERMS:
+            return None
+        terms = [frozenset().union(*combination) for combination in product(*parts)]
+    else:
+        terms = [term for part in parts for term in part]
+        if len(terms) > MAX_DNF_TERMS:
+            return None
+    # Absorption: a term containing another term is never cheaper
+    terms = sorted(set(terms), key=len)
+    return [term for k, term in enumerate(terms) if not any(other < term for other in terms[:k])]
+
+
+def build_index(graph: analytics.CompiledGraph) -> PlanIndex:
+    terms = []
+    for expr in graph.exprs:
+        if expr is None:
+            terms.append([])
+            continue
+        dnf = _dnf(expr)
+        terms.append([tuple(term) for term in dnf] if dnf is not None else None)
+    return PlanIndex(graph, terms)
+
+
+def get_index(db: Session, snapshot_id: int, version) -> PlanIndex:
+    key = (snapshot_id, str(version))
+    index = index_cache.get(key)
+    if index is None:
+        index = build_index(analytics.get_compiled(db, snapshot_id, version))
+        index_cache.set(key, index)
+    return index
+
+
+def _weight_planes(cone: List[int], graph: analytics.CompiledGraph, weights: Dict[int, float]):
+    """Quantized weights over the cone and their bit planes: plane b holds the nodes whose
+    quantized weight has bit b set."""
+    import numpy as np
+
+    values = np.array([max(weights.get(graph.local_ids[i], 1.0), 0.0) for i in cone], dtype=np.float64)
+    top = values.max() if len(values) else 0.0
+    levels = np.rint(values / top * ((1 << WEIGHT_BITS) - 1)).astype(np.int64) if top > 0 else np.zeros(len(values), dtype=np.int64)
+    return levels.tolist(), [
+        (bit, int.from_bytes(np.packbits((levels >> bit) & 1, bitorder="little").tobytes(), "little"))
+        for bit in range(WEIGHT_BITS)
+    ]
+
+
+def plan(index: PlanIndex, targets: Iterable[int], mastered: Iterable[int] = (), weights: Optional[Dict[int, float]] = None) -> Plan:
+    """Nodes to learn so that all targets (local ids, which must exist) are unlocked."""
+    graph = index.graph
+    mastered = {graph.index[local_id] for local_id in mastered if local_id in graph.index}
+    targets = [graph.index[local_id] for local_id in targets]
+    unreachable = [graph.local_ids[i] for i in targets if i not in graph.position]
+
+    # Ancestor cone of the targets, not expanded past mastered nodes
+    seen = set()
+    stack = [i for i in targets if i in graph.position and i not in mastered]
+    while stack:
+        i = stack.pop()
+        if i in seen:
+            continue
+        seen.add(i)
+        stack.extend(r for r in graph.refs[i] if r not in seen and r not in mastered)
+    cone = sorted(seen, key=graph.position.__getitem__)
+    if weights:
+        own_costs, planes = _weight_planes(cone, graph, weights)
+
+        def cost(bits: int) -> int:
+            return sum((bits & plane).bit_count() << bit for bit, plane in planes)
+    else:
+        own_costs, cost = None, int.bit_count
+
+    # Mastered nodes need nothing; everything else is filled in topological order. A node's
+    # cost is memoized, so single-node terms need no popcount and a term can be skipped when one
+    # of its nodes alone already costs as much as the best term so far.
+    values: Dict[int, int] = dict.fromkeys(mastered, 0)
+    costs: Dict[int, int] = dict.fromkeys(mastered, 0)
+
+    def evaluate(expr) -> int:
+        if isinstance(expr, int):
+            return values[expr]
+        items = [evaluate(child) for child in expr[1]]
+        if not expr[0]:
+            return min(items, key=cost)
+        result = 0
+        for item in items:
+            result |= item
+        return result
+
+    for p, i in enumerate(cone):
+        terms = index.terms[i]
+        if terms is None:
+            requirement = evaluate(graph.exprs[i])
+            best = cost(requirement)
+        elif not terms:
+            requirement, best = 0, 0
+        else:
+            requirement, best = None, None
+            for term in terms:
+                if len(term) == 1:
+                    term_cost = costs[term[0]]
+                    if best is None or term_cost < best:
+                        requirement, best = values[term[0]], term_cost
+                    continue
+                if best is not None and max(costs[r] for r in term) >= best:
+                    continue
+                bits = 0
+                for r in term:
+                    bits |= values[r]
+                term_cost = cost(bits)
+                if best is None or term_cost < best:
+                    requirement, best = bits, term_cost
+        values[i] = requirement | (1 << p)
+        costs[i] = best + (own_costs[p] if own_costs else 1)
+
+    selected = 0
+    for i in targets:
+        if i in graph.position:
+            selected |= values[i]
+    selected = [cone[p] for p, bit in enumerate(bin(selected)[:1:-1]) if bit == "1"]
+
+    # Pruning pass, from the targets down: every needed node re-picks its alternatives among
+    # the selected nodes, preferring ones already needed, so a node picked for an OR that
+    # another branch makes redundant is dropped.
+    available = set(selected) | mastered
+    needed = {i for i in targets if i in graph.position}
+
+    def weight(i: int) -> float:
+        if i in needed or i in mastered:
+            return 0.0
+        return max(weights.get(graph.local_ids[i], 1.0), 0.0) if weights else 1.0
+
+    def pick(expr) -> Optional[List[int]]:
+        if isinstance(expr, int):
+            return [expr] if expr in available else None
+        parts = [pick(child) for child in expr[1]]
+        if expr[0]:
+            return None if any(part is None for part in parts) else [i for part in parts for i in part]
+        return min((part for part in parts if part is not None), key=lambda part: sum(map(weight, set(part))), default=None)
+
+    for i in reversed(selected):
+        if i not in needed or graph.exprs[i] is None:
+            continue
+        terms = index.terms[i]
+        if terms is None:
+            needed.update(pick(graph.exprs[i]))
+        elif len(terms) == 1:
+            needed.update(terms[0])
+        else:
+            needed.update(min(
+                (term for term in terms if available.issuperset(term)),
+                key=lambda term: sum(map(weight, term)),
+            ))
+    steps = [graph.local_ids[i] for i in selected if i in needed]
+    if weights:
+        total = sum(max(weights.get(local_id, 1.0), 0.0) for local_id in steps)
+    else:
+        total = float(len(steps))
+    return Plan(steps, total, unreachable)
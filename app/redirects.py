@@ -0,0 +1,58 @@
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from . import models
+from .cache import TTLCache
+
+# Resolution of historical node ids through NodeRedirect chains.
+#
+# Redirect rows accumulate across saves of a graph (old -> new, later new -> newer, ...).
+# The resolver treats them as a union-find forest: each old id points at its successor and
+# current nodes are the roots. Finding an id walks the chain once and then points every id on
+# the path straight at where it ended (path compression), so repeated lookups are O(1).
+# Resolvers are cached per snapshot version (id + last_updated).
+
+resolver_cache = TTLCache(maxsize=64, ttl=float(os.getenv("REDIRECT_CACHE_TTL_SECONDS", "3600")))
+
+
+class RedirectResolver:
+    def __init__(self, redirects: Iterable[Tuple[int, int]], current_ids: Set[int]):
+        # Rows in creation order: when an old id was redirected more than once, the newest wins
+        self.parent: Dict[int, int] = {}
+        for old_id, new_id in redirects:
+            if old_id != new_id:
+                self.parent[old_id] = new_id
+        self.current_ids = current_ids
+
+    def find(self, local_id: int) -> Optional[int]:
+        """The current node an id maps to (itself if it is current), or None if the chain
+        ends at a node that no longer exists."""
+        path: List[int] = []
+        node = local_id
+        seen = set()
+        while node not in self.current_ids and node in self.parent and node not in seen:
+            seen.add(node)
+            path.append(node)
+            node = self.parent[node]
+        for visited in path:
+            self.parent[visited] = node
+        return node if node in self.current_ids else None
+
+    def resolve(self, local_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+        return {local_id: self.find(local_id) for local_id in local_ids}
+
+
+def get_resolver(db: Session, snapshot_id: int, version) -> RedirectResolver:
+    key = (snapshot_id, str(version))
+    resolver = resolver_cache.get(key)
+    if resolver is None:
+        rows = (
+            db.query(models.NodeRedirect.old_local_id, models.NodeRedirect.new_local_id)
+            .filter(models.NodeRedirect.snapshot_id == snapshot_id)
+            .order_by(models.NodeRedirect.created_at, models.NodeRedirect.id)
+            .all()
+        )
+        current_ids = {row[0] for row in db.query(models.Node.local_id).filter(models.Node.snapshot_id == snapshot_id)}
+        resolver = RedirectResolver(rows, current_ids)
+        resolver_cache.set(key, resolver)
+    return resolver
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Union, Dict, Any
 from datetime import datetime
 
@@ -129,8 +129,50 @@ class GraphSnapshotCreate(GraphSnapshotBase):
     nodes: List[NodeCreate]
     domains: List[DomainCreate] = []
     overwrite: bool = False
+    auto_layout: bool = False # compute node positions on the server (layered layout) instead of using x/y
     redirects: Optional[Dict[str, int]] = None # old_id -> new_id map from frontend
 
+class LayoutResult(BaseModel):
+    node_count: int
+    layer_count: int
+    width: int
+    height: int
+
+class NodeEdgeRead(BaseModel):
+    from_local_id: int  # the prerequisite
+    to_local_id: int    # the node requiring it
+
+class NeighborNode(BaseModel):
+    local_id: int
+    title: str
+    distance: int
+
+class NodeNeighborhood(BaseModel):
+    local_id: int
+    direction: str
+    hops: int
+    nodes: List[NeighborNode]
+    edges: List[NodeEdgeRead]
+
+class RedirectResolveRequest(BaseModel):
+    local_ids: List[int]
+
+class RedirectResolveResponse(BaseModel):
+    # Historical id -> current id; null when the node was removed without a redirect
+    resolved: Dict[int, Optional[int]]
+
+class GraphValidationIssue(BaseModel):
+    type: str  # duplicate_id | syntax | dangling_reference | cycle
+    message: str
+    node_id: Optional[int] = None
+    missing_ids: Optional[List[int]] = None
+    node_ids: Optional[List[int]] = None  # cycle path, each node requiring the next
+
+class GraphValidationResult(BaseModel):
+    valid: bool
+    error_count: int
+    errors: List[GraphValidationIssue]
+
 class GraphSnapshotUpdate(BaseModel):
     version_label: Optional[str] = None
     is_public: Optional[bool] = None
@@ -151,6 +193,111 @@ class GraphSnapshotRead(GraphSnapshotBase):
     class Config:
         from_attributes = True
 
+class NodeSummary(BaseModel):
+    local_id: int
+    title: str
+    prerequisite: Optional[str] = None
+    domain_local_id: Optional[int] = None
+    x: Optional[int] = None
+    y: Optional[int] = None
+    assessable: bool = False
+
+class NodeDetail(NodeRead):
+    domain_local_id: Optional[int] = None
+
+class DomainOutline(BaseModel):
+    local_id: int
+    title: str
+    description: Optional[str] = None
+    parent_local_id: Optional[int] = None
+    collapsed: bool
+    expanded: bool  # its nodes are included (it and all its ancestors are expanded)
+    node_count: int  # nodes directly in the domain
+    total_node_count: int  # including sub-domains
+    assessable_count: int  # including sub-domains
+    x: Optional[int] = None  # centroid of the positioned nodes, for drawing it collapsed
+    y: Optional[int] = None
+
+class GraphOutline(BaseModel):
+    id: int
+    version_label: Optional[str]
+    created_at: datetime
+    last_updated: datetime
+    is_public: bool = False
+    node_count: int
+    assessable_node_count: int = 0
+    domains: List[DomainOutline]
+    nodes: List[NodeSummary]
+
+class ViewportNode(BaseModel):
+    id: str  # "node_<local_id>"
+    local_id: int
+    title: str
+    x: int
+    y: int
+    domain_local_id: Optional[int] = None
+    assessable: bool = False
+
+class ViewportCluster(BaseModel):
+    id: str  # "cluster_<n>", only meaningful within one response
+    count: int
+    x: int
+    y: int
+
+class ViewportEdge(BaseModel):
+    from_id: str  # the prerequisite (node or cluster)
+    to_id: str
+    count: int = 1  # node edges merged into this one
+
+class Viewport(BaseModel):
+    total: int  # nodes inside the box
+    clustered: bool
+    nodes: List[ViewportNode]
+    clusters: List[ViewportCluster] = []
+    edges: List[ViewportEdge]
+    unplaced: int = 0  # nodes of the graph without a stored position
+
+class NodeMetrics(BaseModel):
+    local_id: int
+    title: str
+    depth: int  # levels needed to unlock it (AND = slowest operand, OR = fastest)
+    fan_in: int
+    fan_out: int
+    necessary_count: int  # prerequisites it can't be unlocked without
+    bottleneck: int  # nodes that can't be unlocked without it
+
+class GraphAnalytics(BaseModel):
+    node_count: int
+    edge_count: int
+    max_depth: int
+    critical_path: List[int]  # the deepest node's critical chain
+    cyclic: List[int] = []  # nodes left out: on or behind a prerequisite cycle
+    incremental: bool  # patched from the previous version's results
+    nodes: List[NodeMetrics]
+
+class NodeAnalytics(NodeMetrics):
+    critical_chain: List[int]
+    unlock_set: List[int]  # a minimal set of nodes to learn to unlock it, including itself
+
+class LearningPathRequest(BaseModel):
+    graph_label: str
+    targets: List[int]
+    mastered: Optional[List[int]] = None  # defaults to the nodes of the latest self-assessment
+    mastery_level: int = 2  # self-assessment value that counts as mastered
+    weights: Optional[Dict[int, float]] = None  # learning effort per node, 1 when missing
+
+class LearningStep(BaseModel):
+    local_id: int
+    title: str
+
+class LearningPath(BaseModel):
+    graph_label: str
+    targets: List[int]
+    steps: List[LearningStep]  # prerequisites first
+    cost: float
+    mastered_count: int
+    unreachable: List[int] = []  # targets on a prerequisite cycle
+
 class GraphSnapshotSummary(BaseModel):
     id: int
     created_at: datetime
@@ -165,11 +312,46 @@ class GraphSnapshotSummary(BaseModel):
     
     class Config:
         from_attributes = True
+
+class NodeSearchHit(BaseModel):
+    local_id: int
+    title: str
+    matched: str  # "node" (title/description) or "source" (source title)
+    score: float
+
+class SnapshotSearchResult(GraphSnapshotSummary):
+    score: float = 0.0
+    node_hits: List[NodeSearchHit] = []
+
+class GraphSnapshotPage(BaseModel):
+    items: List[GraphSnapshotSummary]
+    next_cursor: Optional[str] = None  # Opaque; pass back as ?cursor= to fetch the next page
     
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued, running, succeeded, failed, cancelled
+    progress: float = 0.0
+    message: Optional[str] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    result_name: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+LLM_CONTEXT_MAX_TOKENS = 8000
+
 class LLMQuery(BaseModel):
     prompt: str
     context: Optional[str] = None
     graph_name: Optional[str] = None
+    # Build the context on the server from this saved graph instead of `context`
+    graph_label: Optional[str] = None
+    context_tokens: Optional[int] = Field(None, ge=1, le=LLM_CONTEXT_MAX_TOKENS)
 
 class LLMSuggestion(BaseModel):
     title: str
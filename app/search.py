@@ -0,0 +1,219 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Index-backed search over snapshot labels, node titles/descriptions and source titles.
+# Postgres uses tsvector + pg_trgm GIN indexes, SQLite uses FTS5 tables kept in sync by triggers.
+# If neither is available (missing extension, old SQLite) search degrades to LIKE scans.
+
+# Detected on first search: "postgres", "sqlite_fts" or "like" (fallback)
+_backend: Optional[str] = None
+
+# Weight of a label match relative to the best node hit when ranking graphs
+LABEL_WEIGHT = 2.0
+
+# The tsvector expressions must match the index expressions exactly for Postgres to use them
+_PG_NODE_TSV = "to_tsvector('simple', coalesce(n.title, '') || ' ' || coalesce(n.description, ''))"
+_PG_SOURCE_TSV = "to_tsvector('simple', s.title)"
+
+_PG_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_graph_snapshots_label_trgm ON graph_snapshots USING gin (version_label gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_nodes_title_trgm ON nodes USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_nodes_fts ON nodes USING gin ("
+    "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))",
+    "CREATE INDEX IF NOT EXISTS ix_sources_fts ON sources USING gin (to_tsvector('simple', title))",
+]
+
+# (fts table, content table, indexed columns, tokenizer)
+_SQLITE_FTS_TABLES = [
+    ("snapshot_search_fts", "graph_snapshots", ["version_label"], "trigram"),
+    ("node_search_fts", "nodes", ["title", "description"], "unicode61 remove_diacritics 2"),
+    ("source_search_fts", "sources", ["title"], "unicode61 remove_diacritics 2"),
+]
+
+
+class NodeHit(NamedTuple):
+    snapshot_id: int
+    local_id: int
+    title: str
+    matched: str  # "node" or "source"
+    score: float
+
+
+def _tokens(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def _sqlite_fts_statements(fts: str, table: str, columns: List[str], tokenizer: str) -> List[str]:
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"new.{c}" for c in columns)
+    old_vals = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='{tokenizer}')",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def create_search_indexes(conn):
+    """Create the search indexes for the connection's dialect. Idempotent; run by the migration runner."""
+    dialect_name = conn.dialect.name
+    if dialect_name == "postgresql":
+        for statement in _PG_SETUP:
+            conn.execute(text(statement))
+    elif dialect_name == "sqlite":
+        for fts, table, columns, tokenizer in _SQLITE_FTS_TABLES:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": fts}
+            ).first()
+            statements = _sqlite_fts_statements(fts, table, columns, tokenizer)
+            if exists:
+                # Table already populated; only make sure the sync triggers exist
+                statements = statements[2:]
+            for statement in statements:
+                conn.execute(text(statement))
+
+
+def _detect_backend(db: Session) -> Optional[str]:
+    dialect_name = db.get_bind().dialect.name
+    try:
+        if dialect_name == "postgresql":
+            found = db.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_nodes_fts'")).first()
+            return "postgres" if found else None
+        if dialect_name == "sqlite":
+            found = db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'node_search_fts'")).first()
+            return "sqlite_fts" if found else None
+    except Exception as e:
+        print(f"WARNING: Could not detect search indexes, falling back to LIKE search: {e}")
+    return None
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_postgres(db: Session, query: str, limit: int, node_limit: int):
+    tokens = _tokens(query)
+    label_rows = db.execute(text(
+        "SELECT id, similarity(version_label, :q) AS score FROM graph_snapshots "
+        "WHERE version_label ILIKE :pattern ESCAPE '\\' OR version_label % :q "
+        "ORDER BY score DESC LIMIT :limit"
+    ), {"q": query, "pattern": f"%{_escape_like(query)}%", "limit": limit}).all()
+
+    hits = []
+    if tokens:
+        tsquery = " & ".join(f"{t}:*" for t in tokens)
+        hits.extend(NodeHit(*row[:3], "node", row[3]) for row in db.execute(text(
+            f"SELECT n.snapshot_id, n.local_id, n.title, "
+            f"ts_rank({_PG_NODE_TSV}, to_tsquery('simple', :tsq)) + similarity(n.title, :q) AS score "
+            f"FROM nodes n WHERE {_PG_NODE_TSV} @@ to_tsquery('simple', :tsq) OR n.title % :q "
+            f"ORDER BY score DESC LIMIT :limit"
+        ), {"q": query, "tsq": tsquery, "limit": node_limit}))
+        hits.extend(NodeHit(*row[:3], "source", row[3]) for row in db.execute(text(
+            f"SELECT n.snapshot_id, n.local_id, n.title, ts_rank({_PG_SOURCE_TSV}, to_tsquery('simple', :tsq)) AS score "
+            f"FROM sources s JOIN nodes n ON n.id = s.node_id WHERE {_PG_SOURCE_TSV} @@ to_tsquery('simple', :tsq) "
+            f"ORDER BY score DESC LIMIT :limit"
+        ), {"tsq": tsquery, "limit": node_limit}))
+
+    return {row[0]: float(row[1]) for row in label_rows}, hits
+
+
+def _search_sqlite_fts(db: Session, query: str, limit: int, node_limit: int):
+    # The trigram tokenizer needs at least three characters to match anything
+    if len(query) >= 3:
+        label_rows = db.execute(text(
+            "SELECT rowid, -bm25(snapshot_search_fts) AS score FROM snapshot_search_fts "
+            "WHERE snapshot_search_fts MATCH :match ORDER BY score DESC LIMIT :limit"
+        ), {"match": '"' + query.replace('"', '""') + '"', "limit": limit}).all()
+    else:
+        label_rows = db.execute(text(
+            "SELECT id, 1.0 FROM graph_snapshots WHERE version_label LIKE :pattern ESCAPE '\\' LIMIT :limit"
+        ), {"pattern": f"%{_escape_like(query)}%", "limit": limit}).all()
+
+    hits = []
+    tokens = _tokens(query)
+    if tokens:
+        match = " ".join(f'"{t}"*' for t in tokens)
+        hits.extend(NodeHit(*row[:3], "node", row[3]) for row in db.execute(text(
+            "SELECT n.snapshot_id, n.local_id, n.title, -bm25(node_search_fts, 2.0, 1.0) AS score "
+            "FROM node_search_fts JOIN nodes n ON n.id = node_search_fts.rowid "
+            "WHERE node_search_fts MATCH :match ORDER BY score DESC LIMIT :limit"
+        ), {"match": match, "limit": node_limit}))
+        hits.extend(NodeHit(*row[:3], "source", row[3]) for row in db.execute(text(
+            "SELECT n.snapshot_id, n.local_id, n.title, -bm25(source_search_fts) AS score "
+            "FROM source_search_fts JOIN sources s ON s.id = source_search_fts.rowid JOIN nodes n ON n.id = s.node_id "
+            "WHERE source_search_fts MATCH :match ORDER BY score DESC LIMIT :limit"
+        ), {"match": match, "limit": node_limit}))
+
+    return {row[0]: float(row[1]) for row in label_rows}, hits
+
+
+def _search_like(db: Session, query: str, limit: int, node_limit: int):
+    pattern = f"%{_escape_like(query)}%"
+    label_rows = db.execute(text(
+        "SELECT id FROM graph_snapshots WHERE lower(version_label) LIKE lower(:pattern) ESCAPE '\\' LIMIT :limit"
+    ), {"pattern": pattern, "limit": limit}).all()
+    hits = [NodeHit(*row, "node", 1.0) for row in db.execute(text(
+        "SELECT snapshot_id, local_id, title FROM nodes "
+        "WHERE lower(title) LIKE lower(:pattern) ESCAPE '\\' OR lower(description) LIKE lower(:pattern) ESCAPE '\\' "
+        "LIMIT :limit"
+    ), {"pattern": pattern, "limit": node_limit})]
+    hits.extend(NodeHit(*row, "source", 1.0) for row in db.execute(text(
+        "SELECT n.snapshot_id, n.local_id, n.title FROM sources s JOIN nodes n ON n.id = s.node_id "
+        "WHERE lower(s.title) LIKE lower(:pattern) ESCAPE '\\' LIMIT :limit"
+    ), {"pattern": pattern, "limit": node_limit}))
+    return {row[0]: 1.0 for row in label_rows}, hits
+
+
+def search(db: Session, query: str, limit: int = 10, nodes_per_graph: int = 5):
+    """
+    Rank graphs by label match and node/source hits.
+    Returns [(snapshot_id, score, [NodeHit, ...])] ordered by descending score.
+    """
+    global _backend
+    query = query.strip()
+    if not query:
+        return []
+
+    # Over-fetch node hits so that each of the top graphs can still show a few of them
+    node_limit = max(limit * max(nodes_per_graph, 1) * 4, 50)
+    if _backend is None:
+        _backend = _detect_backend(db) or "like"
+
+    if _backend == "postgres":
+        label_scores, hits = _search_postgres(db, query, limit, node_limit)
+    elif _backend == "sqlite_fts":
+        label_scores, hits = _search_sqlite_fts(db, query, limit, node_limit)
+    else:
+        label_scores, hits = _search_like(db, query, limit, node_limit)
+
+    # Keep the best hit per node (a node can match on its own text and on a source)
+    best_hits: Dict[tuple, NodeHit] = {}
+    for hit in hits:
+        key = (hit.snapshot_id, hit.local_id)
+        if key not in best_hits or hit.score > best_hits[key].score:
+            best_hits[key] = hit
+
+    hits_by_snapshot: Dict[int, List[NodeHit]] = {}
+    for hit in sorted(best_hits.values(), key=lambda h: h.score, reverse=True):
+        hits_by_snapshot.setdefault(hit.snapshot_id, []).append(hit)
+
+    results = []
+    for snapshot_id in set(label_scores) | set(hits_by_snapshot):
+        snapshot_hits = hits_by_snapshot.get(snapshot_id, [])
+        score = LABEL_WEIGHT * label_scores.get(snapshot_id, 0.0)
+        if snapshot_hits:
+            score += snapshot_hits[0].score
+        results.append((snapshot_id, score, snapshot_hits[:nodes_per_graph]))
+
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results[:limit]
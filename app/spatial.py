@@ -0,0 +1,196 @@
+import os
+from typing import List, NamedTuple, Optional
+from sqlalchemy.orm import Session
+from . import models
+from .cache import TTLCache
+
+# Viewport queries over the stored node positions (Node.x / Node.y).
+#
+# Each snapshot version gets a uniform grid index, built on first use and cached: positioned
+# nodes are sorted by cell (row-major), with a CSR offset array per cell, so one row of cells
+# inside a bounding box is one contiguous slice. A query gathers those slices, filters
+# exactly, and returns the nodes with the edges between them. When zoomed out (or when the box
+# holds more than `limit` nodes) nodes are merged per screen-sized cell into clusters, and
+# edges are aggregated between clusters.
+# NumPy is imported on first use.
+
+spatial_cache = TTLCache(maxsize=32, ttl=float(os.getenv("SPATIAL_CACHE_TTL_SECONDS", "3600")))
+
+NODES_PER_CELL = 4
+MAX_GRID_SIDE = 1024
+CLUSTER_ZOOM = 0.35     # below this vis.js scale nodes are always clustered
+CLUSTER_PIXELS = 120    # on-screen size of a cluster cell
+
+
+class SpatialIndex(NamedTuple):
+    local_ids: object    # np arrays, in cell order
+    xs: object
+    ys: object
+    titles: List[str]
+    domains: List[Optional[int]]
+    assessable: List[bool]
+    min_x: float
+    min_y: float
+    cell_size: float
+    columns: int
+    rows: int
+    cell_start: object   # CSR offsets, one per cell + 1
+    edge_from: object    # edges as positions into the arrays above
+    edge_to: object
+    unplaced: int
+
+
+def _build_index(db: Session, snapshot_id: int) -> SpatialIndex:
+    import numpy as np
+
+    domain_local_ids = dict(db.query(models.Domain.id, models.Domain.local_id).filter(models.Domain.snapshot_id == snapshot_id))
+    rows = (
+        db.query(models.Node.local_id, models.Node.title, models.Node.x, models.Node.y, models.Node.domain_id, models.Node.assessable)
+        .filter(models.Node.snapshot_id == snapshot_id)
+        .all()
+    )
+    placed = [row for row in rows if row.x is not None and row.y is not None]
+    n = len(placed)
+    xs = np.fromiter((row.x for row in placed), dtype=np.float64, count=n)
+    ys = np.fromiter((row.y for row in placed), dtype=np.float64, count=n)
+    min_x, min_y = (float(xs.min()), float(ys.min())) if n else (0.0, 0.0)
+    width, height = (float(xs.max()) - min_x, float(ys.max()) - min_y) if n else (0.0, 0.0)
+
+    # Cells sized for a few nodes each on average, within MAX_GRID_SIDE per side
+    cell_size = max(((width * height) / max(n, 1) * NODES_PER_CELL) ** 0.5, width / MAX_GRID_SIDE, height / MAX_GRID_SIDE, 1.0)
+    columns = int(width // cell_size) + 1
+    grid_rows = int(height // cell_size) + 1
+    cell = ((ys - min_y) // cell_size).astype(np.int64) * columns + ((xs - min_x) // cell_size).astype(np.int64)
+    order = np.argsort(cell, kind="stable")
+    cell_start = np.zeros(columns * grid_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cell, minlength=columns * grid_rows), out=cell_start[1:])
+
+    sorted_rows = [placed[i] for i in order]
+    position = {row.local_id: i for i, row in enumerate(sorted_rows)}
+    edges = [
+        (position[from_id], position[to_id])
+        for from_id, to_id in db.query(models.NodeEdge.from_local_id, models.NodeEdge.to_local_id).filter(models.NodeEdge.snapshot_id == snapshot_id)
+        if from_id in position and to_id in position
+    ]
+    return SpatialIndex(
+        local_ids=np.fromiter((row.local_id for row in sorted_rows), dtype=np.int64, count=n),
+        xs=xs[order],
+        ys=ys[order],
+        titles=[row.title for row in sorted_rows],
+        domains=[domain_local_ids.get(row.domain_id) for row in sorted_rows],
+        assessable=[bool(row.assessable) for row in sorted_rows],
+        min_x=min_x,
+        min_y=min_y,
+        cell_size=cell_size,
+        columns=columns,
+        rows=grid_rows,
+        cell_start=cell_start,
+        edge_from=np.fromiter((a for a, _ in edges), dtype=np.int64, count=len(edges)),
+        edge_to=np.fromiter((b for _, b in edges), dtype=np.int64, count=len(edges)),
+        unplaced=len(rows) - n,
+    )
+
+
+def get_index(db: Session, snapshot_id: int, version) -> SpatialIndex:
+    key = (snapshot_id, str(version))
+    index = spatial_cache.get(key)
+    if index is None:
+        index = _build_index(db, snapshot_id)
+        spatial_cache.set(key, index)
+    return index
+
+
+def get_stats() -> dict:
+    return {
+        "index_cache_hits": spatial_cache.hits,
+        "index_cache_misses": spatial_cache.misses,
+        "index_cache_size": len(spatial_cache),
+    }
+
+
+def _in_box(index: SpatialIndex, min_x: float, min_y: float, max_x: float, max_y: float):
+    """Positions (into the index arrays) of the nodes inside the box."""
+    import numpy as np
+
+    if not len(index.xs):
+        return np.zeros(0, dtype=np.int64)
+    first_column = max(int((min_x - index.min_x) // index.cell_size), 0)
+    last_column = min(int((max_x - index.min_x) // index.cell_size), index.columns - 1)
+    first_row = max(int((min_y - index.min_y) // index.cell_size), 0)
+    last_row = min(int((max_y - index.min_y) // index.cell_size), index.rows - 1)
+    if first_column > last_column or first_row > last_row:
+        return np.zeros(0, dtype=np.int64)
+    starts = index.cell_start[np.arange(first_row, last_row + 1) * index.columns + first_column]
+    ends = index.cell_start[np.arange(first_row, last_row + 1) * index.columns + last_column + 1]
+    candidates = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+    xs, ys = index.xs[candidates], index.ys[candidates]
+    return candidates[(xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)]
+
+
+def query(index: SpatialIndex, min_x: float, min_y: float, max_x: float, max_y: float, zoom: float, limit: int) -> dict:
+    """Nodes (or clusters) inside the box and the edges between them. Ids are "node_<local_id>"
+    and "cluster_<n>"; clustered edges carry how many node edges they stand for."""
+    import numpy as np
+
+    inside = _in_box(index, min_x, min_y, max_x, max_y)
+    total = len(inside)
+
+    # Group label per node in view: itself, or its cluster cell
+    if total and (zoom < CLUSTER_ZOOM or total > limit):
+        xs, ys = index.xs[inside], index.ys[inside]
+        size = CLUSTER_PIXELS / zoom
+        while True:
+            column = ((xs - xs.min()) // size).astype(np.int64)
+            cells = ((ys - ys.min()) // size).astype(np.int64) * (int(column.max()) + 1) + column
+            keys, group = np.unique(cells, return_inverse=True)
+            if len(keys) <= limit:
+                break
+            size *= 2
+    else:
+        group = np.arange(total)
+    group_count = int(group.max()) + 1 if total else 0
+    counts = np.bincount(group, minlength=group_count)
+
+    labels = [None] * group_count
+    nodes, clusters = [], []
+    sum_x = np.bincount(group, weights=index.xs[inside], minlength=group_count)
+    sum_y = np.bincount(group, weights=index.ys[inside], minlength=group_count)
+    first = np.full(group_count, -1, dtype=np.int64)
+    first[group] = inside  # a member of every group (the only one of single-node groups)
+    for g in range(group_count):
+        if counts[g] == 1:
+            i = int(first[g])
+            labels[g] = f"node_{int(index.local_ids[i])}"
+            nodes.append({
+                "id": labels[g], "local_id": int(index.local_ids[i]), "title": index.titles[i],
+                "x": int(index.xs[i]), "y": int(index.ys[i]),
+                "domain_local_id": index.domains[i], "assessable": index.assessable[i],
+            })
+        else:
+            labels[g] = f"cluster_{len(clusters)}"
+            clusters.append({
+                "id": labels[g], "count": int(counts[g]),
+                "x": int(round(sum_x[g] / counts[g])), "y": int(round(sum_y[g] / counts[g])),
+            })
+
+    # Edges with both ends in view, relabelled to groups; intra-cluster edges are dropped
+    edges = []
+    if total and len(index.edge_from):
+        group_of = np.full(len(index.xs), -1, dtype=np.int64)
+        group_of[inside] = group
+        from_group, to_group = group_of[index.edge_from], group_of[index.edge_to]
+        keep = (from_group >= 0) & (to_group >= 0) & (from_group != to_group)
+        pairs, weights = np.unique(np.stack((from_group[keep], to_group[keep]), axis=1), axis=0, return_counts=True)
+        edges = [
+            {"from_id": labels[a], "to_id": labels[b], "count": int(w)}
+            for (a, b), w in zip(pairs.tolist(), weights.tolist())
+        ]
+
+    return {
+        "total": total,
+        "clustered": group_count < total,
+        "nodes": nodes,
+        "clusters": clusters,
+        "edges": edges,
+        "unplaced": index.unplaced,
+    }
@@ -0,0 +1,53 @@
+import random
+from app import analytics
+
+def _random_graph(count, seed):
+    rng = random.Random(seed)
+    rows = []
+    for local_id in range(1, count + 1):
+        candidates = list(range(1, local_id))
+        if local_id <= 3 or not candidates:
+            rows.append((local_id, f"Node {local_id}", None))
+            continue
+        ids = rng.sample(candidates, min(len(candidates), rng.randint(1, 4)))
+        if len(ids) >= 3:
+            prerequisite = f"{ids[0]} AND ({' OR '.join(map(str, ids[1:]))})"
+        else:
+            prerequisite = f" {rng.choice(['AND', 'OR'])} ".join(map(str, ids))
+        rows.append((local_id, f"Node {local_id}", prerequisite))
+    return rows
+
+def _fields(result):
+    return result.depth, result.necessary, result.bottleneck
+
+def test_depth_and_necessary():
+    graph = analytics.compile_graph([
+        (1, "A", None), (2, "B", None), (3, "C", "1 AND 2"), (4, "D", "3 OR 1"), (5, "E", "4 AND 2"),
+    ])
+    result = analytics.compute(graph)
+    assert result.depth == {1: 0, 2: 0, 3: 1, 4: 1, 5: 2}
+    # OR keeps only what both branches need (1); AND adds everything
+    assert result.necessary == {1: 0, 2: 0, 3: 2, 4: 1, 5: 3}
+    assert result.bottleneck == {1: 3, 2: 2, 3: 0, 4: 1, 5: 0}
+    assert analytics.critical_chain(result, 5) == [1, 4, 5]
+
+def test_incremental_matches_full_recompute():
+    for seed in range(5):
+        rows = _random_graph(60, seed)
+        old_graph = analytics.compile_graph(rows)
+        previous = (old_graph, analytics.compute(old_graph))
+
+        # A small save: one rewired expression, one removed leaf, one new node
+        rng = random.Random(seed)
+        edited = dict((row[0], row) for row in rows)
+        rewired = rng.randint(30, 50)
+        edited[rewired] = (rewired, f"Node {rewired}", f"{rng.randint(1, 10)} AND ({rng.randint(11, 20)} OR {rng.randint(21, 29)})")
+        leaf = next(old_graph.local_ids[i] for i in reversed(old_graph.order) if not old_graph.dependents[i] and old_graph.local_ids[i] != rewired)
+        del edited[leaf]
+        edited[61] = (61, "Node 61", f"{rewired} OR 5")
+        graph = analytics.compile_graph(edited.values())
+
+        incremental = analytics.compute(graph, previous)
+        full = analytics.compute(graph)
+        assert incremental.incremental and not full.incremental
+        assert _fields(incremental) == _fields(full)
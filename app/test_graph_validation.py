@@ -0,0 +1,40 @@
+import pytest
+from app import schemas
+from app.graph_validation import GraphValidationError, validate_snapshot
+
+def _snapshot(*nodes):
+    return schemas.GraphSnapshotCreate(
+        version_label="test_graph",
+        nodes=[{"local_id": local_id, "title": f"Node {local_id}", "prerequisite": prerequisite} for local_id, prerequisite in nodes]
+    )
+
+def _issues(*nodes):
+    with pytest.raises(GraphValidationError) as excinfo:
+        validate_snapshot(_snapshot(*nodes))
+    return [(issue.type, issue.node_id, issue.missing_ids, issue.node_ids) for issue in excinfo.value.errors]
+
+def test_valid_graph():
+    # Distinct prerequisite ids per node, in expression order
+    assert validate_snapshot(_snapshot((1, None), (2, "1"), (3, "(2 AND 1) OR 2"))) == {1: [], 2: [1], 3: [2, 1]}
+
+def test_cycles():
+    # A 3-node cycle is reported once, as a path starting and ending at its smallest id
+    assert _issues((1, "3"), (2, "1"), (3, "2 OR 4"), (4, None)) == [("cycle", None, None, [1, 3, 2, 1])]
+    # A node requiring itself
+    assert _issues((1, None), (2, "1 AND 2")) == [("cycle", None, None, [2, 2])]
+    # Separate cycles are reported separately
+    assert len(_issues((1, "2"), (2, "1"), (3, "4"), (4, "3"))) == 2
+
+def test_dangling_references():
+    assert _issues((1, None), (2, "1 AND 7"), (3, "(8 OR 9) AND 1")) == [
+        ("dangling_reference", 2, [7], None),
+        ("dangling_reference", 3, [8, 9], None),
+    ]
+    # A reference to a missing node doesn't hide a cycle
+    issues = _issues((1, "2 OR 5"), (2, "1"))
+    assert ("dangling_reference", 1, [5], None) in issues
+    assert ("cycle", None, None, [1, 2, 1]) in issues
+
+def test_syntax_and_duplicates():
+    issues = _issues((1, None), (1, None), (2, "1 AND"), (3, "(1"))
+    assert [(issue[0], issue[1]) for issue in issues] == [("duplicate_id", 1), ("syntax", 2), ("syntax", 3)]
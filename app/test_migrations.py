@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from app import crud, migrations, schemas, search
+
+# Schema as created by the startup code before the migration runner (no schema_version table)
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL UNIQUE, hashed_password VARCHAR NOT NULL)",
+    "CREATE TABLE graph_snapshots (id INTEGER PRIMARY KEY, created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, "
+    "last_updated DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL, version_label VARCHAR, is_public BOOLEAN DEFAULT 0 NOT NULL, "
+    "base_graph_id INTEGER, created_by_id INTEGER)",
+    "CREATE TABLE domains (id INTEGER PRIMARY KEY, local_id INTEGER NOT NULL, snapshot_id INTEGER, title VARCHAR NOT NULL, "
+    "description VARCHAR, parent_id INTEGER, collapsed BOOLEAN)",
+    "CREATE TABLE nodes (id INTEGER PRIMARY KEY, snapshot_id INTEGER, domain_id INTEGER, local_id INTEGER NOT NULL, "
+    "title VARCHAR NOT NULL, description VARCHAR, prerequisite VARCHAR, mentions VARCHAR, "
+    "assessable BOOLEAN DEFAULT 0 NOT NULL, sources VARCHAR)",
+    "INSERT INTO users (id, username, hashed_password) VALUES (1, 'alice', 'x')",
+    "INSERT INTO graph_snapshots (id, version_label, created_by_id) VALUES (1, 'legacy', 1)",
+    "INSERT INTO nodes (snapshot_id, local_id, title, prerequisite, sources) VALUES "
+    "(1, 1, 'Algebra', NULL, '[]'), (1, 2, 'Linear maps', '1', NULL), (1, 3, 'Topology', '(1 AND 2) OR 9', NULL)",
+]
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    search._backend = None
+    yield engine
+    search._backend = None
+    engine.dispose()
+
+def _versions(engine):
+    with engine.connect() as conn:
+        return sorted(conn.execute(text("SELECT version FROM schema_version")).scalars())
+
+def _columns(engine, table_name):
+    return {c["name"] for c in inspect(engine).get_columns(table_name)}
+
+ALL_VERSIONS = [m.version for m in migrations.MIGRATIONS]
+
+def test_fresh_database(engine):
+    assert migrations.run_migrations(engine) == migrations.LATEST_VERSION
+    assert _versions(engine) == ALL_VERSIONS
+    assert {"jobs", "node_edges", "node_search_fts"} <= set(inspect(engine).get_table_names())
+    # A second boot is a no-op
+    assert migrations.run_migrations(engine) == migrations.LATEST_VERSION
+    assert _versions(engine) == ALL_VERSIONS
+
+def test_legacy_database(engine):
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+
+    migrations.run_migrations(engine)
+    assert _versions(engine) == ALL_VERSIONS
+    assert {"x", "y"} <= _columns(engine, "nodes") and "sources" not in _columns(engine, "nodes")
+    assert {"created_at", "is_active", "email", "profile_image"} <= _columns(engine, "users")
+    assert {"jobs", "node_edges", "sources", "invitations"} <= set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        # Edge index backfilled from the stored expressions, without the dangling reference to 9
+        edges = conn.execute(text("SELECT from_local_id, to_local_id FROM node_edges ORDER BY 1, 2")).all()
+        assert [tuple(edge) for edge in edges] == [(1, 2), (1, 3), (2, 3)]
+
+    # The migrated schema works with the current code, including search over pre-existing rows
+    with Session(engine) as db:
+        user = crud.create_user(db, schemas.UserCreate(username="bob", password="pw", invitation_code="-"), "x")
+        assert user.created_at is not None and user.is_active
+        crud.create_snapshot(db, schemas.GraphSnapshotCreate(version_label="new", nodes=[{"local_id": 1, "title": "Topology basics"}]))
+        results = search.search(db, "topology")
+        assert search._backend == "sqlite_fts"
+        assert {snapshot_id for snapshot_id, _, _ in results} == {1, 2}
+
+def test_failed_optional_migration_is_retried(engine, monkeypatch):
+    optional = next(m for m in migrations.MIGRATIONS if m.optional)
+
+    def fail(conn):
+        raise RuntimeError("permission denied to create extension")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [m._replace(apply=fail) if m is optional else m for m in migrations.MIGRATIONS])
+    migrations.run_migrations(engine)
+    assert optional.version not in _versions(engine)
+
+    monkeypatch.undo()
+    migrations.run_migrations(engine)
+    assert _versions(engine) == ALL_VERSIONS
@@ -0,0 +1,73 @@
+import random
+from app import analytics, planner, utils
+
+def _index(*rows):
+    return planner.build_index(analytics.compile_graph((local_id, f"Node {local_id}", prerequisite) for local_id, prerequisite in rows))
+
+def _satisfied(tree, unlocked):
+    if tree is None:
+        return True
+    if isinstance(tree, utils.IdNode):
+        return tree.id_val in unlocked
+    results = [_satisfied(child, unlocked) for child in tree.children]
+    return all(results) if tree.op == "AND" else any(results)
+
+def _check_order(rows, steps, mastered):
+    """Every step's prerequisites are met by what was mastered or learned before it."""
+    prerequisites = dict(rows)
+    unlocked = set(mastered)
+    for local_id in steps:
+        expression = prerequisites[local_id]
+        assert _satisfied(utils.parse_expression(expression) if expression else None, unlocked), (local_id, steps)
+        unlocked.add(local_id)
+    return unlocked
+
+GRAPH = [
+    (1, None), (2, None), (3, None), (4, None),
+    (5, "1 AND 2"),
+    (6, "3"),
+    (7, "5 OR 6"),        # 6 is the cheaper branch (2 nodes against 3)
+    (8, "7 AND (4 OR 2)"),
+]
+
+def test_unlock_set():
+    index = _index(*GRAPH)
+    result = planner.plan(index, [8])
+    # 4 and 2 tie for the second operand of 8
+    assert {3, 6, 7, 8} < set(result.steps) and len(result.steps) == 5
+    assert result.cost == 5.0 and result.unreachable == []
+    assert result.steps[-1] == 8
+    _check_order(GRAPH, result.steps, ())
+
+    # Mastered nodes cut the search and make the other branch free
+    result = planner.plan(index, [8], mastered=[1, 2])
+    assert result.steps == [5, 7, 8]
+    _check_order(GRAPH, result.steps, [1, 2])
+
+    # Weights steer the OR choice
+    result = planner.plan(index, [7], weights={3: 10.0})
+    assert sorted(result.steps) == [1, 2, 5, 7] and result.cost == 4.0
+
+    # A target that is already mastered needs nothing
+    assert planner.plan(index, [7], mastered=[7]).steps == []
+
+def test_cycle_is_unreachable():
+    index = _index((1, None), (2, "1 AND 3"), (3, "2"), (4, "1"))
+    result = planner.plan(index, [2, 4])
+    assert result.unreachable == [2]
+    assert result.steps == [1, 4]
+
+def test_random_graphs_unlock_their_targets():
+    rng = random.Random(7)
+    for _ in range(50):
+        rows = []
+        for local_id in range(1, 25):
+            ids = rng.sample(range(1, local_id), min(local_id - 1, rng.randint(0, 3)))
+            rows.append((local_id, f" {rng.choice(['AND', 'OR'])} ".join(map(str, ids)) or None))
+        index = _index(*rows)
+        targets = rng.sample(range(1, 25), 3)
+        mastered = rng.sample(range(1, 25), 4)
+        result = planner.plan(index, targets, mastered)
+        assert len(set(result.steps)) == len(result.steps)
+        unlocked = _check_order(rows, result.steps, mastered)
+        assert set(targets) <= unlocked
@@ -0,0 +1,23 @@
+from app.redirects import RedirectResolver
+
+def test_chains():
+    # 1 -> 2 -> 3 -> 4 across three saves; 5 was redirected twice, the newest row wins
+    resolver = RedirectResolver([(1, 2), (2, 3), (3, 4), (5, 6), (5, 4)], current_ids={4, 6, 7})
+    assert resolver.resolve([1, 2, 3, 4, 5, 7]) == {1: 4, 2: 4, 3: 4, 4: 4, 5: 4, 7: 7}
+    # Path compression: every id on the walked chain now points at the end of it
+    assert resolver.parent[1] == resolver.parent[2] == resolver.parent[3] == 4
+
+def test_removed_and_unknown_ids():
+    # A chain ending at a node that no longer exists, and an id that was never redirected
+    resolver = RedirectResolver([(1, 2), (2, 3)], current_ids={9})
+    assert resolver.resolve([1, 2, 8]) == {1: None, 2: None, 8: None}
+
+def test_loops():
+    # Redirect loops (ids swapped back and forth between saves) end instead of spinning
+    resolver = RedirectResolver([(1, 2), (2, 3), (3, 1)], current_ids={4})
+    assert resolver.resolve([1, 2, 3]) == {1: None, 2: None, 3: None}
+    # A current node inside a loop stops the walk there
+    resolver = RedirectResolver([(1, 2), (2, 1), (3, 3)], current_ids={2, 3})
+    assert resolver.resolve([1, 2, 3]) == {1: 2, 2: 2, 3: 3}
+    # Repeated lookups after compression give the same answers
+    assert resolver.resolve([1, 2, 3]) == {1: 2, 2: 2, 3: 3}
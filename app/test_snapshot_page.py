@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import crud, models, schemas
+from app.database import Base
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def _save(db, label, created_at, **fields):
+    snapshot = crud.create_snapshot(db, schemas.GraphSnapshotCreate(
+        version_label=label, nodes=[{"local_id": 1, "title": "Node 1"}], **fields
+    ))
+    snapshot.created_at = created_at
+    db.commit()
+    return snapshot
+
+def _walk(db, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        items, cursor = crud.get_snapshot_page(db, cursor=cursor, limit=limit, **filters)
+        pages.append([item["version_label"] for item in items])
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip(db):
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    # Newest first; g2..g4 share a timestamp, so the id breaks the tie
+    for k, offset in enumerate([0, 1, 2, 2, 2, 3]):
+        _save(db, f"g{k}", start + timedelta(minutes=offset))
+    assert _walk(db, 2) == [["g5", "g4"], ["g3", "g2"], ["g1", "g0"]]
+    assert _walk(db, 4) == [["g5", "g4", "g3", "g2"], ["g1", "g0"]]
+    assert _walk(db, 10) == [["g5", "g4", "g3", "g2", "g1", "g0"]]
+
+    created_at, snapshot_id = crud.decode_snapshot_cursor(crud.encode_snapshot_cursor(start, 42))
+    assert (created_at, snapshot_id) == (start, 42)
+    with pytest.raises(ValueError):
+        crud.decode_snapshot_cursor("not-a-cursor")
+
+def test_filters(db):
+    db.add_all([models.User(username="alice", hashed_password="x"), models.User(username="bob", hashed_password="x")])
+    db.commit()
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    _save(db, "algebra", start, created_by="alice", is_public=True)
+    _save(db, "algebra_v2", start + timedelta(minutes=1), created_by="bob", base_graph="algebra")
+    _save(db, "algebra%draft", start + timedelta(minutes=2), created_by="alice", base_graph="algebra")
+    _save(db, "geometry", start + timedelta(minutes=3), created_by="bob", is_public=True)
+
+    assert _walk(db, 1, created_by="alice") == [["algebra%draft"], ["algebra"]]
+    assert _walk(db, 10, is_public=True) == [["geometry", "algebra"]]
+    assert _walk(db, 10, is_public=False, base_graph="algebra") == [["algebra%draft", "algebra_v2"]]
+    assert _walk(db, 10, label_prefix="algebra") == [["algebra%draft", "algebra_v2", "algebra"]]
+    # LIKE wildcards in the prefix match literally
+    assert _walk(db, 10, label_prefix="algebra%") == [["algebra%draft"]]
+    assert _walk(db, 10, label_prefix="algebra_") == [["algebra_v2"]]
+    assert _walk(db, 10, created_by="nobody") == [[]]
@@ -2,8 +2,9 @@ import re
 import os
 from datetime import datetime, timedelta
 from typing import List, Set, Dict, Optional, Union
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+
+# jose and passlib (and the crypto backends they load) are imported on first use rather than at
+# module import, which keeps them off the cold-start path.
 
 # Auth configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
@@ -11,21 +12,59 @@ ALGORITHM = "HS256"
 # Set expiration to 2 days (2 * 24 * 60 minutes)
 ACCESS_TOKEN_EXPIRE_MINUTES = 2 * 24 * 60 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor. Pinning min/max to the same value makes passlib flag every hash with a
+# different cost as needing an update, so changing BCRYPT_ROUNDS rehashes users on their next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=BCRYPT_ROUNDS,
+            bcrypt__min_rounds=BCRYPT_ROUNDS,
+            bcrypt__max_rounds=BCRYPT_ROUNDS,
+        )
+    return _pwd_context
+
+_bcrypt = None
+
+def _fallback_checkpw(plain_password, hashed_password):
+    # Direct fallback when passlib and the bcrypt package disagree on versions
+    global _bcrypt
+    try:
+        if _bcrypt is None:
+            import bcrypt
+            _bcrypt = bcrypt
+        return _bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except Exception:
+        return False
 
 def verify_password(plain_password, hashed_password):
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
     except Exception:
         # Try a fallback if it's a version mismatch or similar
-        try:
-            import bcrypt
-            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-        except:
-            return False
+        return _fallback_checkpw(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password, hashed_password):
+    """
+    Verify a password and report whether its hash should be replaced.
+    Returns (is_valid, new_hash); new_hash is None unless the stored hash uses an outdated cost or scheme.
+    """
+    try:
+        return get_pwd_context().verify_and_update(plain_password, hashed_password)
+    except Exception:
+        # passlib can't read this hash (e.g. a bcrypt version mismatch): check it directly and
+        # keep it, since rehashing would go through the same broken context
+        return _fallback_checkpw(plain_password, hashed_password), None
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,6 +73,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
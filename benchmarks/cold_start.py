@@ -0,0 +1,120 @@
+"""
+Cold start benchmark.
+
+Measures, in fresh interpreter processes:
+  - import_ms:        wall time of `import app.main`
+  - startup_ms:       lifespan startup (migration check) after import
+  - first_request_ms: first GET /api/v1/health once started
+and a `python -X importtime` breakdown of the slowest modules imported by app.main.
+
+Usage:
+    python benchmarks/cold_start.py                     # temporary SQLite database
+    python benchmarks/cold_start.py --database-url postgresql://...  --runs 10 --output cold_start.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+t2 = time.perf_counter()
+with TestClient(app.main.app) as client:
+    t3 = time.perf_counter()
+    client.get("/api/v1/health")
+    t4 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "startup_ms": (t3 - t2) * 1000, "first_request_ms": (t4 - t3) * 1000}}))
+"""
+
+
+def _child_env(database_url):
+    env = dict(os.environ)
+    env.pop("RENDER", None)
+    if database_url.startswith("sqlite"):
+        env["APP_MODE"] = "local"
+        env["SQLALCHEMY_DATABASE_URL"] = database_url
+    else:
+        env["APP_MODE"] = "docker"
+        env["DATABASE_URL"] = database_url
+    return env
+
+
+def parse_importtime(stderr: str, top: int):
+    """Parse `-X importtime` output into the slowest modules by cumulative and self time (microseconds)."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+
+    app_main = next((m for m in modules if m["module"] == "app.main"), None)
+    return {
+        "total_us": app_main["cumulative_us"] if app_main else None,
+        "top_cumulative": sorted(modules, key=lambda m: m["cumulative_us"], reverse=True)[:top],
+        "top_self": sorted(modules, key=lambda m: m["self_us"], reverse=True)[:top],
+    }
+
+
+def run(database_url: str, runs: int, top: int):
+    env = _child_env(database_url)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD.format(root=REPO_ROOT)],
+            env=env, capture_output=True, text=True, check=True, cwd=REPO_ROOT,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    importtime = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {REPO_ROOT!r}); import app.main"],
+        env=env, capture_output=True, text=True, check=True, cwd=REPO_ROOT,
+    )
+
+    summary = {}
+    for key in ("import_ms", "startup_ms", "first_request_ms"):
+        values = [s[key] for s in samples]
+        summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+    return {
+        "benchmark": "cold_start",
+        "python": sys.version.split()[0],
+        "database": database_url.split(":", 1)[0],
+        "runs": runs,
+        "results": summary,
+        "importtime": parse_importtime(importtime.stderr, top),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Defaults to a throwaway SQLite file")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Modules to list in the importtime breakdown")
+    parser.add_argument("--output", default=None, help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'cold_start.db')}"
+        result = run(database_url, args.runs, args.top)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
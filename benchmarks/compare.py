@@ -0,0 +1,69 @@
+"""
+Compare two benchmark result files (cold_start.py or hot_paths.py output).
+
+Prints every timing present in both files with the ratio new/old, and exits with status 1
+when any median got slower than --threshold (default 1.2 = 20% slower), so it can gate CI.
+
+Usage:
+    python benchmarks/compare.py before.json after.json
+    python benchmarks/compare.py before.json after.json --threshold 1.1
+"""
+import argparse
+import json
+import sys
+
+
+def _timings(results, path=()):
+    """Yield (name, median_ms) for every measured operation in a result tree."""
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        if "median_ms" in value:
+            yield "/".join(path + (key,)), value["median_ms"]
+        elif "median" in value:
+            yield "/".join(path + (key,)), value["median"]
+        else:
+            yield from _timings(value, path + (key,))
+
+
+def compare(old: dict, new: dict, threshold: float):
+    old_timings = dict(_timings(old["results"]))
+    rows = []
+    regressions = []
+    for name, new_ms in _timings(new["results"]):
+        if name not in old_timings:
+            continue
+        old_ms = old_timings[name]
+        ratio = new_ms / old_ms if old_ms else float("inf")
+        rows.append((name, old_ms, new_ms, ratio))
+        if ratio > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    rows, regressions = compare(old, new, args.threshold)
+    width = max((len(r[0]) for r in rows), default=10)
+    print(f"{'operation':<{width}}  {'old ms':>10}  {'new ms':>10}  {'ratio':>7}")
+    for name, old_ms, new_ms, ratio in rows:
+        flag = "  <-- slower" if name in regressions else ""
+        print(f"{name:<{width}}  {old_ms:>10.2f}  {new_ms:>10.2f}  {ratio:>7.2f}{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Synthetic knowledge graph generators for the benchmarks.
+
+generate_graph() returns a payload in the GraphSnapshotCreate shape (what the UI posts to
+POST /api/v1/snapshots). Prerequisites only reference earlier nodes, so the graph is a DAG,
+and each expression is an AND of OR-groups, e.g. "(3 OR 7) AND 12 AND (15 OR 16 OR 18)".
+The same seed always produces the same graph.
+"""
+import random
+from typing import Dict, List, Optional
+
+
+def _domains(depth: int, fanout: int) -> List[dict]:
+    """A full domain tree of the given depth; local ids are assigned breadth first."""
+    domains = []
+    level = [None]
+    next_id = 1
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for _ in range(fanout):
+                domains.append({
+                    "local_id": next_id,
+                    "title": f"Domain {next_id}",
+                    "description": f"Synthetic domain {next_id}",
+                    "parent_id": parent,
+                    "collapsed": True,
+                })
+                next_level.append(next_id)
+                next_id += 1
+        level = next_level
+    return domains
+
+
+def _expression(rng: random.Random, candidates: List[int], fan_in: int, width: int) -> Optional[str]:
+    if not candidates or fan_in <= 0:
+        return None
+    ids = rng.sample(candidates, min(fan_in, len(candidates)))
+    groups = []
+    for start in range(0, len(ids), max(width, 1)):
+        group = [str(i) for i in ids[start:start + max(width, 1)]]
+        groups.append(group[0] if len(group) == 1 else f"({' OR '.join(group)})")
+    return " AND ".join(groups)
+
+
+def generate_graph(
+    nodes: int = 100,
+    fan_in: int = 3,
+    expression_width: int = 2,
+    domain_depth: int = 2,
+    domain_fanout: int = 3,
+    sources_per_node: int = 2,
+    assessable_ratio: float = 0.5,
+    locality: int = 50,
+    redirects: int = 0,
+    label: Optional[str] = None,
+    seed: int = 0,
+) -> Dict:
+    """
+    nodes:             number of nodes
+    fan_in:            prerequisite ids per node (fewer for the first nodes)
+    expression_width:  ids per OR-group inside the AND expression
+    domain_depth:      levels of the domain tree (0 for no domains); nodes go to the leaves
+    domain_fanout:     children per domain
+    sources_per_node:  source items per node
+    locality:          prerequisites are drawn from the previous `locality` nodes (0 = any earlier node)
+    redirects:         old_id -> new_id redirect entries
+    """
+    rng = random.Random(seed)
+    domains = _domains(domain_depth, domain_fanout) if domain_depth > 0 else []
+    leaves = [d["local_id"] for d in domains if not any(c["parent_id"] == d["local_id"] for c in domains)]
+
+    node_list = []
+    for local_id in range(1, nodes + 1):
+        window_start = max(1, local_id - locality) if locality else 1
+        candidates = list(range(window_start, local_id))
+        node_list.append({
+            "local_id": local_id,
+            "title": f"Concept {local_id}",
+            "description": f"Synthetic concept {local_id} " + " ".join(rng.choice(("graph", "theory", "proof", "lemma", "method")) for _ in range(8)),
+            "prerequisite": _expression(rng, candidates, fan_in, expression_width),
+            "mentions": None,
+            "source_items": [
+                {
+                    "title": f"Source {local_id}.{s}",
+                    "author": f"Author {rng.randint(1, 50)}",
+                    "year": rng.randint(1950, 2025),
+                    "source_type": rng.choice(("book", "article", "website")),
+                    "url": f"https://example.org/{local_id}/{s}",
+                }
+                for s in range(sources_per_node)
+            ],
+            "domain_id": leaves[(local_id - 1) % len(leaves)] if leaves else None,
+            "x": (local_id % 40) * 120,
+            "y": (local_id // 40) * 80,
+            "assessable": rng.random() < assessable_ratio,
+        })
+
+    redirect_map = {}
+    for i in range(redirects):
+        # Old ids above the live range, pointing at existing nodes
+        redirect_map[str(nodes + i + 1)] = rng.randint(1, nodes)
+
+    return {
+        "version_label": label or f"bench-{nodes}-{seed}",
+        "base_graph": None,
+        "is_public": True,
+        "nodes": node_list,
+        "domains": domains,
+        "redirects": redirect_map or None,
+    }
+
+
+def prerequisite_map(graph: Dict) -> Dict[int, str]:
+    """local_id -> prerequisite expression, the input of the app.utils graph algorithms."""
+    return {n["local_id"]: n["prerequisite"] or "" for n in graph["nodes"]}
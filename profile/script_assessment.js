@@ -258,7 +258,10 @@ function applyExistingAssessment(capability) {
         const id = node.node_id;
         const val = node.evaluation["value"];
         if (val !== undefined) {
-            assessments[id] = val;
+            // Inferred levels are recomputed from the user's own answers on every save
+            if (!node.evaluation["inferred"]) {
+                assessments[id] = val;
+            }
             
             // Update graph visualization if node exists
             if (assessmentNetwork.body.data.nodes.get(id)) {
@@ -1,13 +1,162 @@
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict, deque
+from itertools import product
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple, FrozenSet
 from datetime import datetime
 from .models import CapabilityObject, Assessment, ProofInput, NodeData, GraphData
-from .utils import generate_graph_hash
+from .utils import generate_graph_hash, parse_prerequisite
 
 # Assessment Constants
 ASSESSMENT_NAME = "Default Self Assessment"
-ASSESSMENT_VERSION = "0.1"
+ASSESSMENT_VERSION = "0.2"
 ASSESSMENT_TYPE = "Self-assessment"
 
+MAX_LEVEL = 2
+MAX_CACHED_GRAPHS = 16
+MAX_CLAUSES = 32
+
+# Evidence propagation over the prerequisite DAG.
+#
+# Graphs are compiled once per graph hash: every prerequisite expression becomes a conjunctive
+# normal form over node indices (an AND of OR-clauses, absorbed, at most MAX_CLAUSES), plus a
+# topological order. Prerequisites are monotone, so a node is required exactly when it forms a
+# clause on its own. Then two linear passes over that order:
+#   forward   upper bounds: a node nobody rated can't be above its prerequisites, so OR
+#             branches the learner rated low are ruled out
+#   backward  lower bounds: a node rated (or implied) at level L implies L on every node left
+#             alone in a clause once ruled-out branches are dropped
+# Rated nodes keep their rating; implied ones are returned as inferred. An OR between branches
+# that only share prerequisites further up implies nothing: propagation never guesses a branch.
+
+class CompiledGraph(NamedTuple):
+    local_ids: List[int]
+    index: Dict[int, int]              # local_id -> index
+    clauses: List[Tuple[Tuple[int, ...], ...]]  # per index: AND of OR-clauses, () without prerequisites
+    order: List[int]                   # topological order (prerequisites first), cycles left out
+
+_compiled_graphs: "OrderedDict[str, CompiledGraph]" = OrderedDict()
+_compiled_graphs_lock = threading.Lock()  # assessments run in a thread pool
+
+def _references(expr) -> FrozenSet[int]:
+    if isinstance(expr, int):
+        return frozenset((expr,))
+    return frozenset().union(*(_references(child) for child in expr[1]))
+
+def _cnf(expr) -> Optional[List[FrozenSet[int]]]:
+    """Clauses of a parsed expression, or None past MAX_CLAUSES."""
+    if isinstance(expr, int):
+        return [frozenset((expr,))]
+    parts = [_cnf(child) for child in expr[1]]
+    if expr[0]:
+        # An oversized operand still needs one of its references: keep that as a weaker clause
+        clauses = [clause for child, part in zip(expr[1], parts) for clause in (part if part is not None else [_references(child)])]
+    else:
+        if any(part is None for part in parts):
+            return None
+        size = 1
+        for part in parts:
+            size *= len(part)
+        if size > MAX_CLAUSES:
+            return None
+        clauses = [frozenset().union(*combination) for combination in product(*parts)]
+    # Absorption: a clause containing another clause says nothing more
+    clauses = sorted(set(clauses), key=len)
+    return [clause for k, clause in enumerate(clauses) if not any(other < clause for other in clauses[:k])]
+
+def _compile(expr, index: Dict[int, int]):
+    """Local ids -> indices; references to missing nodes are dropped."""
+    if isinstance(expr, int):
+        return index.get(expr)
+    if expr is None:
+        return None
+    children = tuple(c for c in (_compile(child, index) for child in expr[1]) if c is not None)
+    if not children:
+        return None
+    return children[0] if len(children) == 1 else (expr[0], children)
+
+def compile_graph(graph_data: Dict[str, Any]) -> CompiledGraph:
+    nodes = graph_data.get('nodes', [])
+    local_ids = [node['local_id'] for node in nodes]
+    index = {local_id: i for i, local_id in enumerate(local_ids)}
+    clauses = []
+    for node in nodes:
+        expr = _compile(parse_prerequisite(node.get('prerequisite')), index)
+        if expr is None:
+            clauses.append(())
+            continue
+        cnf = _cnf(expr) or [_references(expr)]
+        clauses.append(tuple(tuple(sorted(clause)) for clause in cnf))
+
+    # Kahn's algorithm over distinct references
+    dependents = [[] for _ in nodes]
+    indegree = [0] * len(nodes)
+    for i, node_clauses in enumerate(clauses):
+        for r in {r for clause in node_clauses for r in clause}:
+            dependents[r].append(i)
+            indegree[i] += 1
+    queue = deque(i for i, d in enumerate(indegree) if d == 0)
+    order = []
+    while queue:
+        i = queue.popleft()
+        order.append(i)
+        for j in dependents[i]:
+            indegree[j] -= 1
+            if indegree[j] == 0:
+                queue.append(j)
+    return CompiledGraph(local_ids, index, clauses, order)
+
+def get_compiled_graph(graph_data: Dict[str, Any]) -> CompiledGraph:
+    """Compiled graph for graph_data, cached by its hash."""
+    graph_hash = generate_graph_hash(graph_data)
+    with _compiled_graphs_lock:
+        graph = _compiled_graphs.get(graph_hash)
+        if graph is not None:
+            _compiled_graphs.move_to_end(graph_hash)
+            return graph
+    # Compiled outside the lock; a concurrent compile of the same graph just stores it twice
+    graph = compile_graph(graph_data)
+    with _compiled_graphs_lock:
+        _compiled_graphs[graph_hash] = graph
+        while len(_compiled_graphs) > MAX_CACHED_GRAPHS:
+            _compiled_graphs.popitem(last=False)
+    return graph
+
+def propagate(graph: CompiledGraph, ratings: Dict[int, int]) -> Dict[int, int]:
+    """Levels implied by the ratings (index -> level) for the nodes that weren't rated."""
+    clauses = graph.clauses
+    upper = [MAX_LEVEL] * len(graph.local_ids)
+    if any(level < MAX_LEVEL for level in ratings.values()):
+        get = upper.__getitem__
+        for i in graph.order:
+            if i in ratings:
+                upper[i] = ratings[i]
+                continue
+            bound = MAX_LEVEL
+            for clause in clauses[i]:
+                value = get(clause[0]) if len(clause) == 1 else max(map(get, clause))
+                if value < bound:
+                    bound = value
+            upper[i] = bound
+
+    lower = [0] * len(graph.local_ids)
+    for i, level in ratings.items():
+        lower[i] = level
+    for i in reversed(graph.order):
+        level = lower[i]
+        if not level:
+            continue
+        for clause in clauses[i]:
+            if len(clause) > 1:
+                viable = [r for r in clause if upper[r] >= level]
+                # Several branches left is no evidence for any; none left means contradicting ratings
+                if len(viable) != 1:
+                    continue
+                clause = viable
+            r = clause[0]
+            if lower[r] < level:
+                lower[r] = level
+    return {i: level for i, level in enumerate(lower) if level and i not in ratings}
+
 def perform_assessment(
     graph_data: Dict[str, Any],
     graph_label: str,
@@ -17,21 +166,22 @@ def perform_assessment(
     """
     Standalone Python assessment module logic.
     Accepts arbitrary graph structure and proof inputs for specified nodes.
-    Generates a capability object with essential metadata.
+    Rated nodes keep their value; levels their ratings imply for other nodes
+    (prerequisites of what the learner knows) are added as inferred assessments.
     """
-    # 1. Generate a consistent hash for the graph to maintain references
-    # graph_hash = generate_graph_hash(graph_data)
-    
-    # 2. Assess the nodes based on proof inputs
-        # Simply copy the value from proof inputs
-    assessed_nodes = []
-    for pi in proof_inputs:
-        assessment = Assessment(
-            node_id=pi.node_id,
-            evaluation=pi.value
-        )
-        assessed_nodes.append(assessment)
-    
+    # 1. Compile the graph (cached by its hash)
+    graph = get_compiled_graph(graph_data)
+
+    # 2. Propagate the proof inputs through the prerequisites
+    ratings = {pi.node_id: pi.value for pi in proof_inputs}
+    implied = propagate(graph, {graph.index[node_id]: value for node_id, value in ratings.items() if node_id in graph.index})
+
+    assessed_nodes = [Assessment(node_id=node_id, evaluation=value) for node_id, value in ratings.items()]
+    assessed_nodes.extend(
+        Assessment(node_id=graph.local_ids[i], evaluation=level, inferred=True)
+        for i, level in implied.items()
+    )
+
     # 3. Construct and return the capability object
     return CapabilityObject(
         assessment_name=ASSESSMENT_NAME,
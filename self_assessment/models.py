@@ -16,6 +16,7 @@ class GraphData(BaseModel):
 class Assessment(BaseModel):
     node_id: int
     evaluation: int = Field(..., ge=0, le=2) # 0, 1, or 2
+    inferred: bool = False # implied by the ratings of other nodes, not rated directly
 
 class ProofInput(BaseModel):
     node_id: int
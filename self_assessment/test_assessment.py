@@ -1,8 +1,8 @@
 import json
 from datetime import datetime
-from assessment import perform_assessment
-from models import ProofInput
-from utils import generate_graph_hash
+from self_assessment.assessment import perform_assessment
+from self_assessment.models import ProofInput
+from self_assessment.utils import generate_graph_hash
 
 def test_assessment():
     # 1. Define an arbitrary graph structure
@@ -25,9 +25,6 @@ def test_assessment():
     capability_object = perform_assessment(
         graph_data=graph_data,
         proof_inputs=proof_inputs,
-        assessment_name="Integration Test Assessment",
-        assessment_type="Skills Validation",
-        version="1.0.0",
         user_reference="user_123",
         graph_label="test_graph"
     )
@@ -41,9 +38,40 @@ def test_assessment():
     for node in capability_object.assessed_nodes:
         print(f"  Node ID: {node.node_id}, Confidence Score: {node.evaluation}")
     
-    # Verify confidence score mapping
-    print(capability_object.assessed_nodes)
+    # Verify confidence score mapping: rated nodes keep their value, nothing else is implied
+    assert [(n.node_id, n.evaluation, n.inferred) for n in capability_object.assessed_nodes] == [(1, 2, False), (2, 1, False), (3, 0, False)]
     print("\nStandalone Assessment Module Verification: SUCCESS")
 
+def test_propagation():
+    graph_data = {
+        "nodes": [
+            {"local_id": 1, "title": "Node 1", "prerequisite": None},
+            {"local_id": 2, "title": "Node 2", "prerequisite": "1"},
+            {"local_id": 3, "title": "Node 3", "prerequisite": "1"},
+            {"local_id": 4, "title": "Node 4", "prerequisite": "2 OR 3"},
+            {"local_id": 5, "title": "Node 5", "prerequisite": "4 AND 2"},
+            {"local_id": 6, "title": "Node 6", "prerequisite": "(2 AND 7) OR (3 AND 7)"},
+            {"local_id": 7, "title": "Node 7", "prerequisite": None}
+        ]
+    }
+
+    def assess(*inputs):
+        capability_object = perform_assessment(
+            graph_data=graph_data,
+            graph_label="test_graph",
+            proof_inputs=[ProofInput(node_id=node_id, value=value) for node_id, value in inputs],
+            user_reference="user_123"
+        )
+        return {n.node_id: (n.evaluation, n.inferred) for n in capability_object.assessed_nodes}
+
+    # AND operands are implied at the same level, transitively
+    assert assess((5, 2)) == {5: (2, False), 4: (2, True), 2: (2, True), 1: (2, True)}
+    # An OR doesn't imply either branch...
+    assert assess((4, 2)) == {4: (2, False)}
+    # ...unless the other one was rated lower
+    assert assess((4, 2), (2, 0)) == {4: (2, False), 2: (0, False), 3: (2, True), 1: (2, True)}
+    # What every branch requires is implied
+    assert assess((6, 1)) == {6: (1, False), 7: (1, True)}
+
 if __name__ == "__main__":
     test_assessment()
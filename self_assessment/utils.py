@@ -1,6 +1,10 @@
 import hashlib
 import json
-from typing import Dict, Any
+import re
+from typing import Dict, Any, Optional
+
+# Plain data only, so the circular reference check can be skipped
+_encoder = json.JSONEncoder(check_circular=False)
 
 def generate_graph_hash(graph_data: Dict[str, Any]) -> str:
     """
@@ -20,15 +24,64 @@ def generate_graph_hash(graph_data: Dict[str, Any]) -> str:
     # The requirement says "exclude assessable property from assessment logic". 
     # Let's keep the hash focused on node IDs, titles, and prerequisites.
     
-    normalized_data = []
-    for node in graph_data.get('nodes', []):
-        node_copy = {
+    # Keys are listed in sorted order, so the JSON string is the same as with sort_keys=True
+    normalized_data = [
+        {
             'local_id': node.get('local_id'),
-            'title': node.get('title'),
-            'prerequisite': node.get('prerequisite')
+            'prerequisite': node.get('prerequisite'),
+            'title': node.get('title')
         }
-        normalized_data.append(node_copy)
+        for node in graph_data.get('nodes', [])
+    ]
     
     # Convert to a sorted JSON string for consistent hashing
-    graph_str = json.dumps(normalized_data, sort_keys=True)
-    return hashlib.sha256(graph_str.encode('utf-8')).hexdigest()
\ No newline at end of file
+    graph_str = _encoder.encode(normalized_data)
+    return hashlib.sha256(graph_str.encode('utf-8')).hexdigest()
+
+def parse_prerequisite(expression: Optional[str]):
+    """
+    Parse a prerequisite expression ("1 AND (2 OR 3)", "," is AND) into nested tuples:
+    plain ints for node ids, (is_and, children) for operators. Returns None when empty.
+    """
+    tokens = re.findall(r'\(|\)|AND|OR|,|\d+', expression or '', re.IGNORECASE)
+    pos = 0
+
+    def combine(is_and: bool, left, right):
+        if left is None or right is None:
+            return left if right is None else right
+        if isinstance(left, tuple) and left[0] == is_and:
+            return (is_and, left[1] + (right,))
+        return (is_and, (left, right))
+
+    def parse_or():
+        nonlocal pos
+        node = parse_and()
+        while pos < len(tokens) and tokens[pos].upper() == 'OR':
+            pos += 1
+            node = combine(False, node, parse_and())
+        return node
+
+    def parse_and():
+        nonlocal pos
+        node = parse_primary()
+        while pos < len(tokens) and (tokens[pos].upper() == 'AND' or tokens[pos] == ','):
+            pos += 1
+            node = combine(True, node, parse_primary())
+        return node
+
+    def parse_primary():
+        nonlocal pos
+        while pos < len(tokens):
+            token = tokens[pos]
+            pos += 1
+            if token == '(':
+                node = parse_or()
+                if pos < len(tokens) and tokens[pos] == ')':
+                    pos += 1
+                return node
+            if token.isdigit():
+                return int(token)
+            # Skip stray operators and parentheses
+        return None
+
+    return parse_or()
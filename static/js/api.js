@@ -23,6 +23,18 @@ var api = {
             .then(this._handleResponse)
             .then(function(res) { return res.json(); });
     },
+    fetchSnapshotPage: function(params) {
+        // params: { cursor, limit, created_by, is_public, base_graph, label_prefix }
+        var query = new URLSearchParams();
+        Object.keys(params || {}).forEach(function(key) {
+            if (params[key] !== undefined && params[key] !== null && params[key] !== '') {
+                query.append(key, params[key]);
+            }
+        });
+        return fetch(API_BASE + '/snapshots/page?' + query.toString(), { headers: this._getHeaders() })
+            .then(this._handleResponse)
+            .then(function(res) { return res.json(); });
+    },
     fetchSnapshot: function(label) {
         return fetch(API_BASE + `/snapshots/${label}/read`, { headers: this._getHeaders() })
             .then(this._handleResponse)
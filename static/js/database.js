@@ -369,6 +369,11 @@ function saveSnapshot() {
                                 customConfirm(data.detail).then(function(confirmed) {
                                     if (confirmed) performSave(true);
                                 });
+                            } else if (data.detail && data.detail.errors) {
+                                // Structured validation errors (cycles, missing prerequisites, ...)
+                                var lines = data.detail.errors.slice(0, 10).map(function(e) { return '- ' + e.message; });
+                                if (data.detail.error_count > lines.length) lines.push('... and ' + (data.detail.error_count - lines.length) + ' more');
+                                customAlert('Cannot save: the graph has ' + data.detail.error_count + ' problem(s):\n' + lines.join('\n'));
                             } else {
                                 customAlert('Error: ' + (data.detail || data.error || 'Could not save snapshot'));
                             }
@@ -395,6 +400,8 @@ function saveSnapshot() {
     }
 }
 
+var SNAPSHOT_PAGE_SIZE = 100;
+
 function refreshSnapshots(force) {
     var listDiv = document.getElementById('snapshots-list');
     if (!listDiv) return; // Exit if element doesn't exist on current page
@@ -407,7 +414,7 @@ function refreshSnapshots(force) {
                 var cachedData = JSON.parse(cached);
                 // Simple cache validation: check if it's an array and not too old (e.g., < 1 hour) - skipping time for now for simplicity
                 if (Array.isArray(cachedData)) {
-                    renderSnapshots(cachedData);
+                    renderSnapshots(cachedData, localStorage.getItem('cachedSnapshotsCursor'));
                     return;
                 }
             } catch (e) {
@@ -418,20 +425,37 @@ function refreshSnapshots(force) {
 
     listDiv.innerHTML = '<p>Loading snapshots...</p>';
     
-    api.fetchSnapshots().then(function(snapshots) {
-        if (snapshots.length === 0) {
+    api.fetchSnapshotPage({ limit: SNAPSHOT_PAGE_SIZE }).then(function(page) {
+        if (page.items.length === 0) {
             listDiv.innerHTML = '<p class="empty-state">No snapshots found in database.</p>';
             localStorage.removeItem('cachedSnapshots');
+            localStorage.removeItem('cachedSnapshotsCursor');
             return;
         }
 
-        // Cache the new data
-        localStorage.setItem('cachedSnapshots', JSON.stringify(snapshots));
-        renderSnapshots(snapshots);
+        cacheSnapshots(page.items, page.next_cursor);
+        renderSnapshots(page.items, page.next_cursor);
     });
 }
 
-function renderSnapshots(snapshots) {
+function loadMoreSnapshots(cursor) {
+    api.fetchSnapshotPage({ limit: SNAPSHOT_PAGE_SIZE, cursor: cursor }).then(function(page) {
+        var snapshots = loadedSnapshots.concat(page.items);
+        cacheSnapshots(snapshots, page.next_cursor);
+        renderSnapshots(snapshots, page.next_cursor);
+    });
+}
+
+function cacheSnapshots(snapshots, nextCursor) {
+    localStorage.setItem('cachedSnapshots', JSON.stringify(snapshots));
+    if (nextCursor) {
+        localStorage.setItem('cachedSnapshotsCursor', nextCursor);
+    } else {
+        localStorage.removeItem('cachedSnapshotsCursor');
+    }
+}
+
+function renderSnapshots(snapshots, nextCursor) {
     loadedSnapshots = snapshots;
     var listDiv = document.getElementById('snapshots-list');
     if (!listDiv) return; // Exit if element doesn't exist on current page
@@ -463,6 +487,10 @@ function renderSnapshots(snapshots) {
         '</tr>';
     }
     html += '</tbody></table>';
+    if (nextCursor) {
+        // Cursors are opaque base64url strings, safe to inline
+        html += '<button class="btn-secondary btn-small" onclick="loadMoreSnapshots(\'' + nextCursor + '\')">Load more</button>';
+    }
     listDiv.innerHTML = html;
 }
 
@@ -562,7 +590,7 @@ function triggerImportGraph() {
         if (confirmed) {
             api.importSnapshot(file, true).then(function(res) {
                 if (res.error || res.detail) {
-                    customAlert('Import failed: ' + (res.detail || res.error));
+                    customAlert('Import failed: ' + ((res.detail && res.detail.message) || res.detail || res.error));
                 } else {
                     customAlert('Graph overwritten successfully!');
                     closeGraphActionModal();
@@ -624,7 +652,7 @@ function submitGlobalImport() {
                     if (confirmed) {
                          api.importSnapshot(file, true).then(function(retryRes) {
                              if (retryRes.error || retryRes.detail) {
-                                 customAlert('Import failed: ' + (retryRes.detail || retryRes.error));
+                                 customAlert('Import failed: ' + ((retryRes.detail && retryRes.detail.message) || retryRes.detail || retryRes.error));
                              } else {
                                  customAlert('Graph imported successfully!');
                                  closeGlobalImportModal();
@@ -634,7 +662,7 @@ function submitGlobalImport() {
                     }
                 });
             } else {
-                customAlert('Import failed: ' + (res.detail || res.error));
+                customAlert('Import failed: ' + ((res.detail && res.detail.message) || res.detail || res.error));
             }
         } else {
             customAlert('Graph imported successfully!');
@@ -1,5 +1,8 @@
 // LLM Feature Module
 
+// Aborting the request closes the stream, which also stops generation on the server
+let llmAbortController = null;
+
 function openLLMModal() {
     const modal = document.getElementById('llm-modal');
     if (modal) {
@@ -10,6 +13,7 @@ function openLLMModal() {
 }
 
 function closeLLMModal() {
+    if (llmAbortController) llmAbortController.abort();
     const modal = document.getElementById('llm-modal');
     if (modal) {
         modal.style.display = 'none';
@@ -37,13 +41,20 @@ async function queryLLM() {
     // Show loading
     loadingIndicator.style.display = 'block';
     resultsContainer.innerHTML = '';
+
+    // A new query replaces any one still streaming
+    if (llmAbortController) llmAbortController.abort();
+    const controller = new AbortController();
+    llmAbortController = controller;
     
     try {
         const token = getCookie('access_token');
         
-        // Build context from current nodes
+        // Saved graphs: the server picks the relevant nodes itself.
+        // Otherwise build context from current nodes
+        const graphLabel = (typeof currentSnapshotLabel !== 'undefined' && currentSnapshotLabel) ? currentSnapshotLabel : null;
         let context = "";
-        if (typeof draftNodes !== 'undefined') {
+        if (!graphLabel && typeof draftNodes !== 'undefined') {
             context = draftNodes.map(n => `${n.title}: ${n.description}`).join("\n");
         }
         
@@ -59,7 +70,7 @@ async function queryLLM() {
              }
         }
 
-        const response = await fetch('/api/v1/llm/suggest', {
+        const response = await fetch('/api/v1/llm/suggest/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -68,22 +79,65 @@ async function queryLLM() {
             body: JSON.stringify({
                 prompt: prompt,
                 context: context.substring(0, 2000), // Limit context size
-                graph_name: graphName
-            })
+                graph_name: graphName,
+                graph_label: graphLabel
+            }),
+            signal: controller.signal
         });
 
         if (!response.ok) {
             throw new Error(`Error: ${response.statusText}`);
         }
 
-        const data = await response.json();
-        displayLLMResults(data.suggestions);
-        
+        // Suggestions appear one by one as the model writes them
+        let count = 0;
+        await readServerSentEvents(response, (event, data) => {
+            if (event === 'suggestion') {
+                if (count === 0) {
+                    loadingIndicator.style.display = 'none';
+                    renderLLMToolbar(resultsContainer);
+                }
+                appendLLMSuggestion(resultsContainer, data);
+                count++;
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            } else if (event === 'done' && count === 0) {
+                resultsContainer.innerHTML = '<p>No suggestions found.</p>';
+            }
+        });
+
     } catch (error) {
+        if (error.name === 'AbortError') return;
         console.error('LLM Query failed:', error);
         resultsContainer.innerHTML = `<div style="color: red; padding: 10px; background: #ffe6e6; border-radius: 4px;">Failed to get suggestions: ${error.message}</div>`;
     } finally {
-        loadingIndicator.style.display = 'none';
+        if (llmAbortController === controller) {
+            llmAbortController = null;
+            loadingIndicator.style.display = 'none';
+        }
+    }
+}
+
+async function readServerSentEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            onEvent(event, data ? JSON.parse(data) : null);
+        }
     }
 }
 
@@ -96,7 +150,13 @@ function displayLLMResults(suggestions) {
         return;
     }
 
-    // Add Toolbar
+    renderLLMToolbar(container);
+    suggestions.forEach(suggestion => appendLLMSuggestion(container, suggestion));
+}
+
+function renderLLMToolbar(container) {
+    container.innerHTML = '';
+
     const toolbar = document.createElement('div');
     toolbar.className = 'llm-toolbar';
     toolbar.style.marginBottom = '15px';
@@ -115,34 +175,34 @@ function displayLLMResults(suggestions) {
         <button class="btn-primary btn-small" onclick="importSelectedLLM()">Import Selected</button>
     `;
     container.appendChild(toolbar);
+}
 
-    suggestions.forEach((suggestion, index) => {
-        const card = document.createElement('div');
-        card.className = 'llm-suggestion-card';
-        card.style.border = '1px solid #e0e0e0';
-        card.style.borderRadius = '8px';
-        card.style.padding = '15px';
-        card.style.marginBottom = '10px';
-        card.style.backgroundColor = '#f9f9f9';
-        
-        card.innerHTML = `
-            <div style="display: flex; gap: 12px; align-items: flex-start;">
-                <div style="padding-top: 4px;">
-                    <input type="checkbox" class="llm-suggestion-checkbox" style="width: 18px; height: 18px; cursor: pointer;">
-                </div>
-                <div style="flex: 1;">
-                    <h4 style="margin-top: 0; color: #1a73e8; margin-bottom: 5px;">${escapeHtml(suggestion.title)}</h4>
-                    <p style="margin-bottom: 10px; color: #444;">${escapeHtml(suggestion.description)}</p>
-                    <button class="btn-secondary btn-small" onclick="useSuggestion(this)">Use This Single</button>
-                    <div style="display:none;" class="suggestion-data">
-                        <span class="s-title">${escapeHtml(suggestion.title)}</span>
-                        <span class="s-desc">${escapeHtml(suggestion.description)}</span>
-                    </div>
+function appendLLMSuggestion(container, suggestion) {
+    const card = document.createElement('div');
+    card.className = 'llm-suggestion-card';
+    card.style.border = '1px solid #e0e0e0';
+    card.style.borderRadius = '8px';
+    card.style.padding = '15px';
+    card.style.marginBottom = '10px';
+    card.style.backgroundColor = '#f9f9f9';
+
+    card.innerHTML = `
+        <div style="display: flex; gap: 12px; align-items: flex-start;">
+            <div style="padding-top: 4px;">
+                <input type="checkbox" class="llm-suggestion-checkbox" style="width: 18px; height: 18px; cursor: pointer;">
+            </div>
+            <div style="flex: 1;">
+                <h4 style="margin-top: 0; color: #1a73e8; margin-bottom: 5px;">${escapeHtml(suggestion.title)}</h4>
+                <p style="margin-bottom: 10px; color: #444;">${escapeHtml(suggestion.description)}</p>
+                <button class="btn-secondary btn-small" onclick="useSuggestion(this)">Use This Single</button>
+                <div style="display:none;" class="suggestion-data">
+                    <span class="s-title">${escapeHtml(suggestion.title)}</span>
+                    <span class="s-desc">${escapeHtml(suggestion.description)}</span>
                 </div>
             </div>
-        `;
-        container.appendChild(card);
-    });
+        </div>
+    `;
+    container.appendChild(card);
 }
 
 function toggleSelectAllLLM(checkbox) {